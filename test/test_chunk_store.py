@@ -0,0 +1,83 @@
+import io
+import json
+import os
+import random
+import stat
+from pathlib import Path
+
+import py  # type: ignore
+import pytest
+import zstandard
+
+from toolchains.utils_source import chunk_store
+
+
+def test_chunk_boundary_shift() -> None:
+    """测试在数据头部插入内容后，除第一个块外其余块保持不变"""
+
+    data = random.Random(0).randbytes(4 << 20)
+    origin = [bytes(chunk) for chunk in chunk_store.split(data)]
+    shifted = [bytes(chunk) for chunk in chunk_store.split(b"inserted" * 100 + data)]
+    assert b"".join(origin) == data
+    assert all(chunk_store.min_chunk_size <= len(chunk) <= chunk_store.max_chunk_size for chunk in origin[:-1])
+    assert len({*origin} & {*shifted}) >= len(origin) - 2
+    # 流式切分与整体切分的结果相同
+    assert [bytes(chunk) for chunk in chunk_store.split_file(io.BytesIO(data))] == origin
+
+
+def test_pack_unpack(tmpdir: py.path.LocalPath) -> None:
+    """测试工具链存入块存储后可以完整还原，且相同内容只保存一次"""
+
+    prefix = Path(tmpdir)
+    store = chunk_store(prefix / "store", 3)
+    shared = random.Random(1).randbytes(1 << 20)
+    for name in ("x86_64-linux-gnu-gcc15", "x86_64-linux-gnu-gcc16"):
+        root = prefix / name
+        (root / "bin").mkdir(parents=True)
+        (root / "bin" / "gcc").write_bytes(shared + name.encode())
+        (root / "bin" / "gcc").chmod(0o755)
+        (root / "bin" / "c++").symlink_to("gcc")
+        (root / "lib").mkdir()
+        (root / "lib" / "empty.a").write_bytes(b"")
+        os.mkfifo(root / "lib" / "fifo", 0o640)
+        os.utime(root / "lib", (0, 1000000))
+
+    total_size, first_size = store.pack(prefix, "x86_64-linux-gnu-gcc15", prefix, 2)
+    _, second_size = store.pack(prefix, "x86_64-linux-gnu-gcc16", prefix, 1)
+    assert total_size == len(shared) + len("x86_64-linux-gnu-gcc15")
+    assert second_size < first_size // 4
+
+    output_dir = prefix / "output"
+    output_dir.mkdir()
+    for name in ("x86_64-linux-gnu-gcc15", "x86_64-linux-gnu-gcc16"):
+        recipe = prefix / f"{name}{chunk_store.recipe_suffix}"
+        assert chunk_store.is_recipe(recipe)
+        store.unpack(recipe, output_dir)
+        root, output = prefix / name, output_dir / name
+        assert (output / "bin" / "gcc").read_bytes() == (root / "bin" / "gcc").read_bytes()
+        assert (output / "bin" / "gcc").stat().st_mode == (root / "bin" / "gcc").stat().st_mode
+        assert (output / "bin" / "c++").readlink() == Path("gcc")
+        assert (output / "lib" / "empty.a").read_bytes() == b""
+        assert (output / "lib" / "fifo").stat().st_mode == stat.S_IFIFO | 0o640
+        assert (output / "lib").stat().st_mtime == 1000000
+
+
+@pytest.mark.parametrize("path", ["/tmp/escape", "x86_64-linux-gnu-gcc16/../escape", "escape", "x86_64-linux-gnu-gcc16/link/escape"])
+def test_unpack_escape(tmpdir: py.path.LocalPath, path: str) -> None:
+    """测试拒绝还原绝对路径、包含..的路径、工具链目录之外的路径以及穿过软链接的路径"""
+
+    prefix = Path(tmpdir)
+    store = chunk_store(prefix / "store", 3)
+    name = "x86_64-linux-gnu-gcc16"
+    entry_list = [
+        {"path": name, "mode": stat.S_IFDIR | 0o755, "mtime": 0},
+        {"path": f"{name}/link", "mode": stat.S_IFLNK | 0o777, "mtime": 0, "target": str(prefix)},
+        {"path": path, "mode": stat.S_IFREG | 0o644, "mtime": 0, "size": 0, "chunks": []},
+    ]
+    recipe = prefix / f"{name}{chunk_store.recipe_suffix}"
+    recipe.write_bytes(zstandard.ZstdCompressor().compress(json.dumps({"version": 1, "name": name, "entries": entry_list}).encode()))
+    output_dir = prefix / "output"
+    output_dir.mkdir()
+    with pytest.raises(RuntimeError, match="Refuse to restore"):
+        store.unpack(recipe, output_dir)
+    assert not (prefix / "escape").exists()
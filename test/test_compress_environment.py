@@ -0,0 +1,720 @@
+import os
+import shutil
+import stat
+import struct
+import subprocess
+import tempfile
+import time
+import typing
+from pathlib import Path
+
+import libarchive  # type: ignore
+import py  # type: ignore
+import pytest
+import zstandard
+
+from toolchains.common import (
+    _parallel_extractor,
+    _parallel_zstd_reader,
+    chdir_guard,
+    compress_environment,
+    elf_section_table,
+    member_filter,
+    package_codec,
+    package_component_index,
+    package_manifest,
+    parse_compress_level,
+    progress_monitor,
+    progress_record,
+    progress_tracker,
+    status_counter,
+    toolchains_package,
+    walk_path,
+    zstd_delta_header,
+    zstd_frame_index,
+    zstd_seek_table,
+)
+
+
+def _make_toolchain(prefix: Path, name: str = "x86_64-linux-gnu-gcc16") -> Path:
+    """在prefix下构造一个用于测试的工具链目录
+
+    Args:
+        prefix (Path): 安装路径
+        name (str, optional): 工具链名称
+
+    Returns:
+        Path: 工具链目录
+    """
+
+    root = prefix / name
+    (root / "bin").mkdir(parents=True)
+    (root / "include" / "c++").mkdir(parents=True)
+    (root / "lib").mkdir()
+    (root / "bin" / "gcc").write_bytes(os.urandom(1 << 16) * 4)
+    (root / "bin" / "gcc").chmod(0o755)
+    (root / "include" / "c++" / "vector").write_text("#pragma once\n" * 4096)
+    (root / "lib" / "libstdc++.a").write_bytes(bytes(range(256)) * 1024)
+    (root / "bin" / "c++").symlink_to("gcc")
+    # 将atime设为晚于mtime和ctime的时间，避免relatime在读取文件时修改atime导致pax头不同
+    now = int(time.time())
+    for item in [root, *root.rglob("*")]:
+        os.utime(item, (now + 100, now - 100), follow_symlinks=False)
+    return root
+
+
+def _reference_compress(env: compress_environment, path: str, output: Path) -> None:
+    """使用临时文件的原始压缩流程，作为字节级比较的基准
+
+    Args:
+        env (compress_environment): 压缩环境
+        path (str): 要压缩的目标路径
+        output (Path): 输出文件
+    """
+
+    with tempfile.TemporaryFile() as tmp:
+        with libarchive.fd_writer(tmp.fileno(), "pax") as tar:
+            for item in walk_path(path):
+                tar.add_files(item, recursive=False)
+            manifest = package_manifest.create(Path.cwd(), path, env.jobs)
+            manifest.metadata["compress"] = env._get_compress_parameters([])
+            env._add_manifest(tar, path, manifest)
+        tmp.seek(0)
+        params = zstandard.ZstdCompressionParameters(
+            compression_level=env._get_fixed_compress_level(), window_log=env.long_distance_match, enable_ldm=True, threads=env.jobs
+        )
+        with output.open("wb") as zst:
+            zstandard.ZstdCompressor(compression_params=params).copy_stream(tmp, zst)
+
+
+@pytest.mark.parametrize("prefetch_size", [64 << 20, 1 << 17])
+def test_stream_compress_equivalent(tmpdir: py.path.LocalPath, monkeypatch: pytest.MonkeyPatch, prefetch_size: int) -> None:
+    """测试流式压缩的输出与经过临时文件压缩的输出逐字节相同，超过预读上限的文件流式读取时结果也相同"""
+
+    prefix = Path(tmpdir)
+    root = _make_toolchain(prefix)
+    now = int(time.time())
+    for i in range(64):
+        (root / "include" / f"header{i}.h").write_text(f"#define HEADER{i}\n" * i)
+        os.utime(root / "include" / f"header{i}.h", (now + 100, now - 100))
+    os.utime(root / "include", (now + 100, now - 100))
+    env = compress_environment(2, prefix, 3, 20)
+    monkeypatch.setattr(compress_environment, "prefetch_size", prefetch_size)
+    env.compress_path(root.name, dry_run=False)
+
+    cwd = Path.cwd()
+    os.chdir(prefix)
+    try:
+        _reference_compress(env, root.name, prefix / "reference.tar.zst")
+    finally:
+        os.chdir(cwd)
+    assert (prefix / f"{root.name}.tar.zst").read_bytes() == (prefix / "reference.tar.zst").read_bytes()
+
+
+def _snapshot(root: Path) -> dict[str, tuple[int, bytes | str]]:
+    """记录目录树中各项的权限和内容，用于比较解压结果，工具链清单不参与比较
+
+    Args:
+        root (Path): 根目录
+
+    Returns:
+        dict[str, tuple[int, bytes | str]]: 相对路径->(权限, 文件内容或软链接目标)
+    """
+
+    result: dict[str, tuple[int, bytes | str]] = {}
+    for item in sorted(root.rglob("*")):
+        if item.name == package_manifest.file_name:
+            continue
+        mode = item.lstat().st_mode
+        if item.is_symlink():
+            result[str(item.relative_to(root))] = (mode, str(item.readlink()))
+        elif item.is_file():
+            result[str(item.relative_to(root))] = (mode, item.read_bytes())
+        else:
+            result[str(item.relative_to(root))] = (mode, b"")
+    return result
+
+
+def test_stream_decompress(tmpdir: py.path.LocalPath, monkeypatch: pytest.MonkeyPatch) -> None:
+    """测试流式解压缩可以还原工具链，且不使用临时文件"""
+
+    prefix = Path(tmpdir)
+    root = _make_toolchain(prefix)
+    env = compress_environment(2, prefix, 3, 20)
+    env.compress_path(root.name, dry_run=False)
+
+    def no_temporary_file(*args: typing.Any, **kwargs: typing.Any) -> typing.NoReturn:
+        raise AssertionError("Temporary file should not be used.")
+
+    monkeypatch.setattr(tempfile, "TemporaryFile", no_temporary_file)
+    output_dir = prefix / "output"
+    output_dir.mkdir()
+    env.decompress_path(f"{root.name}.tar.zst", output_dir, dry_run=False)
+    assert _snapshot(output_dir / root.name) == _snapshot(root)
+
+
+def test_seekable_format(tmpdir: py.path.LocalPath) -> None:
+    """测试可寻址格式：帧索引表正确，并行解压与单线程解压结果一致"""
+
+    prefix = Path(tmpdir)
+    root = _make_toolchain(prefix)
+    env = compress_environment(4, prefix, 3, 20, 1 << 16)
+    env.compress_path(root.name, dry_run=False)
+    package = prefix / f"{root.name}.tar.zst"
+
+    with package.open("rb") as file:
+        seek_table = zstd_seek_table.load(file)
+        assert file.tell() == 0
+    assert seek_table and len(seek_table.frame_list) > 1
+    # 帧索引表描述的帧恰好覆盖除索引表外的整个文件
+    assert sum(compressed for compressed, _ in seek_table.frame_list) + len(seek_table.dump()) == package.stat().st_size
+
+    # 普通的zstd流式解压可以读取可寻址格式
+    with package.open("rb") as file, zstandard.ZstdDecompressor().stream_reader(file, read_across_frames=True) as reader:
+        tar_data = reader.read()
+    assert len(tar_data) == sum(decompressed for _, decompressed in seek_table.frame_list)
+    with libarchive.memory_reader(tar_data) as archive:
+        assert [entry.pathname.rstrip("/") for entry in archive] == [
+            *(str(Path(item).relative_to(prefix)) for item in walk_path(str(root))),
+            package_manifest.get_path(root.name),
+        ]
+
+    for jobs in (1, 4):
+        output_dir = prefix / f"output-{jobs}"
+        output_dir.mkdir()
+        compress_environment(jobs, prefix, 3, 20).decompress_path(package.name, output_dir, dry_run=False)
+        assert _snapshot(output_dir / root.name) == _snapshot(root)
+
+
+@pytest.mark.skipif(shutil.which("zstd") is None, reason="zstd is not installed.")
+def test_seekable_format_tar_compatible(tmpdir: py.path.LocalPath) -> None:
+    """测试tar --zstd可以直接读取可寻址格式的压缩包"""
+
+    prefix = Path(tmpdir)
+    root = _make_toolchain(prefix)
+    compress_environment(2, prefix, 3, 20, 1 << 16).compress_path(root.name, dry_run=False)
+    result = subprocess.run(["tar", "--zstd", "-tf", f"{root.name}.tar.zst"], cwd=prefix, capture_output=True, text=True, check=True)
+    assert f"{root.name}/bin/gcc" in result.stdout.splitlines()
+
+
+def test_delta_package(tmpdir: py.path.LocalPath) -> None:
+    """测试差分包远小于完整压缩包，且可以基于旧压缩包还原出新工具链"""
+
+    prefix = Path(tmpdir)
+    root = _make_toolchain(prefix)
+    env = compress_environment(2, prefix, 3, 20)
+    (prefix / "old").mkdir()
+    (prefix / "new").mkdir()
+    env.compress_path(root.name, prefix / "old", dry_run=False)
+    with (root / "bin" / "gcc").open("r+b") as file:
+        file.seek(1000)
+        file.write(b"patched")
+    (root / "include" / "c++" / "version").write_text("16.0.1\n")
+    env.compress_path(root.name, prefix / "new", dry_run=False)
+
+    old_package, new_package = f"old/{root.name}.tar.zst", f"new/{root.name}.tar.zst"
+    env.make_delta_path(old_package, new_package, dry_run=False)
+    delta_package = prefix / f"{root.name}{zstd_delta_header.suffix}"
+    with delta_package.open("rb") as file:
+        header = zstd_delta_header.load(file)
+    assert header and header.base_name == f"{root.name}.tar.zst"
+    assert delta_package.stat().st_size * 10 < (prefix / new_package).stat().st_size
+
+    output_dir = prefix / "output"
+    output_dir.mkdir()
+    env.decompress_path(delta_package.name, output_dir, base=old_package, dry_run=False)
+    assert _snapshot(output_dir / root.name) == _snapshot(root)
+    with pytest.raises(RuntimeError):
+        env.decompress_path(delta_package.name, prefix / "new", base=new_package, dry_run=False)
+
+
+def test_manifest_verify(tmpdir: py.path.LocalPath) -> None:
+    """测试压缩包附带的清单可以检查出已安装工具链的变化，且重新打包时不会带上旧清单"""
+
+    prefix = Path(tmpdir)
+    root = _make_toolchain(prefix)
+    env = compress_environment(2, prefix, 3, 20)
+    env.compress_path(root.name, dry_run=False)
+    output_dir = prefix / "output"
+    output_dir.mkdir()
+    env.decompress_path(f"{root.name}.tar.zst", output_dir, dry_run=False)
+
+    installed = output_dir / root.name
+    manifest = package_manifest.load(installed / package_manifest.file_name)
+    assert manifest.verify(output_dir, 4) == []
+
+    compress_environment(2, output_dir, 3, 20).compress_path(root.name, dry_run=False)
+    with zstandard.ZstdDecompressor().stream_reader((output_dir / f"{root.name}.tar.zst").open("rb")) as reader:
+        with libarchive.memory_reader(reader.read()) as archive:
+            assert [entry.pathname for entry in archive].count(package_manifest.get_path(root.name)) == 1
+
+    (installed / "include" / "c++" / "vector").write_text("#pragma onc3\n" * 4096)
+    (installed / "bin" / "gcc").chmod(0o700)
+    (installed / "lib" / "libstdc++.a").unlink()
+    assert sorted(manifest.verify(output_dir, 4)) == [
+        f"{root.name}/bin/gcc: mode 0o100700 != 0o100755",
+        f"{root.name}/include/c++/vector: content changed",
+        f"{root.name}/lib/libstdc++.a: missing",
+    ]
+
+
+def test_member_filter() -> None:
+    """测试成员过滤器的匹配规则"""
+
+    selector = member_filter(["bin", "lib/*.a"], ["bin/c++"])
+    assert selector("gcc/") and selector("gcc/bin/") and selector("gcc/bin/gcc") and selector("gcc/lib/libstdc++.a")
+    assert not selector("gcc/bin/c++") and not selector("gcc/lib/libstdc++.so") and not selector("gcc/share/doc")
+    assert not member_filter() and member_filter(exclude_list=["share"])
+
+
+def test_frame_index_continued() -> None:
+    """测试跨越多帧的成员被选中时，其所在的所有帧都会被解压"""
+
+    frame_list = [(i, 1, 1) for i in range(6)]
+    index = zstd_frame_index(
+        [["gcc/", "gcc/share/a"], ["gcc/bin/big"], [], ["gcc/share/b"], ["gcc/share/c"], []],
+        [False, False, True, True, False, False],
+    )
+    assert index.select_frame(frame_list, member_filter(["bin"])) == [frame_list[i] for i in (0, 1, 2, 3, 5)]
+    assert index.select_frame(frame_list, member_filter(["share/c"])) == [frame_list[i] for i in (0, 4, 5)]
+    # 需要第3帧中开始的成员时，需要从跨帧成员的开头解压
+    assert index.select_frame(frame_list, member_filter(["share/b"])) == [frame_list[i] for i in (0, 1, 2, 3, 5)]
+
+
+def test_selective_decompress(tmpdir: py.path.LocalPath, monkeypatch: pytest.MonkeyPatch) -> None:
+    """测试选择性解压只写出被选中的成员，并跳过只包含被排除成员的帧"""
+
+    prefix = Path(tmpdir)
+    root = _make_toolchain(prefix)
+    (root / "share").mkdir()
+    for i in range(8):
+        (root / "share" / f"doc{i}").write_bytes(os.urandom(1 << 16))
+    compress_environment(2, prefix, 3, 20, 1 << 16).compress_path(root.name, dry_run=False)
+
+    frame_count = 0
+    decompress_frame = _parallel_zstd_reader._decompress_frame
+
+    def count_frame(self: _parallel_zstd_reader, *args: typing.Any) -> bytes:
+        nonlocal frame_count
+        frame_count += 1
+        return decompress_frame(self, *args)
+
+    monkeypatch.setattr(_parallel_zstd_reader, "_decompress_frame", count_frame)
+    output_dir = prefix / "output"
+    output_dir.mkdir()
+    selector = member_filter(exclude_list=["share", "include"])
+    compress_environment(1, prefix, 3, 20).decompress_path(f"{root.name}.tar.zst", output_dir, selector=selector, dry_run=False)
+    assert _snapshot(output_dir / root.name) == {key: value for key, value in _snapshot(root).items() if selector(f"{root.name}/{key}")}
+
+    with (prefix / f"{root.name}.tar.zst").open("rb") as file:
+        seek_table = zstd_seek_table.load(file)
+    assert seek_table and frame_count * 2 < len(seek_table.frame_list)
+
+
+def test_auto_compress_level(tmpdir: py.path.LocalPath, monkeypatch: pytest.MonkeyPatch) -> None:
+    """测试自动选择压缩等级，选择结果记录在工具链清单中"""
+
+    assert parse_compress_level("auto") == "auto" and parse_compress_level("9") == 9
+    monkeypatch.setattr(compress_environment, "tune_level_list", [1, 3, 9])
+    monkeypatch.setattr(compress_environment, "tune_sample_block", 1 << 14)
+    prefix = Path(tmpdir)
+    root = _make_toolchain(prefix)
+
+    output_dir = prefix / "output"
+    output_dir.mkdir()
+    env = compress_environment(2, prefix, "auto", 20, compress_time_limit=60)
+    env.compress_path(root.name, dry_run=False)
+    env.decompress_path(f"{root.name}.tar.zst", output_dir, dry_run=False)
+    assert _snapshot(output_dir / root.name) == _snapshot(root)
+    parameters = package_manifest.load(output_dir / package_manifest.get_path(root.name)).metadata["compress"]
+    assert parameters["auto"] and parameters["level"] in (1, 3, 9) and parameters["window_log"] == 20
+
+    # 没有满足目标的参数时使用最快的参数
+    with chdir_guard(prefix):
+        member_list = [*walk_path(root.name)]
+        parameters = compress_environment(2, prefix, "auto", 20, compress_time_limit=1e-12)._tune_compress_parameters(member_list)
+    assert parameters["level"] == 1
+
+
+def test_progress_monitor(tmpdir: py.path.LocalPath) -> None:
+    """测试进度通道统计的数据量与实际的tar流和压缩包大小一致"""
+
+    prefix = Path(tmpdir)
+    root = _make_toolchain(prefix)
+    package = prefix / f"{root.name}.tar.zst"
+    for jobs, frame_size in ((1, 0), (4, 1 << 16)):
+        output_dir = prefix / f"output-{jobs}"
+        output_dir.mkdir()
+        env = compress_environment(jobs, prefix, 3, 20, frame_size)
+        with progress_monitor() as monitor:
+            env.compress_path(root.name, dry_run=False)
+            env.decompress_path(package.name, output_dir, dry_run=False)
+        compress_record = monitor.record_map[("compress", package.name)]
+        decompress_record = monitor.record_map[("decompress", package.name)]
+        assert compress_record.done and decompress_record.done
+        # 并行解压只统计数据帧，不包括成员列表和帧索引表
+        assert compress_record.bytes_out == package.stat().st_size
+        assert (
+            decompress_record.bytes_in == package.stat().st_size if jobs == 1 else 0 < decompress_record.bytes_in < package.stat().st_size
+        )
+        assert compress_record.bytes_in == decompress_record.bytes_out and compress_record.get_ratio() > 1
+    assert not progress_tracker.enabled()
+
+    # 进度行不计入状态计数
+    info_count = status_counter.get_counter("info")
+    with progress_monitor() as monitor:
+        monitor.queue.put(progress_record(package.name, "decompress", 1))
+    assert status_counter.get_counter("info") == info_count
+
+
+def test_hardlink_duplicate_files(tmpdir: py.path.LocalPath) -> None:
+    """测试重复的文件被替换为硬链接，并以硬链接成员写入压缩包"""
+
+    prefix = Path(tmpdir)
+    root = _make_toolchain(prefix)
+    shutil.copy2(root / "bin" / "gcc", root / "bin" / "x86_64-linux-gnu-gcc")
+    os.link(root / "bin" / "gcc", root / "bin" / "gcc-16")
+    shutil.copy2(root / "lib" / "libstdc++.a", root / "libstdc++.a")
+    (root / "libstdc++.a").chmod(0o600)
+    reference_dir = prefix / "reference"
+    reference_dir.mkdir()
+    compress_environment(2, prefix, 3, 20, hardlink=False).compress_path(root.name, reference_dir, dry_run=False)
+    compress_environment(2, prefix, 3, 20).compress_path(root.name, dry_run=False)
+
+    gcc_inode = (root / "bin" / "gcc").stat().st_ino
+    assert (root / "bin" / "x86_64-linux-gnu-gcc").stat().st_ino == (root / "bin" / "gcc-16").stat().st_ino == gcc_inode
+    # 权限不同的文件不能合并
+    assert (root / "libstdc++.a").stat().st_ino != (root / "lib" / "libstdc++.a").stat().st_ino
+
+    package = prefix / f"{root.name}.tar.zst"
+    assert package.stat().st_size < (reference_dir / package.name).stat().st_size
+    with package.open("rb") as file, zstandard.ZstdDecompressor().stream_reader(file, read_across_frames=True) as reader:
+        with libarchive.memory_reader(reader.read()) as archive:
+            link_map = {entry.pathname: entry.linkpath for entry in archive if entry.islnk}
+    assert link_map == {f"{root.name}/bin/{name}": f"{root.name}/bin/gcc" for name in ("x86_64-linux-gnu-gcc", "gcc-16")}
+
+    output_dir = prefix / "output"
+    output_dir.mkdir()
+    compress_environment(2, prefix, 3, 20).decompress_path(package.name, output_dir, dry_run=False)
+    assert _snapshot(output_dir / root.name) == _snapshot(root)
+    # 硬链接成员的摘要取自其链接目标
+    manifest = package_manifest.load(output_dir / package_manifest.get_path(root.name))
+    assert manifest.entry_list == package_manifest.create(prefix, root.name, 1).entry_list
+    assert not manifest.verify(output_dir, 2)
+    installed = output_dir / root.name / "bin"
+    assert (installed / "x86_64-linux-gnu-gcc").stat().st_ino == (installed / "gcc").stat().st_ino
+
+
+@pytest.mark.parametrize("threaded_extract", [False, True])
+@pytest.mark.parametrize("frame_size", [0, 1 << 16])
+def test_exclude_hardlink_target(tmpdir: py.path.LocalPath, threaded_extract: bool, frame_size: int) -> None:
+    """测试硬链接的目标被排除时，第一个被选中的硬链接写为普通文件，其余硬链接指向它"""
+
+    prefix = Path(tmpdir)
+    root = _make_toolchain(prefix)
+    for name in ("x86_64-linux-gnu-gcc", "gcc-16"):
+        shutil.copy2(root / "bin" / "gcc", root / "bin" / name)
+    compress_environment(2, prefix, 3, 20, frame_size).compress_path(root.name, dry_run=False)
+
+    output_dir = prefix / "output"
+    output_dir.mkdir()
+    env = compress_environment(2, prefix, 3, 20, threaded_extract=threaded_extract)
+    selector = member_filter(exclude_list=["bin/gcc"])
+    env.decompress_path(f"{root.name}.tar.zst", output_dir, selector=selector, dry_run=False)
+    expected = {key: value for key, value in _snapshot(root).items() if selector(f"{root.name}/{key}")}
+    assert _snapshot(output_dir / root.name) == expected
+    installed = output_dir / root.name / "bin"
+    assert not (installed / "gcc").exists()
+    assert (installed / "gcc-16").stat().st_ino == (installed / "x86_64-linux-gnu-gcc").stat().st_ino
+
+
+def test_threaded_extract(tmpdir: py.path.LocalPath) -> None:
+    """测试线程池解包与libarchive解包的结果相同，并保留权限和修改时间"""
+
+    prefix = Path(tmpdir)
+    root = _make_toolchain(prefix)
+    for i in range(256):
+        (root / "include" / f"header{i}.h").write_text(f"#define HEADER{i}\n")
+    (root / "include" / "header0.h").chmod(0o600)
+    os.link(root / "lib" / "libstdc++.a", root / "lib" / "libstdc++.a.1")
+    os.utime(root / "include" / "header1.h", (1000000, 1000000))
+    (root / "share").mkdir()
+    (root / "share" / "readme").write_text("readme")
+    os.utime(root / "share", (2000000, 2000000))
+    (root / "share").chmod(0o555)
+    compress_environment(2, prefix, 3, 20).compress_path(root.name, dry_run=False)
+
+    for threaded_extract in (False, True):
+        output_dir = prefix / f"output-{threaded_extract}"
+        output_dir.mkdir()
+        env = compress_environment(4, prefix, 3, 20, threaded_extract=threaded_extract)
+        env.decompress_path(f"{root.name}.tar.zst", output_dir, dry_run=False)
+        installed = output_dir / root.name
+        assert _snapshot(installed) == _snapshot(root)
+        assert (installed / "lib" / "libstdc++.a.1").stat().st_ino == (installed / "lib" / "libstdc++.a").stat().st_ino
+        assert (installed / "include" / "header0.h").stat().st_mode & 0o777 == 0o600
+        assert (installed / "share").stat().st_mode & 0o777 == 0o555
+        assert (installed / "include" / "header1.h").stat().st_mtime == 1000000
+        assert (installed / "share").stat().st_mtime == 2000000
+        (installed / "share").chmod(0o755)
+    (root / "share").chmod(0o755)
+
+
+def test_threaded_extract_escape(tmpdir: py.path.LocalPath) -> None:
+    """测试线程池解包拒绝逃逸出解包目录的成员"""
+
+    prefix = Path(tmpdir)
+    for name in ("../evil", "link/evil"):
+        with libarchive.file_writer(str(prefix / "evil.tar"), "pax") as tar:
+            tar.add_file_from_memory("link", 0, b"", filetype=0o120000, permission=0o777)
+            tar.add_file_from_memory(name, 4, b"evil")
+        output_dir = prefix / "output"
+        output_dir.mkdir(exist_ok=True)
+        with chdir_guard(output_dir), libarchive.file_reader(str(prefix / "evil.tar")) as archive:
+            with pytest.raises(RuntimeError):
+                _parallel_extractor(2, 1 << 20, 1 << 16).extract(archive)
+        assert not (prefix / "evil").exists()
+
+
+def _wait_only_child(dir: Path, child: Path) -> None:
+    """等待后台删除完成，直到目录下只剩下指定的项目
+
+    Args:
+        dir (Path): 目录
+        child (Path): 唯一应当保留的项目
+    """
+
+    for _ in range(100):
+        if [*dir.iterdir()] == [child]:
+            break
+        time.sleep(0.05)
+    assert [*dir.iterdir()] == [child]
+
+
+def test_decompress_swap(tmpdir: py.path.LocalPath) -> None:
+    """测试解压到已有的工具链时先解压到暂存目录再替换，失败时保留旧的工具链"""
+
+    prefix = Path(tmpdir)
+    root = _make_toolchain(prefix)
+    compress_environment(2, prefix, 3, 20).compress_path(root.name, dry_run=False)
+    output_dir = prefix / "output"
+    old_root = output_dir / root.name
+    (old_root / "bin").mkdir(parents=True)
+    (old_root / "bin" / "gcc").write_text("old")
+    (old_root / "stale").write_text("stale")
+
+    for jobs in (1, 2):
+        compress_environment(jobs, prefix, 3, 20).decompress_path(f"{root.name}.tar.zst", output_dir, dry_run=False)
+        assert _snapshot(old_root) == _snapshot(root)
+        # 旧的工具链在后台删除
+        _wait_only_child(output_dir, old_root)
+
+    # 截断的压缩包解压失败时旧的工具链保持不变，暂存目录被删除
+    (prefix / "corrupt").mkdir()
+    corrupt = prefix / "corrupt" / f"{root.name}.tar.zst"
+    corrupt.write_bytes((prefix / f"{root.name}.tar.zst").read_bytes()[:-4096])
+    with pytest.raises(Exception):
+        compress_environment(1, prefix / "corrupt", 3, 20).decompress_path(corrupt.name, output_dir, dry_run=False)
+    assert _snapshot(old_root) == _snapshot(root)
+    _wait_only_child(output_dir, old_root)
+
+
+@pytest.mark.parametrize("frame_size", [0, 1 << 16])
+def test_deterministic_compress(tmpdir: py.path.LocalPath, monkeypatch: pytest.MonkeyPatch, frame_size: int) -> None:
+    """测试可复现模式下相同的目录树总是得到逐字节相同的压缩包"""
+
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+    package_list: list[bytes] = []
+    for i, jobs in enumerate((1, 3)):
+        prefix = Path(tmpdir) / str(i)
+        root = prefix / "x86_64-linux-gnu-gcc16"
+        name_list = [f"header{j}.h" for j in range(32)]
+        # 以不同的顺序和时间创建文件，使目录遍历顺序和时间戳都不同
+        (root / "include").mkdir(parents=True)
+        for name in name_list if i else reversed(name_list):
+            (root / "include" / name).write_text(f"#define {name.replace(".", "_")}\n" * 64)
+            os.utime(root / "include" / name, (1000 * i, 1000 * i))
+        (root / "bin").mkdir()
+        (root / "bin" / "gcc").write_bytes(bytes(range(256)) * 1024)
+        (root / "bin" / "gcc").chmod(0o755)
+        (root / "bin" / "c++").symlink_to("gcc")
+        compress_environment(jobs, prefix, 3, 20, frame_size, deterministic=True).compress_path(root.name, dry_run=False)
+        package_list.append((prefix / f"{root.name}.tar.zst").read_bytes())
+    assert package_list[0] == package_list[1]
+
+    with zstandard.ZstdDecompressor().stream_reader(package_list[0], read_across_frames=True) as reader:
+        with libarchive.memory_reader(reader.read()) as archive:
+            for entry in archive:
+                assert entry.uid == entry.gid == 0
+                assert entry.atime is None and entry.ctime is None
+                assert entry.pathname.endswith(".manifest.json") or entry.mtime == 1700000000
+
+
+@pytest.mark.parametrize("codec", ["zstd", "lz4", "none"])
+def test_package_codec(tmpdir: py.path.LocalPath, codec: typing.Any) -> None:
+    """测试各压缩格式的压缩包可以还原工具链，且解压缩时根据魔数识别压缩格式"""
+
+    if not package_codec.is_available(codec):
+        pytest.skip(f"Codec {codec} is not available.")
+    prefix = Path(tmpdir)
+    root = _make_toolchain(prefix)
+    compress_environment(2, prefix, 3, 20, codec=codec).compress_path(root.name, dry_run=False)
+    package = prefix / f"{root.name}{package_codec.get_suffix(codec)}"
+    with package.open("rb") as file:
+        assert package_codec.detect(file) == codec
+    assert toolchains_package(package)
+
+    for jobs in (1, 2):
+        output_dir = prefix / f"output{jobs}"
+        output_dir.mkdir()
+        # 解压缩环境中的压缩格式与压缩包无关
+        compress_environment(jobs, prefix, 3, 20).decompress_path(package.name, output_dir, dry_run=False)
+        assert _snapshot(output_dir / root.name) == _snapshot(root)
+
+    # 后缀正确但魔数无法识别的文件不是工具链
+    (prefix / "broken").mkdir()
+    broken = prefix / "broken" / package.name
+    broken.write_bytes(b"\0" * 1024)
+    assert not toolchains_package(broken)
+
+
+@pytest.mark.skipif(shutil.which("gcc") is None, reason="gcc is required.")
+@pytest.mark.parametrize("debug_info", ["compress", "split"])
+def test_debug_info(tmpdir: py.path.LocalPath, debug_info: typing.Any) -> None:
+    """测试打包前压缩或拆分调试信息，硬链接和修改时间保持不变，拆分的调试信息按build-id布局打包"""
+
+    prefix = Path(tmpdir)
+    root = prefix / "x86_64-linux-gnu-gcc16"
+    (root / "bin").mkdir(parents=True)
+    source = prefix / "main.c"
+    source.write_text("int main(void) { return 0; }\n")
+    subprocess.run(["gcc", "-g", "-Wl,--build-id", "-o", root / "bin" / "main", source], check=True)
+    subprocess.run(["gcc", "-g", "-Wl,--build-id=none", "-o", root / "bin" / "no-build-id", source], check=True)
+    os.link(root / "bin" / "main", root / "bin" / "main-link")
+    os.utime(root / "bin" / "main", (1000000, 1000000))
+    build_id = elf_section_table.load(str(root / "bin" / "main")).build_id  # type: ignore[union-attr]
+    assert build_id
+
+    compress_environment(2, prefix, 3, 20, debug_info=debug_info).compress_path(root.name, dry_run=False)
+    main = elf_section_table.load(str(root / "bin" / "main"))
+    no_build_id = elf_section_table.load(str(root / "bin" / "no-build-id"))
+    assert main and no_build_id and main.build_id == build_id
+    assert (root / "bin" / "main").samefile(root / "bin" / "main-link")
+    assert (root / "bin" / "main").stat().st_mtime == 1000000
+    subprocess.run([root / "bin" / "main"], check=True)
+    # 没有build-id的文件总是原地压缩调试信息节
+    assert no_build_id.get_debug_size() and no_build_id.is_debug_compressed()
+    debug_root = prefix / f"{root.name}{compress_environment.debug_suffix}"
+    if debug_info == "split":
+        assert not main.get_debug_size()
+        debug_file = debug_root / ".build-id" / build_id[:2] / f"{build_id[2:]}.debug"
+        debug = elf_section_table.load(str(debug_file))
+        assert debug and debug.get_debug_size()
+        assert (prefix / f"{debug_root.name}.tar.zst").is_file()
+        # 再次处理已剥离的工具链时保留之前拆分出的调试信息，并随工具链一同打包
+        debug_data = debug_file.read_bytes()
+        (prefix / f"{debug_root.name}.tar.zst").unlink()
+        compress_environment(2, prefix, 3, 20, debug_info=debug_info).compress_path(root.name, dry_run=False)
+        assert debug_file.read_bytes() == debug_data
+        assert (prefix / f"{debug_root.name}.tar.zst").is_file()
+    else:
+        assert main.get_debug_size() and main.is_debug_compressed()
+        assert not debug_root.exists()
+
+
+def test_debug_info_read_only(tmpdir: py.path.LocalPath) -> None:
+    """测试只读ELF文件也可以原地压缩调试信息，并且保持原来的权限"""
+
+    prefix = Path(tmpdir)
+    root = prefix / "x86_64-linux-gnu-gcc16"
+    (root / "bin").mkdir(parents=True)
+    source = prefix / "main.c"
+    source.write_text("int main(void) { return 0; }\n")
+    subprocess.run(["gcc", "-g", "-o", root / "bin" / "main", source], check=True)
+    (root / "bin" / "main").chmod(0o555)
+
+    compress_environment(2, prefix, 3, 20, debug_info="compress").compress_path(root.name, dry_run=False)
+    main = elf_section_table.load(str(root / "bin" / "main"))
+    assert main and main.is_debug_compressed()
+    assert stat.S_IMODE((root / "bin" / "main").stat().st_mode) == 0o555
+
+
+def test_elf_malformed_header() -> None:
+    """测试节头表损坏或节名索引超出范围的ELF头不会导致异常"""
+
+    header = bytearray(elf_section_table.header_size)
+    header[:6] = elf_section_table.magic + b"\x02\x01"
+    struct.pack_into("<Q", header, 0x28, 64)
+    data = bytes(header) + bytes(64 * 4)
+
+    def read(offset: int, size: int) -> bytes:
+        return data[offset : offset + size]
+
+    for shentsize, shnum, shstrndx in ((64, 4, 4), (64, 4, 0xFFFF), (16, 4, 1), (64, 8, 1)):
+        struct.pack_into("<3H", header, 0x3A, shentsize, shnum, shstrndx)
+        table = elf_section_table.parse_header(bytes(header))
+        assert table and not table.load_sections(read)
+
+
+@pytest.mark.parametrize("threaded_extract", [False, True])
+def test_split_components(tmpdir: py.path.LocalPath, threaded_extract: bool) -> None:
+    """测试按组件拆分压缩包，并且可以根据索引只安装选择的组件"""
+
+    prefix = Path(tmpdir)
+    root = _make_toolchain(prefix)
+    file_map = {
+        "bin/x86_64-linux-gnu-gdb": "gdb",
+        "share/gdb/python/gdb/__init__.py": "gdb",
+        "share/libc++/v1/std.cppm": "modules",
+        "x86_64-linux-gnu/lib/libc.so": "target-x86_64-linux-gnu",
+        "lib/clang/23/lib/aarch64-unknown-linux-gnu/libclang_rt.builtins.a": "target-aarch64-unknown-linux-gnu",
+    }
+    for file, component in file_map.items():
+        (root / file).parent.mkdir(parents=True, exist_ok=True)
+        (root / file).write_text(component)
+    os.link(root / "bin" / "gcc", root / "x86_64-linux-gnu" / "lib" / "gcc")
+    compress_environment(2, prefix, 3, 20, split_components=True).compress_path(root.name, dry_run=False)
+
+    index_file = prefix / package_component_index.get_path(root.name)
+    assert package_component_index.is_index(index_file)
+    index = package_component_index.load(index_file)
+    assert sorted(index.component_map) == sorted({"core", *file_map.values()})
+    assert all(file.is_file() for file in index.get_package_list(prefix))
+    assert not (prefix / f"{root.name}.tar.zst").exists()
+
+    output_dir = prefix / "output"
+    output_dir.mkdir()
+    env = compress_environment(4, prefix, 3, 20, threaded_extract=threaded_extract)
+    env.decompress_components(index_file.name, ["core", "target-x86_64-*"], output_dir, dry_run=False)
+    installed = output_dir / root.name
+    expected = {
+        item: value
+        for item, value in _snapshot(root).items()
+        if not (root / item).is_dir() and package_component_index.get_component(item) in ("core", "target-x86_64-linux-gnu")
+    }
+    assert {item: value for item, value in _snapshot(installed).items() if not (installed / item).is_dir()} == expected
+    assert not (installed / "share" / "libc++").exists()
+    manifest = package_manifest.load(installed / package_manifest.file_name)
+    assert manifest.metadata["component"] == ["core", "target-x86_64-linux-gnu"]
+    assert manifest.verify(output_dir, 4) == []
+
+    # 之后安装的组件不会删除已安装的组件
+    gcc_inode = (installed / "bin" / "gcc").stat().st_ino
+    env.decompress_components(index_file.name, ["gdb"], output_dir, dry_run=False)
+    expected.update(
+        (item, value)
+        for item, value in _snapshot(root).items()
+        if not (root / item).is_dir() and package_component_index.get_component(item) == "gdb"
+    )
+    assert {item: value for item, value in _snapshot(installed).items() if not (installed / item).is_dir()} == expected
+    assert (installed / "bin" / "gcc").stat().st_ino == gcc_inode
+    manifest = package_manifest.load(installed / package_manifest.file_name)
+    assert manifest.metadata["component"] == [
+        component for component in index.component_map if component in ("core", "gdb", "target-x86_64-linux-gnu")
+    ]
+    assert manifest.verify(output_dir, 4) == []
+
+    with pytest.raises(AssertionError):
+        env.decompress_components(index_file.name, ["no-such-component"], output_dir, dry_run=False)
+    env.decompress_components(index_file.name, [], output_dir, dry_run=False)
+    assert _snapshot(installed) == _snapshot(root)
@@ -0,0 +1,348 @@
+import hashlib
+import http.server
+import json
+import random
+import re
+import shutil
+import subprocess
+import threading
+import time
+import typing
+from pathlib import Path
+
+import py  # type: ignore
+import pytest
+
+from toolchains.common import command_quiet, toolchains_quiet
+from toolchains.download import (
+    _run_git_command,
+    after_download_list,
+    all_lib_list,
+    clone_git_libs,
+    configure,
+    download_specific_file,
+    git_url,
+    http_downloader,
+    mirror_ranking,
+    update_git_libs,
+)
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is required.")
+
+
+def _git(repo: Path, *args: str) -> str:
+    """在repo中运行git命令
+
+    Args:
+        repo (Path): git仓库
+        args (str): git参数
+
+    Returns:
+        str: 命令输出
+    """
+
+    command = ["git", "-C", str(repo), "-c", "user.name=test", "-c", "user.email=test@example.com", *args]
+    return subprocess.run(command, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def _make_repo(root: Path, name: str) -> git_url:
+    """在root下创建一个只有一个提交的git仓库
+
+    Args:
+        root (Path): 仓库所在目录
+        name (str): 仓库名称
+
+    Returns:
+        git_url: 使用file协议访问该仓库的远程源
+    """
+
+    repo = root / name
+    repo.mkdir(parents=True)
+    (repo / "README").write_text(name)
+    subprocess.run(["git", "init", "-q", str(repo)], check=True)
+    _git(repo, "add", "README")
+    _git(repo, "commit", "-q", "-m", "init")
+    return git_url("", str(repo).lstrip("/"), "file")
+
+
+def test_sort_by_size() -> None:
+    """测试并行克隆时较大的仓库排在前面，未知仓库保持原有顺序排在最后"""
+
+    assert {*all_lib_list.git_lib_size_order} == {*all_lib_list.git_lib_list_github}
+    assert all_lib_list.sort_by_size(["zlib", "unknown", "gcc", "linux", "other"]) == ["linux", "gcc", "zlib", "unknown", "other"]
+
+
+def test_clone_git_libs(tmpdir: py.path.LocalPath, capsys: pytest.CaptureFixture[str]) -> None:
+    """测试并行克隆所有缺失的git包，已存在的包被跳过，失败的包独立重试且不影响其他包"""
+
+    toolchains_quiet.set(False)
+    prefix = Path(tmpdir)
+    home = prefix / "home"
+    (home / "exist").mkdir(parents=True)
+    lib_list = {name: _make_repo(prefix / "remote", name) for name in ("zlib", "gcc", "linux", "exist")}
+    lib_list["broken"] = git_url("", str(prefix / "remote" / "missing").lstrip("/"), "file")
+    config = configure(home=str(home), clone_type="full", retry=1, network_jobs=3)
+
+    with pytest.raises(RuntimeError, match="broken"):
+        clone_git_libs(config, {name: [url] for name, url in lib_list.items()})
+    for name in ("zlib", "gcc", "linux"):
+        assert (home / name / "README").read_text() == name
+    assert not (home / "exist" / "README").exists()
+    assert not (home / "broken").exists()
+    output = capsys.readouterr().out
+    assert output.count("Clone broken failed, retrying.") == config.network_try_times
+    assert "Lib exist exists, skip download." in output
+
+    clone_git_libs(config, {name: [lib_list[name]] for name in ("zlib", "gcc")})
+    assert "Lib gcc exists, skip download." in capsys.readouterr().out
+
+
+def test_update_git_libs(tmpdir: py.path.LocalPath, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]) -> None:
+    """测试并行更新时只快进有远程更新的包，且只为这些包执行下载后的回调函数"""
+
+    toolchains_quiet.set(False)
+    prefix = Path(tmpdir)
+    home = prefix / "home"
+    home.mkdir()
+    lib_list = {name: _make_repo(prefix / "remote", name) for name in ("zlib", "gcc", "linux")}
+    config = configure(home=str(home), clone_type="full", retry=0, network_jobs=2)
+    clone_git_libs(config, {name: [url] for name, url in lib_list.items()})
+
+    (prefix / "remote" / "gcc" / "README").write_text("new")
+    _git(prefix / "remote" / "gcc", "commit", "-q", "-am", "update")
+    _git(home / "zlib", "commit", "-q", "--allow-empty", "-m", "local")
+    hook_list: list[str] = []
+    monkeypatch.setattr(after_download_list, "after_download_specific_lib", lambda config, lib: hook_list.append(lib))
+    capsys.readouterr()
+    update_git_libs(config, lib_list)
+    assert hook_list == ["gcc"]
+    assert (home / "gcc" / "README").read_text() == "new"
+    assert _git(home / "gcc", "rev-parse", "HEAD") == _git(prefix / "remote" / "gcc", "rev-parse", "HEAD")
+    output = capsys.readouterr().out
+    assert "Lib linux is up to date, skip update." in output
+    assert "Lib zlib is up to date, skip update." in output
+
+    # 本地分支与上游分支分叉时无法快进，但不影响其他包的更新
+    _git(prefix / "remote" / "zlib", "commit", "-q", "--allow-empty", "-m", "update")
+    _git(prefix / "remote" / "linux", "commit", "-q", "--allow-empty", "-m", "update")
+    hook_list.clear()
+    with pytest.raises(RuntimeError, match="zlib"):
+        update_git_libs(config, lib_list)
+    assert hook_list == ["linux"]
+    assert "Lib zlib has diverged from upstream, cannot fast-forward." in capsys.readouterr().out
+
+
+def test_object_cache(tmpdir: py.path.LocalPath, monkeypatch: pytest.MonkeyPatch) -> None:
+    """测试多个源码树共享对象缓存，克隆和更新时只需获取缓存中缺失的对象"""
+
+    prefix = Path(tmpdir)
+    cache = prefix / "cache"
+    url = _make_repo(prefix / "remote", "zlib")
+    monkeypatch.setattr(after_download_list, "after_download_specific_lib", lambda config, lib: None)
+    config_list = [configure(home=str(prefix / home), retry=0, object_cache=str(cache)) for home in ("home1", "home2")]
+    for config in config_list:
+        config.home.mkdir()
+        clone_git_libs(config, {"zlib": [url]})
+        lib_dir = config.home / "zlib"
+        assert (lib_dir / "README").read_text() == "zlib"
+        assert (lib_dir / ".git" / "objects" / "info" / "alternates").read_text().strip() == str(cache / "zlib.git" / "objects")
+        # 所有对象均来自缓存
+        assert "count: 0" in _git(lib_dir, "count-objects", "-v") and "in-pack: 0" in _git(lib_dir, "count-objects", "-v")
+
+    (prefix / "remote" / "zlib" / "README").write_text("new")
+    _git(prefix / "remote" / "zlib", "commit", "-q", "-am", "update")
+    head = _git(prefix / "remote" / "zlib", "rev-parse", "HEAD")
+    update_git_libs(config_list[0], ["zlib"])
+    assert _git(cache / "zlib.git", "rev-parse", "HEAD") == head
+    assert (config_list[0].home / "zlib" / "README").read_text() == "new"
+    assert "in-pack: 0" in _git(config_list[0].home / "zlib", "count-objects", "-v")
+    assert config_list[0].encode()["object_cache"] == str(cache)
+
+
+def test_clone_failover(tmpdir: py.path.LocalPath, capsys: pytest.CaptureFixture[str]) -> None:
+    """测试有多个远程源时，克隆失败后切换到下一个源"""
+
+    toolchains_quiet.set(False)
+    prefix = Path(tmpdir)
+    url_list = [git_url("", str(prefix / "remote" / "missing").lstrip("/"), "file"), _make_repo(prefix / "remote", "zlib")]
+    config = configure(home=str(prefix / "home"), clone_type="full", retry=1)
+    (prefix / "home").mkdir()
+    clone_git_libs(config, {"zlib": url_list})
+    assert (prefix / "home" / "zlib" / "README").read_text() == "zlib"
+    output = capsys.readouterr().out
+    assert output.count("Clone zlib failed, retrying.") == 1
+    assert f"Clone zlib from {url_list[1].get_url(False)}." in output
+
+
+def test_git_stall_quiet(monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]) -> None:
+    """测试静默模式下仍然检测git传输停滞，且不打印进度行"""
+
+    toolchains_quiet.set(False)
+    monkeypatch.setattr(http_downloader, "slow_window", 0.5)
+    monkeypatch.setattr("toolchains.download._progress_interval", 0.1)
+    command = "sh -c 'printf \"Receiving objects:  1%% (1/100), 1.00 KiB | 1.00 KiB/s\\r\" >&2; sleep 30' sh"
+    command_quiet.set(True)
+    try:
+        start = time.monotonic()
+        with pytest.raises(RuntimeError, match="slower than"):
+            _run_git_command("zlib", command, 64 << 10)
+        assert time.monotonic() - start < 10
+    finally:
+        command_quiet.set(False)
+    assert "Receiving objects" not in capsys.readouterr().out
+
+
+def test_mirror_ranking(tmpdir: py.path.LocalPath, monkeypatch: pytest.MonkeyPatch) -> None:
+    """测试按延迟排序镜像源，不可用的源排在最后，缓存在有效期内被复用"""
+
+    prefix = Path(tmpdir)
+    good = _make_repo(prefix / "remote", "zlib").get_url(False)
+    missing = f"file://{prefix / 'remote' / 'missing'}"
+    ranking = mirror_ranking(prefix)
+    ranking.probe([missing, good], [])
+    assert ranking.latency_map[missing][1] is None
+    assert ranking.rank([missing, good, "unknown"]) == [good, missing, "unknown"]
+
+    # 有效期内读取缓存，不再探测
+    monkeypatch.setattr(mirror_ranking, "probe_git", classmethod(lambda cls, url: pytest.fail(f"Probe {url} again.")))
+    ranking = mirror_ranking(prefix)
+    ranking.probe([missing, good], [])
+    assert ranking.rank([missing, good]) == [good, missing]
+
+    # 缓存过期后重新探测
+    monkeypatch.setattr(mirror_ranking, "ttl", 0)
+    monkeypatch.setattr(mirror_ranking, "probe_git", classmethod(lambda cls, url: 1.0 if url == missing else None))
+    ranking = mirror_ranking(prefix)
+    ranking.probe([missing, good], [])
+    assert ranking.rank([good, missing]) == [missing, good]
+
+
+class _range_handler(http.server.BaseHTTPRequestHandler):
+    """支持Range请求的HTTP服务器，用于代替真实的下载源"""
+
+    data: typing.ClassVar[bytes] = b""
+    accept_range: typing.ClassVar[bool] = True
+    bytes_sent: typing.ClassVar[int] = 0
+    delay: typing.ClassVar[float] = 0  # 每发送16KiB后的延迟(秒)，用于模拟慢速镜像
+
+    def log_message(self, *_: typing.Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        if self.path != "/file-1.0.tar.xz":
+            self.send_error(404)
+            return
+        data = type(self).data
+        if self.accept_range and (match := re.fullmatch(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))):
+            start, end = int(match[1]), min(int(match[2]), len(data) - 1)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+            body = data[start : end + 1]
+        else:
+            self.send_response(200)
+            body = data
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            if self.delay:
+                for i in range(0, len(body), 16 << 10):
+                    self.wfile.write(body[i : i + (16 << 10)])
+                    time.sleep(self.delay)
+            else:
+                self.wfile.write(body)
+        except ConnectionError:
+            # 下载器收到不支持Range请求的探测响应后直接关闭连接
+            return
+        type(self).bytes_sent += len(body)
+
+
+@pytest.fixture
+def http_url() -> typing.Generator[str, None, None]:
+    """在后台线程中启动支持Range请求的HTTP服务器
+
+    Yields:
+        typing.Generator[str, None, None]: 服务器上文件的链接
+    """
+
+    _range_handler.data = random.Random(0).randbytes(5 << 20)
+    _range_handler.accept_range = True
+    _range_handler.bytes_sent = 0
+    _range_handler.delay = 0
+    with http.server.ThreadingHTTPServer(("127.0.0.1", 0), _range_handler) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{server.server_address[1]}/file-1.0.tar.xz"
+        server.shutdown()
+
+
+@pytest.mark.parametrize("accept_range", [True, False])
+def test_http_downloader(tmpdir: py.path.LocalPath, http_url: str, accept_range: bool) -> None:
+    """测试分段下载和单连接下载的结果与源文件相同，并校验摘要"""
+
+    _range_handler.accept_range = accept_range
+    file = Path(tmpdir) / "file.tar.xz"
+    sha256 = hashlib.sha256(_range_handler.data).hexdigest()
+    downloader = http_downloader(http_url, file, 4, sha256)
+    downloader.download(dry_run=False)
+    assert file.read_bytes() == _range_handler.data
+    assert not downloader.part_file.exists() and not downloader.state_file.exists()
+    if accept_range:
+        # 探测请求只发送1字节
+        assert _range_handler.bytes_sent == len(_range_handler.data) + 1
+
+    downloader = http_downloader(http_url, file, 4, "0" * 64)
+    with pytest.raises(RuntimeError, match="SHA-256"):
+        downloader.download(dry_run=False)
+    assert not downloader.part_file.exists() and not downloader.state_file.exists()
+
+
+def test_http_downloader_resume(tmpdir: py.path.LocalPath, http_url: str) -> None:
+    """测试从中断处继续下载，只请求尚未下载的部分"""
+
+    file = Path(tmpdir) / "file.tar.xz"
+    data = _range_handler.data
+    downloader = http_downloader(http_url, file, 4)
+    segment_list = downloader._plan_segment_list(len(data))
+    # 模拟第一个分段下载了一半、第三个分段已完成后中断
+    segment_list[0][2] = (segment_list[0][1] - segment_list[0][0]) // 2
+    segment_list[2][2] = segment_list[2][1] - segment_list[2][0]
+    part = bytearray(len(data))
+    for start, end, done in segment_list:
+        part[start : start + done] = data[start : start + done]
+    downloader.part_file.write_bytes(part)
+    downloader.state_file.write_text(json.dumps({"url": http_url, "size": len(data), "segment_list": segment_list}))
+
+    downloader.download(dry_run=False)
+    assert file.read_bytes() == data
+    assert _range_handler.bytes_sent == len(data) + 1 - sum(done for _, _, done in segment_list)
+
+
+def test_http_downloader_slow(tmpdir: py.path.LocalPath, http_url: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """测试下载速度持续低于下限时停止下载"""
+
+    _range_handler.delay = 0.05
+    monkeypatch.setattr(http_downloader, "slow_window", 0.5)
+    monkeypatch.setattr(http_downloader, "progress_interval", 0.1)
+    downloader = http_downloader(http_url, Path(tmpdir) / "file.tar.xz", 4, min_speed=16 << 20)
+    with pytest.raises(RuntimeError, match="slower than"):
+        downloader.download(dry_run=False)
+
+
+def test_download_failover(tmpdir: py.path.LocalPath, http_url: str, capsys: pytest.CaptureFixture[str]) -> None:
+    """测试有多个镜像时，下载失败后切换到下一个镜像"""
+
+    toolchains_quiet.set(False)
+    home = Path(tmpdir)
+    config = configure(home=str(home), retry=1)
+    url_list = [http_url.replace("file-1.0", "missing-1.0"), http_url]
+    download_specific_file(config, Path("file.tar.xz"), url_list)
+    assert (home / "file.tar.xz").read_bytes() == _range_handler.data
+    output = capsys.readouterr().out
+    assert output.count("Download file.tar.xz failed, retrying.") == 1
+    assert f"Download file.tar.xz from {http_url}." in output
+    # 没有记录摘要的文件下载后给出警告并打印摘要，要求记录摘要时拒绝下载
+    assert f"its SHA-256 is {hashlib.sha256(_range_handler.data).hexdigest()}" in output
+    config = configure(home=str(home), retry=1, require_sha256=True)
+    with pytest.raises(RuntimeError, match="No SHA-256 digest recorded"):
+        download_specific_file(config, Path("other.tar.xz"), url_list)
+    assert not (home / "other.tar.xz").exists()
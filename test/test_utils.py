@@ -0,0 +1,219 @@
+import json
+import os
+import shutil
+import subprocess
+import typing
+from pathlib import Path
+
+import py  # type: ignore
+import pytest
+
+from toolchains.common import package_component_index, toolchains_quiet
+from toolchains.utils import _select_component_index, _split_jobs, analyze, benchmark, compress, compress_configure, decompress, delta
+
+
+def test_split_jobs() -> None:
+    """测试按未压缩大小分配线程数"""
+
+    assert _split_jobs([600, 300, 100], 10) == [6, 3, 1]
+    assert _split_jobs([1000, 1, 0], 4) == [4, 1, 1]
+    assert _split_jobs([0, 0], 4) == [1, 1]
+
+
+def test_select_component_index(tmpdir: py.path.LocalPath) -> None:
+    """测试只选择包含所需组件的索引，每个通配符只需匹配某一个索引"""
+
+    prefix = Path(tmpdir)
+    gcc_index, clang_index = prefix / "x86_64-linux-gnu-gcc16.components.json", prefix / "x86_64-linux-gnu-clang22.components.json"
+    gcc_index.write_bytes(package_component_index("x86_64-linux-gnu-gcc16", {"core": {}, "gdb": {}}).dump())
+    clang_index.write_bytes(package_component_index("x86_64-linux-gnu-clang22", {"core": {}, "modules": {}}).dump())
+    assert _select_component_index([gcc_index, clang_index], ["gdb"]) == [gcc_index]
+    assert _select_component_index([gcc_index, clang_index], ["gdb", "modules"]) == [gcc_index, clang_index]
+    with pytest.raises(AssertionError, match="target-\\*"):
+        _select_component_index([gcc_index, clang_index], ["gdb", "target-*"])
+
+
+def test_configure_check(tmpdir: py.path.LocalPath) -> None:
+    """测试压缩配置检查拒绝非法的参数组合"""
+
+    prefix = Path(tmpdir)
+    (prefix / "x86_64-linux-gnu-gcc16").mkdir()
+    compress_configure(item_list=["x86_64-linux-gnu-gcc16"], prefix_dir=str(prefix)).check(True)
+    compress_configure(item_list=["x86_64-linux-gnu-gcc16"], prefix_dir=str(prefix)).check(None)
+    with pytest.raises(AssertionError, match="zstd codec"):
+        compress_configure(prefix_dir=str(prefix), codec="none", frame_size=1).check(True)
+    with pytest.raises(AssertionError, match="memory limit"):
+        compress_configure(prefix_dir=str(prefix), memory_limit=-5).check(True)
+    with pytest.raises(AssertionError, match="not a toolchain package"):
+        compress_configure(item_list=["x86_64-linux-gnu-gcc16"], prefix_dir=str(prefix)).check(False)
+
+
+def test_parallel_compress(tmpdir: py.path.LocalPath) -> None:
+    """测试并行压缩多个工具链后可以完整还原"""
+
+    prefix = Path(tmpdir)
+    name_list = [f"x86_64-linux-gnu-gcc{version}" for version in (14, 15, 16)]
+    for i, name in enumerate(name_list):
+        (prefix / name / "bin").mkdir(parents=True)
+        (prefix / name / "bin" / "gcc").write_bytes(bytes(range(256)) * (1024 << i))
+    # 调试信息包不作为单独的工具链并行压缩，而是随对应的工具链一同打包
+    debug_file = prefix / f"{name_list[0]}-debug" / ".build-id" / "ab" / "cdef.debug"
+    debug_file.parent.mkdir(parents=True)
+    debug_file.write_bytes(b"debug")
+    config = compress_configure(
+        prefix_dir=str(prefix), jobs=4, compress_level=3, long_distance_match=20, output_dir=str(prefix / "package")
+    )
+    compress(config)
+    package_list = sorted(f"{name}.tar.zst" for name in [*name_list, f"{name_list[0]}-debug"])
+    assert sorted(file.name for file in (prefix / "package").iterdir()) == package_list
+
+    config = compress_configure(
+        prefix_dir=str(prefix / "package"), jobs=2, compress_level=3, long_distance_match=20, output_dir=str(prefix / "output")
+    )
+    decompress(config)
+    for name in name_list:
+        assert (prefix / "output" / name / "bin" / "gcc").read_bytes() == (prefix / name / "bin" / "gcc").read_bytes()
+    assert (prefix / "output" / debug_file.relative_to(prefix)).read_bytes() == b"debug"
+
+
+def test_delta_base(tmpdir: py.path.LocalPath) -> None:
+    """测试解压多个差分包时，每个差分包使用头部记录的基础包"""
+
+    prefix = Path(tmpdir)
+    name_list = [f"x86_64-linux-gnu-gcc{version}" for version in (15, 16)]
+    for i, name in enumerate(name_list):
+        (prefix / name / "bin").mkdir(parents=True)
+        (prefix / name / "bin" / "gcc").write_bytes(os.urandom(1 << 16) * (i + 1))
+    compress(compress_configure(prefix_dir=str(prefix), jobs=2, compress_level=3, long_distance_match=20, output_dir=str(prefix / "old")))
+    for name in name_list:
+        with (prefix / name / "bin" / "gcc").open("r+b") as file:
+            file.write(b"patched")
+    compress(compress_configure(prefix_dir=str(prefix), jobs=2, compress_level=3, long_distance_match=20, output_dir=str(prefix / "new")))
+    for name in name_list:
+        delta(
+            compress_configure(
+                [f"old/{name}.tar.zst", f"new/{name}.tar.zst"], str(prefix / "delta"), prefix_dir=str(prefix), long_distance_match=20
+            )
+        )
+
+    for base in ("../old", f"../old/{name_list[0]}.tar.zst"):
+        output_dir = prefix / "output"
+        shutil.rmtree(output_dir, ignore_errors=True)
+        decompress(
+            compress_configure(prefix_dir=str(prefix / "delta"), jobs=2, long_distance_match=20, base=base, output_dir=str(output_dir))
+        )
+        for name in name_list:
+            assert (output_dir / name / "bin" / "gcc").read_bytes() == (prefix / name / "bin" / "gcc").read_bytes()
+
+
+def test_memory_limit(tmpdir: py.path.LocalPath, capsys: typing.Any) -> None:
+    """测试根据内存预算选择线程数、窗口大小和同时解压的压缩包数，并报告峰值常驻内存"""
+
+    prefix = Path(tmpdir)
+    env = compress_configure(prefix_dir=str(prefix), jobs=8, compress_level=3, long_distance_match=27, memory_limit=1024).to_environment()
+    assert env._plan_compress_memory(27) == (2, 27)
+    env.memory_limit = 100 << 20
+    assert env._plan_compress_memory(27) == (1, 24)
+    env.deterministic = True
+    assert env._plan_compress_memory(27) == (1, 27)
+
+    name_list = [f"x86_64-linux-gnu-gcc{version}" for version in (15, 16)]
+    for name in name_list:
+        (prefix / name / "bin").mkdir(parents=True)
+        (prefix / name / "bin" / "gcc").write_bytes(os.urandom(1 << 20))
+    config = compress_configure(
+        prefix_dir=str(prefix),
+        jobs=4,
+        compress_level=3,
+        long_distance_match=20,
+        frame_size=1,
+        memory_limit=64,
+        output_dir=str(prefix / "package"),
+    )
+    toolchains_quiet.set(False)
+    compress(config)
+    assert "Peak RSS" in capsys.readouterr().out
+
+    env = compress_configure(prefix_dir=str(prefix / "package"), jobs=4, long_distance_match=20).to_environment()
+    path_list = [f"{name}.tar.zst" for name in name_list]
+    assert env.plan_decompress_memory(path_list) == (2, 2)
+    assert env.plan_decompress_memory(path_list[:1]) == (1, 4)
+    env.memory_limit = env.estimate_decompress_memory(path_list[0], 2) * 2
+    assert env.plan_decompress_memory(path_list) == (2, 2)
+    env.memory_limit = env.estimate_decompress_memory(path_list[0], 1) + 1
+    assert env.plan_decompress_memory(path_list) == (1, 1)
+
+    config = compress_configure(
+        prefix_dir=str(prefix / "package"), jobs=4, long_distance_match=20, memory_limit=64, output_dir=str(prefix / "output")
+    )
+    decompress(config)
+    for name in name_list:
+        assert (prefix / "output" / name / "bin" / "gcc").read_bytes() == (prefix / name / "bin" / "gcc").read_bytes()
+
+
+def test_benchmark(tmpdir: py.path.LocalPath, capsys: typing.Any) -> None:
+    """测试基准测试比较两种解包方式和各压缩格式"""
+
+    prefix = Path(tmpdir)
+    name = "x86_64-linux-gnu-gcc16"
+    for i in range(16):
+        (prefix / name / "include" / str(i)).mkdir(parents=True)
+        (prefix / name / "include" / str(i) / "header.h").write_text(f"#define HEADER{i}\n")
+    compress(compress_configure(prefix_dir=str(prefix), jobs=1, compress_level=3, long_distance_match=20, output_dir=str(prefix)))
+    toolchains_quiet.set(False)
+    benchmark(compress_configure(prefix_dir=str(prefix), jobs=2, long_distance_match=20, output_dir=str(prefix / "benchmark")))
+    output = capsys.readouterr().out
+    assert "libarchive" in output and "threaded" in output
+    assert "Codec benchmark" in output and all(f" {codec} " in output for codec in ("zstd", "none"))
+    assert [*(prefix / "benchmark").iterdir()] == []
+
+
+@pytest.mark.skipif(shutil.which("gcc") is None or shutil.which("ar") is None, reason="gcc and ar are required.")
+def test_analyze(tmpdir: py.path.LocalPath, capsys: typing.Any) -> None:
+    """测试分析工具链目录和压缩包得到一致的按目录和按类型统计"""
+
+    prefix = Path(tmpdir)
+    root = prefix / "x86_64-linux-gnu-gcc16"
+    for dir in ("bin", "lib/python3/site-packages", "include/c++"):
+        (root / dir).mkdir(parents=True)
+    source = prefix / "main.c"
+    source.write_text("int main(void) { return 0; }\n")
+    subprocess.run(["gcc", "-g", "-o", root / "bin" / "debug", source], check=True)
+    subprocess.run(["gcc", "-s", "-o", root / "bin" / "stripped", source], check=True)
+    subprocess.run(["gcc", "-c", "-o", prefix / "main.o", source], check=True)
+    subprocess.run(["ar", "rc", root / "lib" / "libmain.a", prefix / "main.o"], check=True)
+    (root / "include" / "c++" / "vector").write_text("#pragma once\n" * 1024)
+    (root / "lib" / "python3" / "site-packages" / "main.py").write_text("print('hello')\n" * 256)
+    (root / "README").write_text("readme\n")
+    compress(compress_configure(prefix_dir=str(prefix), jobs=1, compress_level=3, long_distance_match=20, output_dir=str(prefix)))
+
+    config = compress_configure(
+        [root.name, f"{root.name}.tar.zst"], prefix_dir=str(prefix), jobs=1, long_distance_match=20, output_dir=str(prefix)
+    )
+    analyze(config, 3, str(prefix / "report.json"))
+    dir_report, package_report = json.loads((prefix / "report.json").read_text())
+    for report in (dir_report, package_report):
+        assert report["name"] == root.name
+        assert {type: counter["files"] for type, counter in report["by_type"].items()} == {
+            "elf-debug": 1,
+            "elf": 1,
+            "static-archive": 1,
+            "header": 1,
+            "python": 1,
+            "other": 1,
+        }
+        assert {*report["by_directory"]} == {"bin", "lib", "include", "."}
+        assert len(report["top_files"]) == 3 and report["top_files"][0]["size"] >= report["top_files"][-1]["size"]
+    assert dir_report["total"]["size"] == package_report["total"]["size"]
+    assert dir_report["by_type"]["elf-debug"]["size"] == (root / "bin" / "debug").stat().st_size
+    # 压缩包的压缩后大小按实际文件大小缩放
+    package_size = (prefix / f"{root.name}.tar.zst").stat().st_size
+    assert abs(package_report["total"]["compressed"] - package_size) <= len(package_report["by_type"])
+
+    # 输出JSON到标准输出时，人类可读的报告只输出到标准错误
+    toolchains_quiet.set(False)
+    capsys.readouterr()
+    analyze(config, 3, "-")
+    output = capsys.readouterr()
+    assert json.loads(output.out) == [dir_report, package_report]
+    assert "Analyze toolchains successfully." in output.err
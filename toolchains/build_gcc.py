@@ -11,7 +11,9 @@ from .build_gcc_source import *
 def _check_input(args: argparse.Namespace, need_check: bool) -> None:
     if need_check:
         assert args.jobs > 0, common.toolchains_error(f"Invalid jobs: {args.jobs}.")
-        assert 1 <= args.compress_level <= 22, common.toolchains_error(f"Invalid compress level: {args.compress_level}")
+        assert args.compress_level == "auto" or 1 <= args.compress_level <= 22, common.toolchains_error(
+            f"Invalid compress level: {args.compress_level}"
+        )
         check_triplet(args.host, args.target)
 
 
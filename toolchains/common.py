@@ -1,15 +1,27 @@
 # PYTHON_ARGCOMPLETE_OK
 
 import argparse
+import collections
+import concurrent.futures
+import ctypes
 import enum
+import errno
+import fnmatch
 import functools
+import glob
+import hashlib
 import importlib.util
 import inspect
 import itertools
 import json
-import multiprocessing.synchronize
+import multiprocessing.context
+import multiprocessing.queues
 import os
+import re
+import resource
 import shutil
+import stat
+import struct
 import subprocess
 import sys
 import tempfile
@@ -18,13 +30,17 @@ import time
 import types
 import typing
 from collections.abc import Callable, Generator
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
 from enum import IntEnum, IntFlag, auto
 from pathlib import Path
 from typing import Self
 
 import colorama
 import libarchive  # type: ignore
+import libarchive.entry  # type: ignore
+import libarchive.extract  # type: ignore
+import libarchive.ffi  # type: ignore
+import libarchive.write  # type: ignore
 import zstandard
 
 # 受支持的os列表
@@ -645,7 +661,7 @@ def remove(path: Path, dry_run: bool | None = None) -> None:
         dry_run (bool | None, optional): 是否只回显命令而不执行，默认为None.
     """
 
-    if path.is_dir(follow_symlinks=False):
+    if path.is_dir() and not path.is_symlink():
         shutil.rmtree(path)
     else:
         os.remove(path)
@@ -727,6 +743,76 @@ def rename(src: Path, dst: Path, dry_run: bool | None = None) -> None:
     src.rename(dst)
 
 
+def _exchange_echo(src: Path, dst: Path) -> str:
+    """在交换两个路径时回显信息
+
+    Args:
+        src (Path): 源路径
+        dst (Path): 目标路径
+
+    Returns:
+        str: 回显信息
+    """
+
+    return toolchains_info(f"Exchange {src} <-> {dst}.")
+
+
+@support_dry_run(_exchange_echo)
+def exchange(src: Path, dst: Path, dry_run: bool | None = None) -> bool:
+    """使用renameat2(RENAME_EXCHANGE)原子地交换两个路径
+
+    Args:
+        src (Path): 源路径
+        dst (Path): 目标路径
+        dry_run (bool | None, optional): 是否只回显命令而不执行，默认为None.
+
+    Returns:
+        bool: 是否交换成功，系统或文件系统不支持时返回False
+    """
+
+    libc = ctypes.CDLL(None, use_errno=True)
+    if not hasattr(libc, "renameat2"):
+        return False
+    at_fdcwd, rename_exchange = -100, 2
+    result = libc.renameat2(at_fdcwd, os.fsencode(src), at_fdcwd, os.fsencode(dst), rename_exchange)
+    if result == 0:
+        return True
+    if (error := ctypes.get_errno()) not in (errno.EINVAL, errno.ENOSYS, errno.EPERM):
+        raise OSError(error, os.strerror(error), str(src), None, str(dst))
+    return False
+
+
+def _remove_in_background_echo(path: Path) -> str:
+    """在后台删除指定路径时回显信息
+
+    Args:
+        path (Path): 要删除的路径
+
+    Returns:
+        str: 回显信息
+    """
+
+    return toolchains_info(f"Remove {path} in background.")
+
+
+@support_dry_run(_remove_in_background_echo)
+def remove_in_background(path: Path, dry_run: bool | None = None) -> None:
+    """在独立会话的后台进程中删除指定路径，当前进程退出后删除仍会继续
+
+    Args:
+        path (Path): 要删除的路径
+        dry_run (bool | None, optional): 是否只回显命令而不执行，默认为None.
+    """
+
+    subprocess.Popen(
+        ["rm", "-rf", "--", str(path)],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
 def _symlink_echo(target: Path, symlink_path: Path) -> str:
     """在创建软链接时回显信息
 
@@ -770,232 +856,3059 @@ def symlink_if_exist(target: Path, symlink_path: Path, overwrite: bool = True, d
         dry_run (bool | None, optional): 是否只回显命令而不执行，默认为None.
     """
 
-    if (resolve_path(target, symlink_path.parent)).exists(follow_symlinks=False):
-        symlink(target, symlink_path, overwrite, dry_run)
+    if (resolve_path(target, symlink_path.parent)).exists(follow_symlinks=False):
+        symlink(target, symlink_path, overwrite, dry_run)
+
+
+def add_environ(key: str, value: str | Path) -> None:
+    """添加系统环境变量
+
+    Args:
+        key (str): 环境变量名称
+        value (str | Path): 环境变量的值
+    """
+
+    value = str(value)
+    os.environ[key] = value
+
+
+def insert_environ(key: str, value: str | Path) -> None:
+    """在现有环境变量的前端插入新的值
+
+    Args:
+        key (str): 环境变量名称
+        value (str | Path): 环境变量的值
+    """
+
+    value = str(value)
+    os.environ[key] = f"{value}{os.pathsep}{os.environ[key]}"
+
+
+def get_environ_list(key: str, no_exist_ok: bool = False) -> list[str]:
+    """获取根据os.pathsep分割的环境变量值列表
+
+    Args:
+        key (str): 环境变量名称
+        no_exist_ok(bool): 环境变量不存在时是否正常执行并返回空列表而不是抛出异常. 默认为否.
+
+    Returns:
+        list[str]: 分割后的列表
+    """
+
+    env = os.environ.get(key, "") if no_exist_ok else os.environ[key]
+    return env.split(os.pathsep)
+
+
+def set_environ_list(key: str, value: list[str]) -> None:
+    """将环境变量值列表设置到当前进程的环境变量中
+
+    Args:
+        key (str): 环境变量名称
+        value (list[str]): 值列表
+    """
+
+    os.environ[key] = os.pathsep.join(value)
+
+
+@contextmanager
+def chdir_guard(path: Path, dry_run: bool | None = None) -> Generator[Path, None, None]:
+    """临时进入指定的工作目录
+
+    Args:
+        path (Path): 要进入的工作目录
+        dry_run (bool | None, optional): 是否只回显而不运行命令. 默认为None.
+    """
+    cwd = chdir(path, dry_run) or Path()
+    yield cwd
+    chdir(cwd, dry_run)
+
+
+def _check_lib_dir_echo(lib: str, lib_dir: Path, dry_run: bool | None) -> str:
+    """在检查库目录是否存在时回显信息
+
+    Args:
+        lib (str): 库名称
+        lib_dir (Path): 库目录
+
+    Returns:
+        str: 回显信息
+    """
+
+    basic_info = toolchains_info(f"Checking {lib} in {lib_dir} ... ")
+    if need_dry_run(dry_run):
+        return basic_info + toolchains_note("skip for dry run\n", message_type.none)
+    else:
+        return basic_info
+
+
+@support_dry_run(_check_lib_dir_echo, "")
+def check_lib_dir(lib: str, lib_dir: Path, do_assert: bool = True, dry_run: bool | None = None) -> bool:
+    """检查库目录是否存在
+
+    Args:
+        lib (str): 库名称，用于提供错误报告信息
+        lib_dir (Path): 库目录
+        do_assert (bool, optional): 是否断言库存在. 默认断言.
+        dry_run (bool | None, optional): 是否只回显命令而不执行，默认为None.
+
+    Returns:
+        bool: 返回库是否存在
+    """
+
+    if not do_assert and not lib_dir.exists():
+        toolchains_print(color.error.wrapper("no"))
+        return False
+    else:
+        assert lib_dir.exists(), toolchains_error(f"Cannot find lib '{lib}' in directory '{lib_dir}'.")
+    toolchains_print(toolchains_success("yes", message_type.none))
+    return True
+
+
+def _compress_path_echo(self: "compress_environment", path: str) -> str:
+    """在压缩工具链时回显信息
+
+    Args:
+        self (compress_environment): 工具链压缩环境
+        path (str): 工具链路径
+
+    Returns:
+        str: 回显信息
+    """
+
+    if self.split_components:
+        return toolchains_info(f"Compressing {path} into components")
+    return toolchains_info(f"Compressing {path}{package_codec.get_suffix(self.codec)}")
+
+
+def _make_delta_path_echo(base: str, path: str) -> str:
+    """在生成差分包时回显信息
+
+    Args:
+        base (str): 基础包路径
+        path (str): 目标包路径
+
+    Returns:
+        str: 回显信息
+    """
+
+    return toolchains_info(f"Making delta from {base} to {path}")
+
+
+type compress_level_t = int | typing.Literal["auto"]
+type codec_t = typing.Literal["zstd", "lz4", "none"]
+type debug_info_t = typing.Literal["keep", "compress", "split"]
+
+
+def parse_compress_level(value: str) -> compress_level_t:
+    """解析命令行中的zstd压缩等级
+
+    Args:
+        value (str): 压缩等级或auto
+
+    Returns:
+        compress_level_t: 压缩等级，auto表示根据采样结果自动选择
+    """
+
+    return "auto" if value == "auto" else int(value)
+
+
+def _decompress_path_echo(path: str) -> str:
+    """在解压缩工具链时回显信息
+
+    Args:
+        path (str): 工具链路径
+
+    Returns:
+        str: 回显信息
+    """
+
+    return toolchains_info(f"Decompressing {path}")
+
+
+class progress_record:
+    """单个压缩包的进度信息，在工作进程和主进程之间传递"""
+
+    name: str  # 压缩包名称
+    operation: str  # 操作名称
+    bytes_in: int  # 已读取的字节数
+    bytes_out: int  # 已输出的字节数
+    total: int  # 预计需要读取的总字节数，为0表示未知
+    elapsed: float  # 已用时间(秒)
+    done: bool  # 是否已完成
+
+    def __init__(self, name: str, operation: str, total: int) -> None:
+        self.name = name
+        self.operation = operation
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.total = total
+        self.elapsed = 0
+        self.done = False
+
+    def get_speed(self) -> float:
+        """获取读取速度
+
+        Returns:
+            float: 读取速度(MB/s)
+        """
+
+        return self.bytes_in / self.elapsed / 1e6 if self.elapsed else 0
+
+    def get_ratio(self) -> float:
+        """获取到目前为止的压缩率，即未压缩大小与压缩后大小之比
+
+        Returns:
+            float: 压缩率
+        """
+
+        compressed, uncompressed = (self.bytes_out, self.bytes_in) if self.operation == "compress" else (self.bytes_in, self.bytes_out)
+        return uncompressed / compressed if compressed else 0
+
+    def get_eta(self) -> float | None:
+        """根据当前读取速度估计剩余时间
+
+        Returns:
+            float | None: 剩余时间(秒)，无法估计时为None
+        """
+
+        if not self.total or not self.bytes_in:
+            return None
+        return max(self.total - self.bytes_in, 0) * self.elapsed / self.bytes_in
+
+    def format(self) -> str:
+        """生成一行进度信息
+
+        Returns:
+            str: 进度信息
+        """
+
+        eta = self.get_eta()
+        eta_str = "--:--" if eta is None else f"{int(eta) // 60:02d}:{int(eta) % 60:02d}"
+        return (
+            f"{self.operation.capitalize()} {self.name}: {self.bytes_in / (1 << 20):.1f} MiB in, {self.bytes_out / (1 << 20):.1f} MiB out, "
+            f"{self.get_speed():.1f} MB/s, ratio {self.get_ratio():.2f}, ETA {eta_str}"
+        )
+
+
+class progress_tracker:
+    """在压缩或解压过程中统计进度，并按固定间隔通过进度通道发送给主进程，未启用进度通道时不做任何事"""
+
+    interval: typing.ClassVar[float] = 1.0  # 发送进度信息的最小间隔(秒)
+    _queue: typing.ClassVar["multiprocessing.queues.SimpleQueue[progress_record] | None"] = None
+
+    _record: progress_record
+    _start_time: float
+    _last_time: float
+
+    def __init__(self, name: str, operation: str, total: int = 0) -> None:
+        """开始统计一个压缩包的进度
+
+        Args:
+            name (str): 压缩包名称
+            operation (str): 操作名称
+            total (int, optional): 预计需要读取的总字节数. 默认为未知.
+        """
+
+        self._record = progress_record(name, operation, total)
+        self._start_time = self._last_time = time.perf_counter()
+
+    @classmethod
+    def set_queue(cls, queue: "multiprocessing.queues.SimpleQueue[progress_record] | None") -> None:
+        """设置当前进程的进度通道，可以作为进程池的initializer
+
+        Args:
+            queue (multiprocessing.queues.SimpleQueue[progress_record] | None): 进度通道，为None表示关闭进度统计
+        """
+
+        cls._queue = queue
+
+    @classmethod
+    def enabled(cls) -> bool:
+        """当前进程是否启用了进度通道
+
+        Returns:
+            bool: 是否启用
+        """
+
+        return cls._queue is not None
+
+    def _send(self) -> None:
+        if self._queue is not None:
+            self._record.elapsed = time.perf_counter() - self._start_time
+            self._queue.put(self._record)
+
+    def update(self, bytes_in: int, bytes_out: int) -> None:
+        """更新进度
+
+        Args:
+            bytes_in (int): 已读取的字节数
+            bytes_out (int): 已输出的字节数
+        """
+
+        self._record.bytes_in = bytes_in
+        self._record.bytes_out = bytes_out
+        if self._queue is not None and (now := time.perf_counter()) - self._last_time >= self.interval:
+            self._last_time = now
+            self._send()
+
+    def finish(self, bytes_out: int | None = None) -> None:
+        """完成统计并发送最终结果
+
+        Args:
+            bytes_out (int | None, optional): 最终输出的字节数. 默认使用最后一次更新的值.
+        """
+
+        if bytes_out is not None:
+            self._record.bytes_out = bytes_out
+        self._record.done = True
+        self._send()
+
+
+class _progress_writer:
+    """包装写入函数，统计写入的数据量和输出文件的大小"""
+
+    _write: Callable[[typing.Any], typing.Any]
+    _tracker: progress_tracker
+    _file: typing.BinaryIO
+    _bytes_in: int
+
+    def __init__(self, write: Callable[[typing.Any], typing.Any], tracker: progress_tracker, file: typing.BinaryIO) -> None:
+        self._write = write
+        self._tracker = tracker
+        self._file = file
+        self._bytes_in = 0
+
+    def write(self, data: typing.Any) -> typing.Any:
+        result = self._write(data)
+        self._bytes_in += len(data)
+        self._tracker.update(self._bytes_in, self._file.tell())
+        return result
+
+
+class _progress_reader:
+    """包装解压数据流，统计读取的压缩数据量和输出的解压数据量"""
+
+    _reader: typing.Any
+    _tracker: progress_tracker
+    _file: typing.BinaryIO
+    _bytes_out: int
+
+    def __init__(self, reader: typing.Any, tracker: progress_tracker, file: typing.BinaryIO) -> None:
+        self._reader = reader
+        self._tracker = tracker
+        self._file = file
+        self._bytes_out = 0
+
+    def readinto(self, buffer: typing.Any) -> int:
+        size: int = self._reader.readinto(buffer)
+        self._bytes_out += size
+        # 并行读取器使用pread，文件读写位置不会变化
+        bytes_in = getattr(self._reader, "compressed_position", None) or self._file.tell()
+        self._tracker.update(bytes_in, self._bytes_out)
+        return size
+
+    def seekable(self) -> bool:
+        return False
+
+
+class progress_monitor:
+    """在主进程中创建进度通道，后台线程打印各个压缩包的进度，退出时打印汇总表"""
+
+    context: multiprocessing.context.BaseContext  # 创建工作进程时使用的上下文，主进程中有接收线程运行，因此不使用fork
+    queue: "multiprocessing.queues.SimpleQueue[progress_record]"
+    record_map: dict[tuple[str, str], progress_record]  # (操作名称, 压缩包名称)->最新的进度信息
+    _thread: threading.Thread
+
+    def __init__(self) -> None:
+        # 在使用时才获取上下文，导入模块时不依赖平台是否支持forkserver
+        self.context = multiprocessing.get_context("forkserver")
+        self.queue = self.context.SimpleQueue()
+        self.record_map = {}
+        self._thread = threading.Thread(target=self._receive, daemon=True)
+
+    def _receive(self) -> None:
+        """接收并打印进度信息，收到None时退出"""
+
+        while (record := self.queue.get()) is not None:
+            self.record_map[(record.operation, record.name)] = record
+            # 进度行数量与解压时长有关，不计入状态计数
+            toolchains_print(toolchains_info(record.format(), add_counter=False))
+
+    def __enter__(self) -> Self:
+        progress_tracker.set_queue(self.queue)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_: typing.Any) -> None:
+        self.queue.put(None)  # type: ignore
+        self._thread.join()
+        progress_tracker.set_queue(None)
+        self.print_summary()
+
+    def print_summary(self) -> None:
+        """打印各个压缩包的汇总表，按用时从长到短排列"""
+
+        if not self.record_map:
+            return
+        record_list = sorted(self.record_map.values(), key=lambda record: record.elapsed, reverse=True)
+        width = max(len(record.name) for record in record_list)
+        lines = [f"{"Package":<{width}}  {"Operation":<10}  {"In(MiB)":>10}  {"Out(MiB)":>10}  {"Ratio":>8}  {"MB/s":>8}  {"Time(s)":>8}"]
+        for record in record_list:
+            lines.append(
+                f"{record.name:<{width}}  {record.operation:<10}  {record.bytes_in / (1 << 20):>10.1f}  {record.bytes_out / (1 << 20):>10.1f}  "
+                f"{record.get_ratio():>8.2f}  {record.get_speed():>8.1f}  {record.elapsed:>8.1f}"
+            )
+        toolchains_print(toolchains_note("Summary:\n" + "\n".join(lines)))
+
+
+def get_peak_rss() -> int:
+    """获取当前进程的峰值常驻内存
+
+    Returns:
+        int: 峰值常驻内存(字节)
+    """
+
+    # Linux下ru_maxrss的单位为KiB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss << 10
+
+
+def walk_path(path: str) -> Generator[str, None, None]:
+    """按深度优先顺序列出path及其下所有项目，同一目录下的项目按名称排序，不跟随软链接
+
+    Args:
+        path (str): 要遍历的路径
+
+    Yields:
+        Generator[str, None, None]: 各个项目的路径，目录先于其子项目
+    """
+
+    yield path
+    if not os.path.isdir(path) or os.path.islink(path):
+        return
+    # 不依赖文件系统的遍历顺序，保证相同的目录树得到相同的成员顺序
+    with os.scandir(path) as it:
+        entry_list = sorted(it, key=lambda entry: entry.name)
+    for entry in entry_list:
+        yield from walk_path(os.path.join(path, entry.name))
+
+
+def link_duplicate_files(member_list: list[str], jobs: int) -> dict[str, str]:
+    """找出内容、权限和属主都相同的文件，将重复的文件替换为指向第一个文件的硬链接
+
+    只对大小相同的文件计算摘要，已经是硬链接的文件直接按inode归组.
+
+    Args:
+        member_list (list[str]): 按打包顺序排列的项目列表
+        jobs (int): 并行计算摘要的线程数
+
+    Returns:
+        dict[str, str]: 重复文件->在打包顺序中第一个出现的相同文件
+    """
+
+    stat_map: dict[str, os.stat_result] = {}
+    size_map: dict[int, list[str]] = {}
+    for item in member_list:
+        stat = os.lstat(item)
+        if stat.st_size and os.path.isfile(item) and not os.path.islink(item):
+            stat_map[item] = stat
+            size_map.setdefault(stat.st_size, []).append(item)
+
+    candidate_list = [item for same_size_list in size_map.values() if len(same_size_list) > 1 for item in same_size_list]
+    with concurrent.futures.ThreadPoolExecutor(max(jobs, 1)) as executor:
+        digest_map = dict(zip(candidate_list, executor.map(lambda item: package_manifest.hash_file(Path(item)), candidate_list)))
+
+    link_map: dict[str, str] = {}
+    inode_map: dict[tuple[int, int], str] = {}
+    content_map: dict[tuple[str, int, int, int], str] = {}
+    for item, stat in stat_map.items():
+        if target := inode_map.get((stat.st_dev, stat.st_ino)):
+            link_map[item] = target
+            continue
+        inode_map[(stat.st_dev, stat.st_ino)] = item
+        if item not in digest_map:
+            continue
+        key = (digest_map[item], stat.st_mode, stat.st_uid, stat.st_gid)
+        if (target := content_map.setdefault(key, item)) == item:
+            continue
+        # 先创建临时链接再替换，避免中途失败时丢失文件
+        tmp_path = f"{item}.link.tmp"
+        try:
+            os.link(target, tmp_path)
+            os.replace(tmp_path, item)
+        except OSError:
+            remove_if_exists(Path(tmp_path))
+            continue
+        link_map[item] = target
+    return link_map
+
+
+# libarchive-c的linkpath只会设置符号链接，需要直接调用archive_entry_copy_hardlink
+_entry_copy_hardlink = libarchive.ffi.ffi("entry_copy_hardlink", [libarchive.ffi.c_archive_entry_p, ctypes.c_char_p], None)
+# 生成可复现的压缩包时清除从磁盘读取的扩展属性、ACL、文件标志和稀疏文件信息
+_entry_xattr_clear = libarchive.ffi.ffi("entry_xattr_clear", [libarchive.ffi.c_archive_entry_p], None)
+_entry_acl_clear = libarchive.ffi.ffi("entry_acl_clear", [libarchive.ffi.c_archive_entry_p], None)
+_entry_sparse_clear = libarchive.ffi.ffi("entry_sparse_clear", [libarchive.ffi.c_archive_entry_p], None)
+_entry_set_fflags = libarchive.ffi.ffi("entry_set_fflags", [libarchive.ffi.c_archive_entry_p, ctypes.c_ulong, ctypes.c_ulong], None)
+
+
+def _read_disk_entry(path: str, header_codec: str, link_target: str | None = None, mtime: int | None = None) -> typing.Any:
+    """从磁盘读取一个tar成员的属性，与libarchive的add_files生成的成员头部相同
+
+    Args:
+        path (str): 成员路径
+        header_codec (str): 成员头部的编码
+        link_target (str | None, optional): 硬链接指向的成员路径. 默认不是硬链接.
+        mtime (int | None, optional): 规范化后的修改时间，设置后只保留与文件内容和权限有关的属性. 默认保留所有属性.
+
+    Returns:
+        typing.Any: libarchive成员
+    """
+
+    entry = libarchive.entry.ArchiveEntry(header_codec=header_codec)
+    with libarchive.write.new_archive_read_disk(path) as read_disk:
+        libarchive.ffi.read_next_header2(read_disk, entry._entry_p)
+    entry.pathname = path
+    if link_target:
+        _entry_copy_hardlink(entry._entry_p, link_target.encode(header_codec))
+        entry.size = 0
+    if mtime is not None:
+        entry.mtime = mtime
+        entry.atime = entry.ctime = entry.birthtime = None
+        entry.uid = entry.gid = 0
+        _entry_xattr_clear(entry._entry_p)
+        _entry_acl_clear(entry._entry_p)
+        _entry_sparse_clear(entry._entry_p)
+        _entry_set_fflags(entry._entry_p, 0, 0)
+    return entry
+
+
+class _member_prefetcher:
+    """使用线程池预读tar成员的属性和文件内容，并按成员顺序写入压缩包
+
+    预读中的文件内容总量不超过max_inflight，超过该大小的文件不预读，写入时再流式读取.
+    需要时顺便计算文件内容的摘要，生成工具链清单时无需再读取一遍工具链.
+    """
+
+    _member_list: list[str]
+    _link_map: dict[str, str]
+    _jobs: int
+    _max_inflight: int
+    _header_codec: str
+    _mtime: int | None
+    _digest: bool
+    digest_map: dict[str, str]  # 普通文件成员路径->文件内容的blake2b摘要，只在需要计算摘要时记录
+
+    def __init__(
+        self,
+        member_list: list[str],
+        link_map: dict[str, str],
+        jobs: int,
+        max_inflight: int,
+        header_codec: str,
+        mtime: int | None = None,
+        digest: bool = False,
+    ) -> None:
+        """创建预读器
+
+        Args:
+            member_list (list[str]): tar成员列表
+            link_map (dict[str, str]): 重复文件->第一个相同文件
+            jobs (int): 预读线程数
+            max_inflight (int): 预读中的文件内容总量的上限(字节)
+            header_codec (str): 成员头部的编码
+            mtime (int | None, optional): 规范化后的修改时间，设置后成员只保留与文件内容和权限有关的属性. 默认保留所有属性.
+            digest (bool, optional): 是否计算普通文件内容的摘要. 默认不计算.
+        """
+
+        self._member_list = member_list
+        self._link_map = link_map
+        self._jobs = jobs
+        self._max_inflight = max_inflight
+        self._header_codec = header_codec
+        self._mtime = mtime
+        self._digest = digest
+        self.digest_map = {}
+
+    def _get_prefetch_size(self, item: str) -> int:
+        """获取成员需要预读的文件内容大小
+
+        Args:
+            item (str): 成员路径
+
+        Returns:
+            int: 预读大小，为0表示不预读
+        """
+
+        if item in self._link_map:
+            return 0
+        item_stat = os.lstat(item)
+        if not stat.S_ISREG(item_stat.st_mode) or item_stat.st_size > self._max_inflight:
+            return 0
+        return item_stat.st_size
+
+    def _read_member(self, item: str, size: int) -> tuple[typing.Any, bytes | None, str | None]:
+        """读取成员的属性和文件内容，需要时计算文件内容的摘要，在线程池中执行
+
+        Args:
+            item (str): 成员路径
+            size (int): 预读大小
+
+        Returns:
+            tuple[typing.Any, bytes | None, str | None]: libarchive成员、文件内容和摘要，
+                文件内容为None表示写入时再流式读取，摘要为None表示不是预读的普通文件或无需计算摘要
+        """
+
+        entry = _read_disk_entry(item, self._header_codec, self._link_map.get(item), self._mtime)
+        if not entry.isreg or entry.islnk:
+            return entry, b"", None
+        if size == 0 and entry.size:
+            return entry, None, None
+        with open(item, "rb") as file:
+            data = file.read()
+        return entry, data, package_manifest.new_hash(data).hexdigest() if self._digest else None
+
+    def __iter__(self) -> Generator[tuple[str, typing.Any, bytes | None], None, None]:
+        """按成员顺序获取预读结果
+
+        Yields:
+            Generator[tuple[str, typing.Any, bytes | None], None, None]: 成员路径、libarchive成员和文件内容
+        """
+
+        pending: collections.deque[tuple[str, int, concurrent.futures.Future[tuple[typing.Any, bytes | None, str | None]]]] = (
+            collections.deque()
+        )
+        inflight = 0
+        member_iter = iter(self._member_list)
+        with concurrent.futures.ThreadPoolExecutor(self._jobs) as executor:
+            while True:
+                # 至少保留一个任务，保证单个较大的文件也能被预读
+                while len(pending) < self._jobs * 4 and (not pending or inflight < self._max_inflight):
+                    if (item := next(member_iter, None)) is None:
+                        break
+                    size = self._get_prefetch_size(item)
+                    pending.append((item, size, executor.submit(self._read_member, item, size)))
+                    inflight += size
+                if not pending:
+                    return
+                item, size, future = pending.popleft()
+                inflight -= size
+                entry, data, digest = future.result()
+                if digest:
+                    self.digest_map[item] = digest
+                elif self._digest and (target := self._link_map.get(item)) in self.digest_map:
+                    # 硬链接成员与其链接目标的内容相同，链接目标总是先于硬链接成员写入
+                    self.digest_map[item] = self.digest_map[target]
+                yield item, entry, data
+
+    def write(self, tar: typing.Any, item: str, entry: typing.Any, data: bytes | None, block_size: int) -> None:
+        """将预读的成员写入压缩包，需要时为流式读取的文件计算摘要
+
+        Args:
+            tar (typing.Any): libarchive写入器
+            item (str): 成员路径
+            entry (typing.Any): libarchive成员
+            data (bytes | None): 文件内容，为None表示从磁盘流式读取
+            block_size (int): 流式读取时的块大小
+        """
+
+        libarchive.ffi.write_header(tar._pointer, entry._entry_p)
+        if data is None:
+            hash = package_manifest.new_hash() if self._digest else None
+            with open(libarchive.ffi.entry_sourcepath(entry._entry_p), "rb") as file:
+                while block := file.read(block_size):
+                    libarchive.ffi.write_data(tar._pointer, block, len(block))
+                    if hash:
+                        hash.update(block)
+            if hash:
+                self.digest_map[item] = hash.hexdigest()
+        elif data:
+            libarchive.ffi.write_data(tar._pointer, data, len(data))
+        libarchive.ffi.write_finish_entry(tar._pointer)
+
+
+class package_codec:
+    """压缩包使用的压缩格式，解压缩时根据文件头部的魔数识别
+
+    Attributes:
+        codec_list: 支持的压缩格式
+        suffix_map: 各压缩格式的压缩包后缀
+        lz4_magic : lz4帧的魔数
+        tar_magic : ustar格式tar头部的魔数及其偏移量
+    """
+
+    codec_list: typing.Final[tuple[codec_t, ...]] = ("zstd", "lz4", "none")
+    suffix_map: typing.Final[dict[codec_t, str]] = {"zstd": ".tar.zst", "lz4": ".tar.lz4", "none": ".tar"}
+    lz4_magic: typing.Final[bytes] = b"\x04\x22\x4d\x18"
+    tar_magic: typing.Final[tuple[int, bytes]] = (257, b"ustar")
+
+    @staticmethod
+    def is_available(codec: codec_t) -> bool:
+        """判断压缩格式所需的模块是否存在，lz4是可选依赖
+
+        Args:
+            codec (codec_t): 压缩格式
+
+        Returns:
+            bool: 是否可用
+        """
+
+        return codec != "lz4" or is_module_available("lz4")
+
+    @classmethod
+    def get_suffix(cls, codec: codec_t) -> str:
+        """获取压缩包的后缀
+
+        Args:
+            codec (codec_t): 压缩格式
+
+        Returns:
+            str: 压缩包后缀
+        """
+
+        return cls.suffix_map[codec]
+
+    @classmethod
+    def detect(cls, file: typing.BinaryIO) -> codec_t | None:
+        """根据文件头部的魔数识别压缩格式，不改变文件的读写位置
+
+        Args:
+            file (typing.BinaryIO): 压缩包文件
+
+        Returns:
+            codec_t | None: 压缩格式，无法识别时为None
+        """
+
+        offset, magic = cls.tar_magic
+        header = os.pread(file.fileno(), offset + len(magic), 0)
+        # 差分包以可跳过帧开头
+        if header.startswith(zstandard.FRAME_HEADER) or (
+            len(header) >= 4 and struct.unpack("<I", header[:4])[0] & 0xFFFFFFF0 == 0x184D2A50
+        ):
+            return "zstd"
+        if header.startswith(cls.lz4_magic):
+            return "lz4"
+        if header[offset:] == magic:
+            return "none"
+        return None
+
+    @staticmethod
+    def compress(codec: codec_t, level: int, data: bytes | memoryview) -> bytes:
+        """使用单线程在内存中压缩数据，用于比较各压缩格式
+
+        Args:
+            codec (codec_t): 压缩格式
+            level (int): 压缩等级
+            data (bytes | memoryview): 原始数据
+
+        Returns:
+            bytes: 压缩结果
+        """
+
+        match codec:
+            case "zstd":
+                return zstandard.ZstdCompressor(level).compress(data)
+            case "lz4":
+                import lz4.frame  # type: ignore
+
+                return bytes(lz4.frame.compress(data, compression_level=level))
+            case _:
+                return bytes(data)
+
+    @staticmethod
+    def decompress(codec: codec_t, data: bytes) -> bytes:
+        """使用单线程在内存中解压数据，用于比较各压缩格式
+
+        Args:
+            codec (codec_t): 压缩格式
+            data (bytes): 压缩数据
+
+        Returns:
+            bytes: 解压结果
+        """
+
+        match codec:
+            case "zstd":
+                return zstandard.ZstdDecompressor().stream_reader(data, read_across_frames=True).read()
+            case "lz4":
+                import lz4.frame
+
+                return bytes(lz4.frame.decompress(data))
+            case _:
+                return data
+
+
+class elf_section_table:
+    """ELF文件的节头表，用于识别调试信息节和build-id
+
+    Attributes:
+        magic         : ELF文件的魔数
+        header_size   : 读取节头表位置所需的ELF头长度
+        shf_compressed: 压缩节的标志位
+    """
+
+    magic: typing.Final[bytes] = b"\x7fELF"
+    header_size: typing.Final[int] = 64
+    shf_compressed: typing.Final[int] = 0x800
+
+    endian: str  # struct使用的字节序前缀
+    is_64bit: bool  # 是否是64位ELF
+    shoff: int  # 节头表在文件中的偏移
+    shentsize: int  # 节头大小
+    shnum: int  # 节头数
+    shstrndx: int  # 节名字符串表的索引
+    section_list: list[tuple[str, int, int, int]]  # 各个节的(名称, 标志, 偏移, 大小)
+    build_id: str | None  # .note.gnu.build-id中的build-id
+
+    @classmethod
+    def parse_header(cls, header: bytes) -> Self | None:
+        """解析ELF头中节头表的位置，不读取节头表
+
+        Args:
+            header (bytes): 文件头部
+
+        Returns:
+            Self | None: 节头表，不是ELF文件时为None
+        """
+
+        if len(header) < cls.header_size or not header.startswith(cls.magic):
+            return None
+        table = cls()
+        table.endian = "<" if header[5] == 1 else ">"
+        table.is_64bit = header[4] == 2
+        if table.is_64bit:
+            table.shoff = struct.unpack_from(f"{table.endian}Q", header, 0x28)[0]
+            table.shentsize, table.shnum, table.shstrndx = struct.unpack_from(f"{table.endian}3H", header, 0x3A)
+        else:
+            table.shoff = struct.unpack_from(f"{table.endian}I", header, 0x20)[0]
+            table.shentsize, table.shnum, table.shstrndx = struct.unpack_from(f"{table.endian}3H", header, 0x2E)
+        table.section_list = []
+        table.build_id = None
+        return table
+
+    def load_sections(self, read: Callable[[int, int], bytes]) -> bool:
+        """读取节头表和节名，并尝试读取build-id
+
+        Args:
+            read (Callable[[int, int], bytes]): 读取文件中指定偏移和长度的数据，数据不可用时返回的内容可以短于要求的长度
+
+        Returns:
+            bool: 节头表和节名字符串表是否完整可读
+        """
+
+        format = f"{self.endian}IIQQQQ" if self.is_64bit else f"{self.endian}IIIIII"
+        # 节头数或节名索引超出ELF头的表示范围时(SHN_XINDEX)真实值保存在0号节头中，这里不做处理
+        if not self.shnum or self.shstrndx >= self.shnum or self.shentsize < struct.calcsize(format):
+            return False
+        header_list = read(self.shoff, self.shnum * self.shentsize)
+        if len(header_list) < self.shnum * self.shentsize:
+            return False
+        raw_list = [struct.unpack_from(format, header_list, index * self.shentsize) for index in range(self.shnum)]
+        _, _, _, _, string_offset, string_size = raw_list[self.shstrndx]
+        string_table = read(string_offset, string_size)
+        if len(string_table) < string_size:
+            return False
+        for name, _, flags, _, offset, size in raw_list:
+            end = string_table.find(b"\0", name)
+            self.section_list.append((string_table[name : end if end >= 0 else None].decode(errors="replace"), flags, offset, size))
+        for name, _, offset, size in self.section_list:
+            if name == ".note.gnu.build-id" and len(note := read(offset, size)) == size >= 12:
+                name_size, desc_size, _ = struct.unpack_from(f"{self.endian}III", note)
+                desc_offset = 12 + (name_size + 3) // 4 * 4
+                if desc_offset + desc_size <= size:
+                    self.build_id = note[desc_offset : desc_offset + desc_size].hex() or None
+        return True
+
+    @classmethod
+    def load(cls, path: str) -> Self | None:
+        """读取文件的ELF节头表
+
+        Args:
+            path (str): 文件路径
+
+        Returns:
+            Self | None: 节头表，不是ELF文件或节头表不完整时为None
+        """
+
+        with open(path, "rb") as file:
+            table = cls.parse_header(os.pread(file.fileno(), cls.header_size, 0))
+            if table and table.load_sections(lambda offset, size: os.pread(file.fileno(), size, offset)):
+                return table
+        return None
+
+    def get_debug_section_list(self) -> list[tuple[str, int, int, int]]:
+        """获取调试信息节
+
+        Returns:
+            list[tuple[str, int, int, int]]: 名称以.debug_或.zdebug_开头的节
+        """
+
+        return [section for section in self.section_list if section[0].startswith((".debug_", ".zdebug_"))]
+
+    def get_debug_size(self) -> int:
+        """统计调试信息节的总大小
+
+        Returns:
+            int: 调试信息节的总大小
+        """
+
+        return sum(size for _, _, _, size in self.get_debug_section_list())
+
+    def is_debug_compressed(self) -> bool:
+        """判断调试信息节是否都已经压缩
+
+        Returns:
+            bool: 是否都已经压缩
+        """
+
+        return all(flags & self.shf_compressed or name.startswith(".zdebug_") for name, flags, _, _ in self.get_debug_section_list())
+
+
+class zstd_seek_table:
+    """zstd可寻址格式(seekable format)的帧索引表，以可跳过帧的形式附加在压缩包末尾
+
+    Attributes:
+        skippable_magic: 可跳过帧的魔数
+        seekable_magic : 可寻址格式尾部的魔数
+        footer_size    : 尾部结构的大小
+    """
+
+    skippable_magic: typing.Final[int] = 0x184D2A5E
+    seekable_magic: typing.Final[int] = 0x8F92EAB1
+    footer_size: typing.Final[int] = 9
+    max_frame_size: typing.Final[int] = 0xFFFFFFFF  # 索引表中的帧大小以32位整数保存
+
+    frame_list: list[tuple[int, int]]  # 各个帧的(压缩后大小, 解压后大小)
+
+    def __init__(self, frame_list: list[tuple[int, int]] | None = None) -> None:
+        self.frame_list = frame_list or []
+
+    def dump(self) -> bytes:
+        """将索引表序列化为可跳过帧
+
+        Returns:
+            bytes: 序列化结果
+        """
+
+        entry_list = b"".join(struct.pack("<II", compressed, decompressed) for compressed, decompressed in self.frame_list)
+        content = entry_list + struct.pack("<IBI", len(self.frame_list), 0, self.seekable_magic)
+        return struct.pack("<II", self.skippable_magic, len(content)) + content
+
+    @classmethod
+    def load(cls, file: typing.BinaryIO) -> Self | None:
+        """从文件末尾读取索引表，文件读写位置会被恢复
+
+        Args:
+            file (typing.BinaryIO): 压缩包文件
+
+        Returns:
+            Self | None: 索引表，若文件不是可寻址格式则返回None
+        """
+
+        position = file.tell()
+        try:
+            file_size = file.seek(0, os.SEEK_END)
+            if file_size < cls.footer_size + 8:
+                return None
+            file.seek(file_size - cls.footer_size)
+            frame_count, descriptor, magic = struct.unpack("<IBI", file.read(cls.footer_size))
+            if magic != cls.seekable_magic:
+                return None
+            entry_size = 12 if descriptor & 0x80 else 8
+            table_size = frame_count * entry_size + cls.footer_size
+            if file_size < table_size + 8:
+                return None
+            file.seek(file_size - table_size - 8)
+            skippable_magic, content_size = struct.unpack("<II", file.read(8))
+            if skippable_magic != cls.skippable_magic or content_size != table_size:
+                return None
+            data = file.read(frame_count * entry_size)
+            return cls([struct.unpack_from("<II", data, i * entry_size) for i in range(frame_count)])
+        finally:
+            file.seek(position)
+
+    def get_frame_offset_list(self) -> list[tuple[int, int, int]]:
+        """获取各个帧在压缩包中的位置
+
+        Returns:
+            list[tuple[int, int, int]]: 各个帧的(偏移量, 压缩后大小, 解压后大小)
+        """
+
+        result: list[tuple[int, int, int]] = []
+        offset = 0
+        for compressed, decompressed in self.frame_list:
+            result.append((offset, compressed, decompressed))
+            offset += compressed
+        return result
+
+
+class zstd_delta_header:
+    """差分包的头部，以可跳过帧的形式放在差分包开头，记录解压时需要的基础包信息
+
+    Attributes:
+        skippable_magic: 可跳过帧的魔数
+        suffix         : 差分包的后缀
+    """
+
+    skippable_magic: typing.Final[int] = 0x184D2A5D
+    suffix: typing.Final[str] = ".delta.zst"
+
+    base_name: str  # 基础包的文件名
+    base_digest: str  # 基础包中tar数据的blake2b摘要
+    window_log: int  # 差分包压缩时使用的窗口大小
+
+    def __init__(self, base_name: str, base_digest: str, window_log: int) -> None:
+        self.base_name = base_name
+        self.base_digest = base_digest
+        self.window_log = window_log
+
+    def dump(self) -> bytes:
+        """将头部序列化为可跳过帧
+
+        Returns:
+            bytes: 序列化结果
+        """
+
+        content = json.dumps({"base": self.base_name, "base_digest": self.base_digest, "window_log": self.window_log}).encode()
+        return struct.pack("<II", self.skippable_magic, len(content)) + content
+
+    @classmethod
+    def load(cls, file: typing.BinaryIO) -> Self | None:
+        """从文件开头读取头部，文件读写位置会被恢复
+
+        Args:
+            file (typing.BinaryIO): 差分包文件
+
+        Returns:
+            Self | None: 差分包头部，若文件不是差分包则返回None
+        """
+
+        position = file.tell()
+        try:
+            file.seek(0)
+            header = file.read(8)
+            if len(header) < 8:
+                return None
+            magic, content_size = struct.unpack("<II", header)
+            if magic != cls.skippable_magic:
+                return None
+            content = json.loads(file.read(content_size))
+            return cls(content["base"], content["base_digest"], content["window_log"])
+        finally:
+            file.seek(position)
+
+
+class zstd_frame_index:
+    """可寻址格式中各帧包含的tar成员列表，以可跳过帧的形式写在帧索引表之前，用于选择性解压时跳过整帧
+
+    Attributes:
+        skippable_magic: 可跳过帧的魔数
+    """
+
+    skippable_magic: typing.Final[int] = 0x184D2A5C
+
+    member_list: list[list[str]]  # 各个帧中开始的tar成员
+    continued_list: list[bool]  # 各个帧是否以上一帧中未结束的成员开头
+
+    def __init__(self, member_list: list[list[str]] | None = None, continued_list: list[bool] | None = None) -> None:
+        self.member_list = member_list or []
+        self.continued_list = continued_list or []
+
+    def dump(self) -> bytes:
+        """将成员列表序列化为可跳过帧
+
+        Returns:
+            bytes: 序列化结果
+        """
+
+        content = json.dumps({"members": self.member_list, "continued": self.continued_list}).encode()
+        return struct.pack("<II", self.skippable_magic, len(content)) + content
+
+    @classmethod
+    def load(cls, file: typing.BinaryIO, seek_table: zstd_seek_table) -> Self | None:
+        """读取帧索引表中最后一个不含数据的帧作为成员列表，文件读写位置会被恢复
+
+        Args:
+            file (typing.BinaryIO): 压缩包文件
+            seek_table (zstd_seek_table): 帧索引表
+
+        Returns:
+            Self | None: 成员列表，若压缩包中没有成员列表则返回None
+        """
+
+        frame_list = seek_table.get_frame_offset_list()
+        if not frame_list or frame_list[-1][2] != 0:
+            return None
+        offset, compressed, _ = frame_list[-1]
+        position = file.tell()
+        try:
+            file.seek(offset)
+            magic, content_size = struct.unpack("<II", file.read(8))
+            if magic != cls.skippable_magic or content_size != compressed - 8:
+                return None
+            content = json.loads(file.read(content_size))
+            return cls(content["members"], content["continued"])
+        finally:
+            file.seek(position)
+
+    def select_frame(self, frame_list: list[tuple[int, int, int]], member_filter: "member_filter") -> list[tuple[int, int, int]]:
+        """去掉只包含被排除成员的帧，剩余帧拼接后仍是合法的tar流
+
+        Args:
+            frame_list (list[tuple[int, int, int]]): 各个数据帧的(偏移量, 压缩后大小, 解压后大小)
+            member_filter (member_filter): 成员过滤器
+
+        Returns:
+            list[tuple[int, int, int]]: 需要解压的帧
+        """
+
+        frame_count = len(self.member_list)
+        need_list = [any(map(member_filter, member_list)) for member_list in self.member_list]
+        # 保留最后一帧以保证tar结束标记存在
+        need_list[-1] = True
+        last_selected = False
+        for i in range(frame_count):
+            # 上一帧中未结束的成员被选中时，其后续帧也需要解压
+            if self.continued_list[i] and last_selected:
+                need_list[i] = True
+            if self.member_list[i]:
+                last_selected = member_filter(self.member_list[i][-1])
+        # 需要解压的帧以未结束的成员开头时，需要从该成员开始的帧起连续解压
+        for i in range(frame_count - 1, 0, -1):
+            if need_list[i] and self.continued_list[i]:
+                need_list[i - 1] = True
+        return [frame for frame, need in zip(frame_list, need_list) if need]
+
+
+class member_filter:
+    """根据--include/--exclude通配符选择要解压的tar成员，通配符匹配相对于工具链根目录的路径，匹配目录时同时匹配其下所有内容"""
+
+    include_list: list[str]  # 包含的通配符，为空表示包含所有成员
+    exclude_list: list[str]  # 排除的通配符
+
+    def __init__(self, include_list: list[str] | None = None, exclude_list: list[str] | None = None) -> None:
+        self.include_list = include_list or []
+        self.exclude_list = exclude_list or []
+
+    def __bool__(self) -> bool:
+        return bool(self.include_list or self.exclude_list)
+
+    @staticmethod
+    def _match(path: str, pattern_list: list[str]) -> bool:
+        return any(fnmatch.fnmatchcase(path, pattern) or fnmatch.fnmatchcase(path, f"{pattern}/*") for pattern in pattern_list)
+
+    def __call__(self, pathname: str) -> bool:
+        """判断是否需要解压给定成员
+
+        Args:
+            pathname (str): tar成员路径，第一级目录为工具链名称
+
+        Returns:
+            bool: 是否需要解压
+        """
+
+        _, _, path = pathname.rstrip("/").partition("/")
+        if not path:
+            return True
+        return (not self.include_list or self._match(path, self.include_list)) and not self._match(path, self.exclude_list)
+
+
+class package_manifest:
+    """工具链清单，记录工具链中每个项目的路径、大小、权限和文件摘要，作为压缩包的最后一个成员随工具链一起安装
+
+    Attributes:
+        file_name: 清单在工具链目录中的文件名
+    """
+
+    file_name: typing.Final[str] = ".manifest.json"
+
+    name: str  # 工具链名称
+    entry_list: list[dict[str, typing.Any]]  # 各个项目的信息
+    metadata: dict[str, typing.Any]  # 附加的打包信息
+
+    def __init__(self, name: str, entry_list: list[dict[str, typing.Any]], metadata: dict[str, typing.Any] | None = None) -> None:
+        self.name = name
+        self.entry_list = entry_list
+        self.metadata = metadata or {}
+
+    @classmethod
+    def get_path(cls, name: str) -> str:
+        """获取清单在工具链中的路径
+
+        Args:
+            name (str): 工具链路径
+
+        Returns:
+            str: 清单路径
+        """
+
+        return os.path.join(name, cls.file_name)
+
+    @staticmethod
+    def new_hash(data: bytes = b"") -> "hashlib.blake2b":
+        """创建清单使用的blake2b摘要对象
+
+        Args:
+            data (bytes, optional): 初始数据. 默认为空.
+
+        Returns:
+            hashlib.blake2b: 摘要对象
+        """
+
+        return hashlib.blake2b(data, digest_size=32)
+
+    @classmethod
+    def hash_file(cls, path: Path) -> str:
+        """计算文件的blake2b摘要
+
+        Args:
+            path (Path): 文件路径
+
+        Returns:
+            str: 十六进制摘要
+        """
+
+        with path.open("rb") as file:
+            return hashlib.file_digest(file, cls.new_hash).hexdigest()
+
+    @classmethod
+    def create(cls, prefix_dir: Path, name: str, jobs: int, digest: bool = True) -> Self:
+        """使用线程池计算工具链中所有文件的摘要并生成清单
+
+        Args:
+            prefix_dir (Path): 工具链所在目录
+            name (str): 工具链名称
+            jobs (int): 并行计算摘要的线程数
+            digest (bool, optional): 是否计算文件摘要，为否时摘要需要由调用者填入. 默认计算.
+
+        Returns:
+            Self: 工具链清单
+        """
+
+        entry_list: list[dict[str, typing.Any]] = []
+        file_map: dict[Path, dict[str, typing.Any]] = {}
+        manifest_path = str(prefix_dir / cls.get_path(name))
+        for item in walk_path(str(prefix_dir / name)):
+            if item == manifest_path:
+                continue
+            path = Path(item)
+            stat = path.lstat()
+            entry: dict[str, typing.Any] = {"path": str(path.relative_to(prefix_dir)), "mode": stat.st_mode}
+            if path.is_symlink():
+                entry["target"] = os.readlink(path)
+            elif path.is_file():
+                entry["size"] = stat.st_size
+                file_map[path] = entry
+            entry_list.append(entry)
+        if digest:
+            with concurrent.futures.ThreadPoolExecutor(max(jobs, 1)) as executor:
+                for entry, file_digest in zip(file_map.values(), executor.map(cls.hash_file, file_map.keys())):
+                    entry["blake2b"] = file_digest
+        return cls(name, entry_list)
+
+    def dump(self) -> bytes:
+        """将清单序列化为json
+
+        Returns:
+            bytes: 序列化结果
+        """
+
+        return json.dumps({"version": 1, "name": self.name, "metadata": self.metadata, "entries": self.entry_list}, indent=0).encode()
+
+    @classmethod
+    def load(cls, path: Path) -> Self:
+        """从文件中读取清单
+
+        Args:
+            path (Path): 清单文件路径
+
+        Returns:
+            Self: 工具链清单
+        """
+
+        content = json.loads(path.read_bytes())
+        return cls(content["name"], content["entries"], content.get("metadata"))
+
+    def verify(self, prefix_dir: Path, jobs: int) -> list[str]:
+        """使用线程池检查安装在prefix_dir下的工具链是否与清单一致
+
+        Args:
+            prefix_dir (Path): 工具链所在目录
+            jobs (int): 并行计算摘要的线程数
+
+        Returns:
+            list[str]: 不一致项目的描述，为空表示工具链完好
+        """
+
+        error_list: list[str] = []
+        file_map: dict[Path, dict[str, typing.Any]] = {}
+        for entry in self.entry_list:
+            path = prefix_dir / entry["path"]
+            try:
+                stat = path.lstat()
+            except FileNotFoundError:
+                error_list.append(f"{entry["path"]}: missing")
+                continue
+            if stat.st_mode != entry["mode"]:
+                error_list.append(f"{entry["path"]}: mode {oct(stat.st_mode)} != {oct(entry["mode"])}")
+            elif "target" in entry:
+                if os.readlink(path) != entry["target"]:
+                    error_list.append(f"{entry["path"]}: symlink target {os.readlink(path)} != {entry["target"]}")
+            elif "size" in entry:
+                if stat.st_size != entry["size"]:
+                    error_list.append(f"{entry["path"]}: size {stat.st_size} != {entry["size"]}")
+                else:
+                    file_map[path] = entry
+        with concurrent.futures.ThreadPoolExecutor(max(jobs, 1)) as executor:
+            for entry, digest in zip(file_map.values(), executor.map(self.hash_file, file_map.keys())):
+                if digest != entry["blake2b"]:
+                    error_list.append(f"{entry["path"]}: content changed")
+        return error_list
+
+
+class package_component_index:
+    """拆分组件的压缩包的索引，列出工具链的各个组件包，解压缩时可以只安装需要的组件
+
+    Attributes:
+        suffix           : 索引文件的后缀
+        default_component: 不匹配任何规则的成员所属的组件
+        rule_list        : 按顺序匹配成员的组件规则，组件名中的{0}替换为正则表达式的第一个分组
+    """
+
+    suffix: typing.Final[str] = ".components.json"
+    default_component: typing.Final[str] = "core"
+    rule_list: typing.Final[list[tuple[str, re.Pattern[str]]]] = [
+        (
+            "gdb",
+            re.compile(r"(bin/[^/]*gdb[^/]*|bin/python[^/]*|share/gdb|share/\.gdbinit|share/gcc-[^/]*/python|include/gdb)(/.*)?"),
+        ),
+        ("modules", re.compile(r"(share/libc\+\+|share/libstdc\+\+|lib/[^/]*\.modules\.json)(/.*)?")),
+        # gcc的target目录和sysroot中各个目标的目录
+        ("target-{0}", re.compile(r"([^/-]+-[^/]+-[^/]+)(/.*)?")),
+        # clang的compiler-rt
+        ("target-{0}", re.compile(r"lib/clang/[^/]+/lib/([^/-]+-[^/]+-[^/]+)(/.*)?")),
+    ]
+
+    name: str  # 工具链名称
+    component_map: dict[str, dict[str, typing.Any]]  # 各个组件包的文件名、大小和成员数
+
+    def __init__(self, name: str, component_map: dict[str, dict[str, typing.Any]] | None = None) -> None:
+        self.name = name
+        self.component_map = component_map or {}
+
+    @classmethod
+    def get_path(cls, name: str) -> str:
+        """获取索引文件的路径
+
+        Args:
+            name (str): 工具链路径
+
+        Returns:
+            str: 索引文件路径
+        """
+
+        return f"{name}{cls.suffix}"
+
+    @classmethod
+    def is_index(cls, file: Path) -> bool:
+        """判断给定文件是否是一个组件索引
+
+        Args:
+            file (Path): 文件路径
+
+        Returns:
+            bool: 是否是组件索引
+        """
+
+        return file.is_file() and file.name.endswith(cls.suffix) and any(name in file.name for name in ("gcc", "clang", "sysroot"))
+
+    @classmethod
+    def get_component(cls, member: str) -> str:
+        """根据规则获取成员所属的组件
+
+        Args:
+            member (str): 相对于工具链根目录的路径
+
+        Returns:
+            str: 组件名
+        """
+
+        for component, rule in cls.rule_list:
+            if match := rule.fullmatch(member):
+                return component.format(*match.groups())
+        return cls.default_component
+
+    @classmethod
+    def split(cls, path: str, member_list: list[str]) -> dict[str, list[str]]:
+        """将tar成员划分到各个组件，每个组件还包含其成员的所有上级目录，以保留目录的权限和修改时间
+
+        Args:
+            path (str): 工具链路径
+            member_list (list[str]): tar成员列表，上级目录先于其子项目
+
+        Returns:
+            dict[str, list[str]]: 各个组件的成员列表，保持member_list中的顺序
+        """
+
+        member_set: dict[str, set[str]] = {}
+        for item in member_list:
+            if item == path:
+                continue
+            component_set = member_set.setdefault(cls.get_component(os.path.relpath(item, path)), set())
+            component_set.add(item)
+            parent = os.path.dirname(item)
+            while parent != path and parent not in component_set:
+                component_set.add(parent)
+                parent = os.path.dirname(parent)
+        member_set.setdefault(cls.default_component, set())
+        return {
+            component: [item for item in member_list if item == path or item in component_set]
+            for component, component_set in sorted(member_set.items())
+        }
+
+    def select(self, pattern_list: list[str]) -> list[str]:
+        """根据通配符选择组件
+
+        Args:
+            pattern_list (list[str]): 组件名的通配符列表，为空表示选择所有组件
+
+        Returns:
+            list[str]: 选择的组件，没有组件匹配时为空
+        """
+
+        if not pattern_list:
+            return [*self.component_map]
+        return [component for component in self.component_map if any(fnmatch.fnmatchcase(component, pattern) for pattern in pattern_list)]
+
+    def get_package_list(self, dir: Path, component_list: list[str] | None = None) -> list[Path]:
+        """获取组件包的路径
+
+        Args:
+            dir (Path): 索引文件所在的目录
+            component_list (list[str] | None, optional): 组件列表. 默认为所有组件.
+
+        Returns:
+            list[Path]: 组件包路径列表
+        """
+
+        return [dir / self.component_map[component]["file"] for component in component_list or self.component_map]
+
+    def dump(self) -> bytes:
+        """将索引序列化为json
+
+        Returns:
+            bytes: 序列化结果
+        """
+
+        return json.dumps({"version": 1, "name": self.name, "components": self.component_map}, indent=4).encode()
+
+    @classmethod
+    def load(cls, path: Path) -> Self:
+        """从文件中读取索引
+
+        Args:
+            path (Path): 索引文件路径
+
+        Returns:
+            Self: 组件索引
+        """
+
+        content = json.loads(path.read_bytes())
+        return cls(content["name"], content["components"])
+
+
+class _seekable_zstd_writer:
+    """将tar流切分为多个独立的zstd帧写入文件，并在关闭时追加帧索引表"""
+
+    _file: typing.BinaryIO
+    _compressor: zstandard.ZstdCompressor
+    _frame_size: int
+    _seek_table: zstd_seek_table
+    _compressobj: "zstandard.ZstdCompressionObj | None"
+    _compressed_size: int
+    _decompressed_size: int
+    _frame_index: zstd_frame_index
+    _member_start_frame: int
+
+    def __init__(self, file: typing.BinaryIO, compressor: zstandard.ZstdCompressor, frame_size: int) -> None:
+        """创建可寻址格式的写入器
+
+        Args:
+            file (typing.BinaryIO): 输出文件
+            compressor (zstandard.ZstdCompressor): zstd压缩器
+            frame_size (int): 每帧未压缩数据的目标大小
+        """
+
+        self._file = file
+        self._compressor = compressor
+        self._frame_size = frame_size
+        self._seek_table = zstd_seek_table()
+        self._compressobj = None
+        self._compressed_size = 0
+        self._decompressed_size = 0
+        self._frame_index = zstd_frame_index([[]], [False])
+        self._member_start_frame = 0
+
+    def _write_compressed(self, data: bytes) -> None:
+        self._file.write(data)
+        self._compressed_size += len(data)
+
+    def write(self, data: typing.Any) -> int:
+        """写入一段tar流
+
+        Args:
+            data (typing.Any): 支持缓冲区协议的数据
+
+        Returns:
+            int: 写入的字节数
+        """
+
+        size = len(data)
+        if self._decompressed_size + size > zstd_seek_table.max_frame_size:
+            self.end_frame()
+        if self._compressobj is None:
+            self._compressobj = self._compressor.compressobj()
+        self._write_compressed(self._compressobj.compress(data))
+        self._decompressed_size += size
+        return size
+
+    def end_member(self, pathname: str) -> None:
+        """在一个tar成员写入完成后调用，记录成员所在的帧，当前帧达到目标大小时结束该帧
+
+        Args:
+            pathname (str): tar成员路径
+        """
+
+        member_list, continued_list = self._frame_index.member_list, self._frame_index.continued_list
+        member_list[self._member_start_frame].append(pathname)
+        # 成员写入过程中因帧大小超过上限而结束的帧，其后续帧以该成员的剩余部分开头
+        while len(member_list) < len(self._seek_table.frame_list) + 1:
+            member_list.append([])
+            continued_list.append(True)
+        if self._decompressed_size >= self._frame_size:
+            self.end_frame()
+            member_list.append([])
+            continued_list.append(False)
+        self._member_start_frame = len(member_list) - 1
+
+    def end_frame(self) -> None:
+        """结束当前帧"""
+
+        if self._compressobj is None:
+            return
+        self._write_compressed(self._compressobj.flush())
+        self._seek_table.frame_list.append((self._compressed_size, self._decompressed_size))
+        self._compressobj = None
+        self._compressed_size = 0
+        self._decompressed_size = 0
+
+    def close(self) -> None:
+        """结束最后一帧，写入成员列表和帧索引表"""
+
+        self.end_frame()
+        frame_count = len(self._seek_table.frame_list)
+        del self._frame_index.member_list[frame_count:]
+        del self._frame_index.continued_list[frame_count:]
+        index = self._frame_index.dump()
+        self._file.write(index)
+        self._seek_table.frame_list.append((len(index), 0))
+        self._file.write(self._seek_table.dump())
+
+
+class _parallel_zstd_reader:
+    """使用线程池并行解压可寻址格式的各个帧，并按顺序提供解压后的数据"""
+
+    _file: typing.BinaryIO
+    _frame_list: list[tuple[int, int, int]]
+    _max_window_size: int
+    _executor: concurrent.futures.ThreadPoolExecutor
+    _pending: collections.deque[tuple[concurrent.futures.Future[bytes], int]]
+    _next_frame: int
+    _prefetch: int
+    _buffer: memoryview
+    _local: threading.local
+    compressed_position: int  # 已输出的帧的压缩后大小之和，用于统计进度
+
+    def __init__(self, file: typing.BinaryIO, frame_list: list[tuple[int, int, int]], jobs: int, max_window_size: int) -> None:
+        """创建并行读取器
+
+        Args:
+            file (typing.BinaryIO): 压缩包文件
+            frame_list (list[tuple[int, int, int]]): 要解压的各个帧的(偏移量, 压缩后大小, 解压后大小)
+            jobs (int): 解压线程数
+            max_window_size (int): 允许的最大窗口大小
+        """
+
+        self._file = file
+        # 不含数据的可跳过帧无需解压
+        self._frame_list = [frame for frame in frame_list if frame[2]]
+        self._max_window_size = max_window_size
+        self._executor = concurrent.futures.ThreadPoolExecutor(jobs)
+        self._pending = collections.deque()
+        self._next_frame = 0
+        self._buffer = memoryview(b"")
+        self.compressed_position = 0
+        self._local = threading.local()
+        # 预取的帧数，限制同时驻留在内存中的解压数据量
+        self._prefetch = jobs * 2
+        self._fill()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_: typing.Any) -> None:
+        self.close()
+
+    def _decompress_frame(self, offset: int, compressed: int, decompressed: int) -> bytes:
+        """解压一帧，在线程池中执行
+
+        Args:
+            offset (int): 帧在文件中的偏移量
+            compressed (int): 压缩后大小
+            decompressed (int): 解压后大小
+
+        Returns:
+            bytes: 解压结果
+        """
+
+        decompressor: zstandard.ZstdDecompressor | None = getattr(self._local, "decompressor", None)
+        if decompressor is None:
+            decompressor = zstandard.ZstdDecompressor(max_window_size=self._max_window_size)
+            self._local.decompressor = decompressor
+        data = os.pread(self._file.fileno(), compressed, offset)
+        return decompressor.decompress(data, max_output_size=decompressed)
+
+    def _fill(self) -> None:
+        """提交后续帧的解压任务直到预取数量达到上限"""
+
+        while len(self._pending) < self._prefetch and self._next_frame < len(self._frame_list):
+            frame = self._frame_list[self._next_frame]
+            self._pending.append((self._executor.submit(self._decompress_frame, *frame), frame[1]))
+            self._next_frame += 1
+
+    def readinto(self, buffer: typing.Any) -> int:
+        """读取解压后的数据，供libarchive.stream_reader使用
+
+        Args:
+            buffer (typing.Any): 输出缓冲区
+
+        Returns:
+            int: 读取的字节数，0表示读取结束
+        """
+
+        while not self._buffer:
+            if not self._pending:
+                return 0
+            future, compressed = self._pending.popleft()
+            self._buffer = memoryview(future.result())
+            self.compressed_position += compressed
+            self._fill()
+        output = memoryview(buffer).cast("B")
+        size = min(len(output), len(self._buffer))
+        output[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def seekable(self) -> bool:
+        return False
+
+    def close(self) -> None:
+        """取消未完成的解压任务并关闭线程池"""
+
+        for future, _ in self._pending:
+            future.cancel()
+        self._executor.shutdown()
+
+
+# 解包时恢复权限和修改时间，并拒绝逃逸出解包目录的路径，两种解包方式得到相同的目录树
+_extract_flags: typing.Final[int] = libarchive.extract.PREVENT_ESCAPE | libarchive.extract.EXTRACT_PERM | libarchive.extract.EXTRACT_TIME
+
+
+class _parallel_extractor:
+    """在当前线程解析tar流，使用线程池创建和写入文件
+
+    小文件和软链接按批提交给线程池以减少调度开销.
+    目录按成员顺序在当前线程中创建，所有文件写入完成后再自深向浅设置目录的权限和修改时间.
+    与以_extract_flags调用libarchive.extract相同，拒绝绝对路径、包含..的路径以及穿过已解包软链接的路径.
+    """
+
+    _jobs: int
+    _max_inflight: int
+    _block_size: int
+    _dir_set: set[str]
+    _symlink_set: set[str]
+    _dir_list: list[tuple[str, int, int]]
+    _file_map: dict[str, int]  # 文件路径->所在批的序号
+    _batch: list[tuple[str, bytes | str | None, int, int]]
+    _batch_size: int
+    _pending: collections.deque[tuple[concurrent.futures.Future[None], int]]
+    _future_list: list[concurrent.futures.Future[None]]
+    _inflight: int
+
+    batch_count: typing.ClassVar[int] = 64  # 每批最多包含的成员数
+    batch_size: typing.ClassVar[int] = 1 << 20  # 每批最多包含的文件内容大小
+
+    def __init__(self, jobs: int, max_inflight: int, block_size: int) -> None:
+        """创建解包器
+
+        Args:
+            jobs (int): 写入线程数
+            max_inflight (int): 等待写入的文件内容总量的上限(字节)
+            block_size (int): 读取较大的文件内容时的块大小
+        """
+
+        self._jobs = jobs
+        self._max_inflight = max_inflight
+        self._block_size = block_size
+        self._dir_set = {"", "."}
+        self._symlink_set = set()
+        self._dir_list = []
+        self._file_map = {}
+        self._batch = []
+        self._batch_size = 0
+        self._pending = collections.deque()
+        self._future_list = []
+        self._inflight = 0
+
+    def _check_path(self, path: str) -> str:
+        """检查成员路径是否会逃逸出解包目录
+
+        Args:
+            path (str): 成员路径
+
+        Returns:
+            str: 去除末尾/后的路径
+        """
+
+        path = path.rstrip("/")
+        part_list = path.split("/")
+        if os.path.isabs(path) or ".." in part_list:
+            raise RuntimeError(toolchains_error(f"Refuse to extract {path} outside the output directory."))
+        if self._symlink_set:
+            for i in range(1, len(part_list)):
+                if "/".join(part_list[:i]) in self._symlink_set:
+                    raise RuntimeError(toolchains_error(f"Refuse to extract {path} through a symlink."))
+        return path
+
+    def _make_parent(self, path: str) -> None:
+        """创建成员的上级目录，被过滤掉的上级目录使用默认权限创建
+
+        Args:
+            path (str): 成员路径
+        """
+
+        parent = os.path.dirname(path)
+        if parent not in self._dir_set:
+            os.makedirs(parent, exist_ok=True)
+            while parent not in self._dir_set:
+                self._dir_set.add(parent)
+                parent = os.path.dirname(parent)
+
+    @staticmethod
+    def _get_mode(entry: typing.Any) -> int:
+        """获取成员解包后的权限，与不恢复属主时libarchive的行为一致，属主或属组与当前用户不同时去除setuid或setgid位
+
+        Args:
+            entry (typing.Any): libarchive成员
+
+        Returns:
+            int: 权限
+        """
+
+        mode: int = entry.perm
+        if entry.uid != os.geteuid():
+            mode &= ~stat.S_ISUID
+        if entry.gid != os.getegid():
+            mode &= ~stat.S_ISGID
+        return mode
+
+    @staticmethod
+    def _get_mtime_ns(entry: typing.Any) -> int:
+        """获取成员的修改时间
+
+        Args:
+            entry (typing.Any): libarchive成员
+
+        Returns:
+            int: 修改时间(纳秒)
+        """
+
+        return int(libarchive.ffi.entry_mtime(entry._entry_p)) * 1_000_000_000 + int(libarchive.ffi.entry_mtime_nsec(entry._entry_p))
+
+    @staticmethod
+    def _write_batch(batch: list[tuple[str, bytes | str | None, int, int]]) -> None:
+        """写入一批普通文件和软链接并设置权限和修改时间，在线程池中执行
+
+        Args:
+            batch (list[tuple[str, bytes | str | None, int, int]]): (路径, 文件内容或软链接目标, 权限, 修改时间)列表，
+                文件内容为None表示文件内容已经写入，权限为-1表示软链接
+        """
+
+        for path, data, mode, mtime_ns in batch:
+            if mode < 0:
+                assert isinstance(data, str)
+                if os.path.lexists(path):
+                    os.unlink(path)
+                os.symlink(data, path)
+                os.utime(path, ns=(mtime_ns, mtime_ns), follow_symlinks=False)
+                continue
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_CLOEXEC | (os.O_TRUNC if data is not None else 0), 0o600)
+            try:
+                view = memoryview(data) if isinstance(data, bytes) else memoryview(b"")
+                while view:
+                    view = view[os.write(fd, view) :]
+                os.fchmod(fd, mode)
+                os.utime(fd, ns=(mtime_ns, mtime_ns))
+            finally:
+                os.close(fd)
+
+    def _submit_batch(self, executor: concurrent.futures.ThreadPoolExecutor) -> None:
+        """将当前批提交给线程池
+
+        Args:
+            executor (concurrent.futures.ThreadPoolExecutor): 线程池
+        """
+
+        if self._batch:
+            future = executor.submit(self._write_batch, self._batch)
+            self._future_list.append(future)
+            self._pending.append((future, self._batch_size))
+            self._inflight += self._batch_size
+            self._batch, self._batch_size = [], 0
+
+    def _wait_file(self, path: str, executor: concurrent.futures.ThreadPoolExecutor) -> None:
+        """等待文件写入完成
+
+        Args:
+            path (str): 文件路径
+            executor (concurrent.futures.ThreadPoolExecutor): 线程池
+        """
+
+        if (index := self._file_map.get(path)) is not None:
+            if index == len(self._future_list):
+                self._submit_batch(executor)
+            self._future_list[index].result()
+
+    def extract(self, entry_iter: typing.Iterable[typing.Any]) -> None:
+        """将tar成员解包到当前工作目录
+
+        Args:
+            entry_iter (typing.Iterable[typing.Any]): libarchive成员迭代器
+        """
+
+        with concurrent.futures.ThreadPoolExecutor(self._jobs) as executor:
+            for entry in entry_iter:
+                path = self._check_path(entry.pathname)
+                if not path:
+                    continue
+                self._make_parent(path)
+                mode = self._get_mode(entry)
+                mtime_ns = self._get_mtime_ns(entry)
+                if entry.isdir:
+                    # 解包期间保证目录可写，权限在所有文件写入完成后再设置
+                    if path not in self._dir_set:
+                        os.makedirs(path, 0o700, exist_ok=True)
+                        self._dir_set.add(path)
+                    self._dir_list.append((path, mode, mtime_ns))
+                elif entry.islnk:
+                    target = self._check_path(entry.linkpath)
+                    self._wait_file(target, executor)
+                    if os.path.lexists(path):
+                        os.unlink(path)
+                    os.link(target, path, follow_symlinks=False)
+                elif entry.issym:
+                    self._batch.append((path, entry.linkpath, -1, mtime_ns))
+                    self._symlink_set.add(path)
+                elif entry.isreg:
+                    size = entry.size or 0
+                    data: bytes | None = b""
+                    if size > self.batch_size:
+                        # 较大的文件在当前线程中流式写入，只将设置属性的操作交给线程池
+                        with open(path, "wb") as file:
+                            for block in entry.get_blocks(self._block_size):
+                                file.write(block)
+                        data = None
+                    elif size:
+                        data = b"".join(entry.get_blocks(size))
+                        self._batch_size += size
+                    self._batch.append((path, data, mode, mtime_ns))
+                    self._file_map[path] = len(self._future_list)
+                else:
+                    libarchive.extract.extract_entries([entry], _extract_flags)
+                if len(self._batch) >= self.batch_count or self._batch_size >= self.batch_size:
+                    self._submit_batch(executor)
+                while self._pending and (self._inflight > self._max_inflight or self._pending[0][0].done()):
+                    future, size = self._pending.popleft()
+                    future.result()
+                    self._inflight -= size
+            self._submit_batch(executor)
+            for future, _ in self._pending:
+                future.result()
+        for path, mode, mtime_ns in reversed(self._dir_list):
+            os.chmod(path, mode)
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+class compress_environment:
+    """打包压缩时使用的环境"""
+
+    jobs: int  # 编译所用线程数
+    prefix_dir: Path  # 安装路径
+    compress_level: compress_level_t  # zstd压缩等级，auto表示根据采样结果自动选择
+    long_distance_match: int  # 长距离匹配窗口大小
+    frame_size: int  # 可寻址格式中每帧未压缩数据的目标大小，为0表示使用单帧格式
+    manifest: bool  # 是否在压缩包中附带工具链清单
+    hardlink: bool  # 是否将工具链中重复的文件替换为硬链接，并在压缩包中写入硬链接成员
+    compress_time_limit: float | None  # 自动选择压缩等级时，预计压缩用时的上限(秒)
+    min_decompress_speed: float | None  # 自动选择压缩等级时，单线程解压速度的下限(MB/s)
+    memory_limit: int | None  # 压缩和解压缩的内存预算(字节)，为None表示不限制
+    threaded_extract: bool  # 是否使用线程池创建和写入解包的文件，为否或单线程时使用libarchive解包
+    deterministic: bool  # 是否生成可复现的压缩包，相同的输入总是得到逐字节相同的输出
+    codec: codec_t  # 压缩包的压缩格式，可寻址格式、差分包和压缩等级自动选择只支持zstd
+    debug_info: debug_info_t  # 打包前如何处理ELF文件中的调试信息：保留、原地压缩调试信息节或拆分到单独的调试信息包
+    split_components: bool  # 是否按组件将工具链拆分为多个压缩包，并生成组件索引
+
+    stream_block_size: typing.ClassVar[int] = 1 << 20  # 在libarchive和zstd之间流式传递数据时的块大小
+    default_compress_level: typing.ClassVar[int] = 19  # 无法自动选择压缩等级时使用的默认等级
+    default_compress_time_limit: typing.ClassVar[float] = 600  # 未指定任何目标时的预计压缩用时上限
+    tune_level_list: typing.ClassVar[list[int]] = [3, 9, 15, 19, 22]  # 自动选择时尝试的压缩等级
+    tune_sample_block: typing.ClassVar[int] = 1 << 20  # 自动选择时每个采样块的大小
+    tune_sample_count: typing.ClassVar[int] = 16  # 自动选择时的采样块数
+    default_lz4_level: typing.ClassVar[int] = 0  # 压缩等级为auto时lz4使用的压缩等级
+    max_lz4_level: typing.ClassVar[int] = 16  # lz4的最高压缩等级
+    lz4_block_size: typing.ClassVar[int] = 4 << 20  # lz4帧的最大块大小
+    compress_memory_factor: typing.ClassVar[int] = 4  # 多线程压缩时每个线程的窗口、匹配表和任务缓冲区约为窗口大小的倍数
+    prefetch_size: typing.ClassVar[int] = 64 << 20  # 打包时预读中和解包时等待写入的文件内容总量的上限
+    min_window_log: typing.ClassVar[int] = 20  # 根据内存预算缩小窗口时的下限，更小的窗口会明显降低压缩率
+    debug_suffix: typing.ClassVar[str] = "-debug"  # 调试信息包相对于工具链名称的后缀
+    debug_compress_type_list: typing.ClassVar[list[str]] = ["zstd", "zlib"]  # 原地压缩调试信息节时依次尝试的压缩算法
+
+    def __init__(
+        self,
+        jobs: int,
+        prefix_dir: Path,
+        compress_level: compress_level_t,
+        long_distance_match: int,
+        frame_size: int = 0,
+        manifest: bool = True,
+        compress_time_limit: float | None = None,
+        min_decompress_speed: float | None = None,
+        hardlink: bool = True,
+        memory_limit: int | None = None,
+        threaded_extract: bool = True,
+        deterministic: bool = False,
+        codec: codec_t = "zstd",
+        debug_info: debug_info_t = "keep",
+        split_components: bool = False,
+    ) -> None:
+        self.jobs = jobs
+        self.prefix_dir = prefix_dir
+        self.compress_level = compress_level
+        self.long_distance_match = long_distance_match
+        self.frame_size = frame_size
+        self.manifest = manifest
+        self.compress_time_limit = compress_time_limit
+        self.min_decompress_speed = min_decompress_speed
+        self.hardlink = hardlink
+        self.memory_limit = memory_limit
+        self.threaded_extract = threaded_extract
+        self.deterministic = deterministic
+        self.codec = codec
+        self.debug_info = debug_info
+        self.split_components = split_components
+
+    @staticmethod
+    def _get_source_date_epoch() -> int:
+        """获取生成可复现的压缩包时使用的修改时间
+
+        Returns:
+            int: 环境变量SOURCE_DATE_EPOCH的值，未设置时为0
+        """
+
+        return int(os.environ.get("SOURCE_DATE_EPOCH", 0))
+
+    def _get_fixed_compress_level(self) -> int:
+        """获取不经过自动选择时使用的压缩等级
+
+        Returns:
+            int: 压缩等级
+        """
+
+        return self.default_compress_level if self.compress_level == "auto" else self.compress_level
+
+    def _sample_tar_stream(self, member_list: list[str]) -> tuple[bytes, int]:
+        """在所有文件的内容中等间距地读取若干块作为tar流的样本
+
+        Args:
+            member_list (list[str]): tar成员列表
+
+        Returns:
+            tuple[bytes, int]: 样本和所有文件的总大小
+        """
+
+        file_list = [(item, os.lstat(item).st_size) for item in member_list if os.path.isfile(item) and not os.path.islink(item)]
+        total_size = sum(size for _, size in file_list)
+        sample_size = self.tune_sample_block * self.tune_sample_count
+        step = max(total_size // self.tune_sample_count, 1) if total_size > sample_size else self.tune_sample_block
+        sample = bytearray()
+        point = offset = 0
+        for item, size in file_list:
+            if point < offset + size:
+                with open(item, "rb") as file:
+                    while point < offset + size and len(sample) < sample_size:
+                        file.seek(point - offset)
+                        sample += file.read(self.tune_sample_block)
+                        point += step
+            offset += size
+        return bytes(sample), total_size
+
+    def _tune_compress_parameters(self, member_list: list[str]) -> dict[str, typing.Any]:
+        """对tar流采样并测试不同的压缩等级和长距离匹配组合，选择满足目标的压缩率最高的组合
+
+        目标为预计压缩用时不超过compress_time_limit且解压速度不低于min_decompress_speed，未指定任何目标时限制压缩用时为default_compress_time_limit.
+
+        Args:
+            member_list (list[str]): tar成员列表
+
+        Returns:
+            dict[str, typing.Any]: 选择的压缩参数和测试结果
+        """
+
+        sample, total_size = self._sample_tar_stream(member_list)
+        if not sample:
+            return {"level": self.default_compress_level, "window_log": self.long_distance_match, "enable_ldm": True, "auto": True}
+        time_limit = self.compress_time_limit
+        if time_limit is None and self.min_decompress_speed is None:
+            time_limit = self.default_compress_time_limit
+        # 压缩多线程按块并行，因此按线程数折算预计用时
+        scale = total_size / len(sample) / max(self.jobs, 1)
+        decompressor = zstandard.ZstdDecompressor(max_window_size=1 << self.long_distance_match)
+        candidate_list: list[dict[str, typing.Any]] = []
+        for level in self.tune_level_list:
+            level_time = float("inf")
+            for enable_ldm in (True, False):
+                params = zstandard.ZstdCompressionParameters(
+                    compression_level=level, window_log=self.long_distance_match, enable_ldm=enable_ldm
+                )
+                start = time.perf_counter()
+                data = zstandard.ZstdCompressor(compression_params=params).compress(sample)
+                compress_time = (time.perf_counter() - start) * scale
+                start = time.perf_counter()
+                decompressor.decompress(data)
+                decompress_time = max(time.perf_counter() - start, 1e-9)
+                candidate_list.append(
+                    {
+                        "level": level,
+                        "window_log": self.long_distance_match,
+                        "enable_ldm": enable_ldm,
+                        "auto": True,
+                        "sample_ratio": round(len(sample) / len(data), 4),
+                        "estimated_compress_time": round(compress_time, 2),
+                        "decompress_speed": round(len(sample) / decompress_time / 1e6, 1),
+                    }
+                )
+                level_time = min(level_time, compress_time)
+            # 更高的压缩等级只会更慢
+            if time_limit is not None and level_time > time_limit:
+                break
+
+        satisfied_list = [
+            candidate
+            for candidate in candidate_list
+            if (time_limit is None or candidate["estimated_compress_time"] <= time_limit)
+            and (self.min_decompress_speed is None or candidate["decompress_speed"] >= self.min_decompress_speed)
+        ]
+        if satisfied_list:
+            return max(satisfied_list, key=lambda candidate: candidate["sample_ratio"])
+        toolchains_print(toolchains_warning("No compress parameters meet the target, use the fastest one."))
+        return min(candidate_list, key=lambda candidate: candidate["estimated_compress_time"])
+
+    def _get_compress_parameters(self, member_list: list[str]) -> dict[str, typing.Any]:
+        """获取压缩参数，zstd压缩等级为auto时通过采样测试选择
+
+        Args:
+            member_list (list[str]): tar成员列表
+
+        Returns:
+            dict[str, typing.Any]: 压缩参数，会记录在工具链清单的打包信息中
+        """
+
+        match self.codec:
+            case "lz4":
+                return {"codec": "lz4", "level": self._get_lz4_level()}
+            case "none":
+                return {"codec": "none"}
+        return {"codec": "zstd", **self._get_zstd_parameters(member_list)}
+
+    def _get_lz4_level(self) -> int:
+        """获取lz4的压缩等级，lz4压缩很快，无需采样测试
+
+        Returns:
+            int: lz4压缩等级
+        """
+
+        if self.compress_level == "auto":
+            return self.default_lz4_level
+        return min(max(self.compress_level, 0), self.max_lz4_level)
+
+    def _get_zstd_parameters(self, member_list: list[str]) -> dict[str, typing.Any]:
+        """获取zstd压缩参数，压缩等级为auto时通过采样测试选择
+
+        Args:
+            member_list (list[str]): tar成员列表
+
+        Returns:
+            dict[str, typing.Any]: zstd压缩参数
+        """
+
+        if self.compress_level != "auto":
+            return {"level": self.compress_level, "window_log": self.long_distance_match, "enable_ldm": True, "auto": False}
+        if self.deterministic:
+            # 自动选择依赖于机器的速度，无法保证输出可复现
+            toolchains_print(toolchains_warning(f"Use compress level {self.default_compress_level} instead of auto in deterministic mode."))
+            return {"level": self.default_compress_level, "window_log": self.long_distance_match, "enable_ldm": True, "auto": False}
+        parameters = self._tune_compress_parameters(member_list)
+        toolchains_print(
+            toolchains_info(
+                f"Select compress level {parameters["level"]} with long distance match {"on" if parameters["enable_ldm"] else "off"}."
+            )
+        )
+        return parameters
+
+    def _estimate_compress_memory(self, threads: int, window_log: int) -> int:
+        """估计zstd多线程压缩的内存占用
+
+        Args:
+            threads (int): 压缩线程数
+            window_log (int): 窗口大小的对数
+
+        Returns:
+            int: 估计的内存占用(字节)
+        """
+
+        return max(threads, 1) * (self.compress_memory_factor << window_log)
+
+    def _plan_compress_memory(self, window_log: int) -> tuple[int, int]:
+        """根据内存预算选择压缩线程数和窗口大小，优先减少线程数，仍超出预算时再缩小窗口
+
+        可复现模式下窗口大小会改变压缩结果，因此只减少线程数
+
+        Args:
+            window_log (int): 压缩参数中窗口大小的对数
+
+        Returns:
+            tuple[int, int]: 压缩线程数和窗口大小的对数
+        """
+
+        threads = self.jobs
+        if self.memory_limit is None:
+            return threads, window_log
+        while threads > 1 and self._estimate_compress_memory(threads, window_log) > self.memory_limit:
+            threads -= 1
+        while (
+            not self.deterministic
+            and window_log > self.min_window_log
+            and self._estimate_compress_memory(threads, window_log) > self.memory_limit
+        ):
+            window_log -= 1
+        if self._estimate_compress_memory(threads, window_log) > self.memory_limit:
+            toolchains_print(
+                toolchains_warning(
+                    f"Memory limit {self.memory_limit >> 20} MiB is too small to compress within"
+                    f"{", and the window is kept in deterministic mode" if self.deterministic else ""}."
+                )
+            )
+        return threads, window_log
+
+    def _get_window_size(self, zst: typing.BinaryIO) -> int:
+        """读取压缩包第一帧的窗口大小
+
+        Args:
+            zst (typing.BinaryIO): 压缩包文件
+
+        Returns:
+            int: 窗口大小，第一帧不是zstd数据帧时返回允许的最大窗口大小，lz4返回最大块大小，未压缩的tar返回0
+        """
+
+        match package_codec.detect(zst):
+            case "lz4":
+                return self.lz4_block_size
+            case "none":
+                return 0
+        # zstd帧头最长为18字节
+        header = os.pread(zst.fileno(), 18, 0)
+        if header.startswith(zstandard.FRAME_HEADER):
+            return zstandard.get_frame_parameters(header).window_size
+        return 1 << self.long_distance_match
+
+    def estimate_decompress_memory(self, path: str, threads: int) -> int:
+        """估计解压缩一个压缩包的内存占用
+
+        Args:
+            path (str): 压缩包(.tar.zst)、差分包(.delta.zst)或组件索引(.components.json)，是相对于self.prefix_dir的路径.
+            threads (int): 解压线程数
+
+        Returns:
+            int: 估计的内存占用(字节)
+        """
+
+        if package_component_index.is_index(self.prefix_dir / path):
+            # 各个组件包依次解压，取其中最大的内存占用
+            index_file = self.prefix_dir / path
+            package_list = package_component_index.load(index_file).get_package_list(index_file.parent)
+            return max(
+                (self.estimate_decompress_memory(str(file.relative_to(self.prefix_dir)), threads) for file in package_list), default=0
+            )
+        # libarchive和zstd之间的流式缓冲区
+        stream_size = 2 * self.stream_block_size
+        with (self.prefix_dir / path).open("rb") as zst:
+            if header := zstd_delta_header.load(zst):
+                # 基础包的解压数据同时作为字典和窗口驻留在内存中
+                return (2 << header.window_log) + stream_size
+            if threads > 1 and (seek_table := zstd_seek_table.load(zst)):
+                # 并行读取器最多预取2*threads帧，每帧的解压结果完整驻留在内存中
+                frame_size = max((frame[2] for frame in seek_table.get_frame_offset_list()), default=0)
+                return 2 * threads * frame_size + stream_size
+            return self._get_window_size(zst) + stream_size
+
+    def plan_decompress_memory(self, path_list: list[str]) -> tuple[int, int]:
+        """根据内存预算选择同时解压缩的压缩包数和每个压缩包的解压线程数，优先减少线程数，仍超出预算时再减少同时解压的压缩包数
+
+        Args:
+            path_list (list[str]): 要解压缩的压缩包列表，是相对于self.prefix_dir的路径.
+
+        Returns:
+            tuple[int, int]: 同时解压缩的压缩包数和每个压缩包的解压线程数
+        """
+
+        processes = max(min(self.jobs, len(path_list)), 1)
+        if self.memory_limit is None:
+            # 各个工作进程平分线程数，避免并行读取器和解包线程在每个进程中都使用全部线程
+            return processes, max(self.jobs // processes, 1)
+        estimate = functools.cache(self.estimate_decompress_memory)
+        for processes in range(processes, 0, -1):
+            for threads in range(max(self.jobs // processes, 1), 0, -1):
+                # 最坏情况下最大的若干个压缩包同时解压
+                memory_list = sorted((estimate(path, threads) for path in path_list), reverse=True)
+                if sum(memory_list[:processes]) <= self.memory_limit:
+                    return processes, threads
+        toolchains_print(toolchains_warning(f"Memory limit {self.memory_limit >> 20} MiB is too small to decompress within."))
+        return 1, 1
+
+    @staticmethod
+    def _add_manifest(tar: typing.Any, path: str, manifest: package_manifest) -> None:
+        """将工具链清单作为最后一个成员写入压缩包
+
+        Args:
+            tar (typing.Any): libarchive写入器
+            path (str): 工具链路径
+            manifest (package_manifest): 工具链清单
+        """
+
+        data = manifest.dump()
+        tar.add_file_from_memory(package_manifest.get_path(path), len(data), data, permission=0o644, mtime=(0, 0))
+
+    def _get_max_inflight(self) -> int:
+        """获取打包预读和解包写入时驻留在内存中的文件内容总量的上限，设置了内存预算时按比例限制
+
+        Returns:
+            int: 文件内容总量的上限(字节)
+        """
+
+        return self.prefetch_size if self.memory_limit is None else min(self.prefetch_size, self.memory_limit // 8)
+
+    def _get_io_jobs(self) -> int:
+        """获取文件读写线程池的线程数，与ThreadPoolExecutor的默认线程数一致，等待I/O时仍有空闲线程
+
+        Returns:
+            int: 线程数
+        """
+
+        return min(32, self.jobs + 4)
+
+    def _get_member_prefetcher(
+        self, member_list: list[str], link_map: dict[str, str], tar: typing.Any, digest: bool = False
+    ) -> _member_prefetcher:
+        """创建tar成员预读器
+
+        Args:
+            member_list (list[str]): tar成员列表
+            link_map (dict[str, str]): 重复文件->第一个相同文件
+            tar (typing.Any): libarchive写入器
+            digest (bool, optional): 是否计算普通文件内容的摘要. 默认不计算.
+
+        Returns:
+            _member_prefetcher: 成员预读器
+        """
+
+        mtime = self._get_source_date_epoch() if self.deterministic else None
+        return _member_prefetcher(member_list, link_map, self._get_io_jobs(), self._get_max_inflight(), tar.header_codec, mtime, digest)
+
+    @staticmethod
+    def _fill_manifest_digest(manifest: package_manifest, prefetcher: _member_prefetcher) -> None:
+        """将预读器写入压缩包时计算的摘要填入清单
+
+        Args:
+            manifest (package_manifest): 工具链清单
+            prefetcher (_member_prefetcher): 已经写入全部成员的预读器
+        """
+
+        for entry in manifest.entry_list:
+            if "size" in entry:
+                entry["blake2b"] = prefetcher.digest_map[entry["path"]]
+
+    @support_dry_run(_compress_path_echo)
+    def compress_path(
+        self,
+        path: str,
+        output_dir: Path | None = None,
+        chdir: bool = True,
+        dry_run: bool | None = None,
+    ) -> None:
+        """压缩指定目标，会先按self.debug_info处理调试信息，拆分出的调试信息包随后单独压缩
+
+        Args:
+            path (str): 要压缩的目标路径，是相对于self.prefix_dir的路径.
+            output_dir (Path | None, optional): 压缩后文件输出路径. 默认为self.prefix_dir.
+            chdir (bool, optional): 是否切换工作目录. 默认为切换到self.prefix_dir下.
+            dry_run (bool | None, optional): 是否只回显命令而不执行，默认为None.
+        """
+
+        # 打包时会切换工作目录，先将输出目录转化为绝对路径
+        output_dir = (output_dir or self.prefix_dir).absolute()
+        with chdir_guard(self.prefix_dir) if chdir else nullcontext():
+            debug_path = self.process_debug_info(path)
+            # 已安装的工具链中可能带有旧的清单，打包时总是跳过它
+            member_list = [item for item in walk_path(path) if item != package_manifest.get_path(path)]
+            link_map = link_duplicate_files(member_list, self.jobs) if self.hardlink else {}
+            # 文件摘要在打包时由预读器根据读取的文件内容计算，无需单独读取一遍工具链
+            manifest = package_manifest.create(Path.cwd(), path, self.jobs, False) if self.manifest else None
+            if self.split_components:
+                self._compress_components(path, output_dir, member_list, link_map, manifest)
+            else:
+                self._compress_members(path, output_dir / f"{path}{package_codec.get_suffix(self.codec)}", member_list, link_map, manifest)
+        if debug_path:
+            self.compress_path(debug_path, output_dir, chdir, dry_run=False)
 
+    def _compress_components(
+        self, path: str, output_dir: Path, member_list: list[str], link_map: dict[str, str], manifest: package_manifest | None
+    ) -> None:
+        """将工具链按组件拆分为多个压缩包，并生成组件索引
 
-def add_environ(key: str, value: str | Path) -> None:
-    """添加系统环境变量
+        Args:
+            path (str): 工具链路径
+            output_dir (Path): 压缩包输出目录
+            member_list (list[str]): tar成员列表
+            link_map (dict[str, str]): 硬链接成员到链接目标的映射
+            manifest (package_manifest | None): 整个工具链的清单，每个组件包只附带其成员的部分
+        """
 
-    Args:
-        key (str): 环境变量名称
-        value (str | Path): 环境变量的值
-    """
+        index = package_component_index(Path(path).name)
+        for component, component_list in package_component_index.split(path, member_list).items():
+            file_name = f"{Path(path).name}.{component}{package_codec.get_suffix(self.codec)}"
+            member_set = {*component_list}
+            # 链接目标在其他组件中的文件作为普通文件打包
+            component_link_map = {item: target for item, target in link_map.items() if item in member_set and target in member_set}
+            component_manifest = None
+            if manifest:
+                entry_list = [entry for entry in manifest.entry_list if entry["path"] in member_set]
+                component_manifest = package_manifest(manifest.name, entry_list, {**manifest.metadata, "component": component})
+            output = output_dir / Path(path).parent / file_name
+            self._compress_members(path, output, component_list, component_link_map, component_manifest)
+            size = sum(os.lstat(item).st_size for item in component_list if os.path.isfile(item) and not os.path.islink(item))
+            index.component_map[component] = {"file": file_name, "size": output.stat().st_size, "uncompressed_size": size}
+        (output_dir / package_component_index.get_path(path)).write_bytes(index.dump())
+
+    def _compress_members(
+        self, path: str, output: Path, member_list: list[str], link_map: dict[str, str], manifest: package_manifest | None
+    ) -> None:
+        """将tar成员打包压缩到一个压缩包中
 
-    value = str(value)
-    os.environ[key] = value
+        Args:
+            path (str): 工具链路径
+            output (Path): 压缩包路径
+            member_list (list[str]): tar成员列表
+            link_map (dict[str, str]): 硬链接成员到链接目标的映射
+            manifest (package_manifest | None): 工具链清单，为None时不附带清单
+        """
 
+        with output.open("wb") as zst:
+            parameters = self._get_compress_parameters(member_list)
+            compressor = self._get_zstd_compressor(path, parameters) if self.codec == "zstd" else None
+            if manifest:
+                manifest.metadata["compress"] = parameters
+            total_size = sum(os.lstat(item).st_size for item in member_list) if progress_tracker.enabled() else 0
+            tracker = progress_tracker(output.name, "compress", total_size)
+            if compressor and self.frame_size:
+                # 在tar成员边界处切分独立的zstd帧，并在末尾附加帧索引表以支持并行解压
+                # 关闭libarchive的块缓冲，保证每个成员写入完成时数据已全部送达写入器
+                seekable_writer = _seekable_zstd_writer(zst, compressor, self.frame_size)
+                progress_writer = _progress_writer(seekable_writer.write, tracker, zst)
+                with libarchive.custom_writer(progress_writer.write, "pax", block_size=0) as tar:
+                    prefetcher = self._get_member_prefetcher(member_list, link_map, tar, manifest is not None)
+                    for item, entry, data in prefetcher:
+                        prefetcher.write(tar, item, entry, data, self.stream_block_size)
+                        seekable_writer.end_member(item)
+                    if manifest:
+                        self._fill_manifest_digest(manifest, prefetcher)
+                        self._add_manifest(tar, path, manifest)
+                        seekable_writer.end_member(package_manifest.get_path(path))
+                seekable_writer.close()
+            else:
+                # libarchive输出的tar流直接送入流式压缩器，不再经过临时文件
+                with self._open_package_writer(zst, compressor, parameters) as writer:
+                    progress_writer = _progress_writer(writer.write, tracker, zst)
+                    with libarchive.custom_writer(progress_writer.write, "pax", block_size=self.stream_block_size) as tar:
+                        prefetcher = self._get_member_prefetcher(member_list, link_map, tar, manifest is not None)
+                        for item, entry, data in prefetcher:
+                            prefetcher.write(tar, item, entry, data, self.stream_block_size)
+                        if manifest:
+                            self._fill_manifest_digest(manifest, prefetcher)
+                            self._add_manifest(tar, path, manifest)
+            tracker.finish(zst.tell())
+
+    def _get_zstd_compressor(self, path: str, parameters: dict[str, typing.Any]) -> zstandard.ZstdCompressor:
+        """根据压缩参数和内存预算创建zstd压缩器，会修改压缩参数中的窗口大小
 
-def insert_environ(key: str, value: str | Path) -> None:
-    """在现有环境变量的前端插入新的值
+        Args:
+            path (str): 要压缩的目标路径
+            parameters (dict[str, typing.Any]): zstd压缩参数
 
-    Args:
-        key (str): 环境变量名称
-        value (str | Path): 环境变量的值
-    """
+        Returns:
+            zstandard.ZstdCompressor: zstd压缩器
+        """
 
-    value = str(value)
-    os.environ[key] = f"{value}{os.pathsep}{os.environ[key]}"
+        # 线程数至少为1时zstd使用多线程模式，输出与线程数无关，但与窗口大小有关，因此可复现模式下内存预算只能减少线程数
+        threads, parameters["window_log"] = self._plan_compress_memory(parameters["window_log"])
+        if self.memory_limit is not None:
+            toolchains_print(
+                toolchains_info(f"Compress {path} with {threads} threads and window 2^{parameters["window_log"]} within memory limit.")
+            )
+        params = zstandard.ZstdCompressionParameters(
+            compression_level=parameters["level"],
+            window_log=parameters["window_log"],
+            enable_ldm=parameters["enable_ldm"],
+            threads=threads,
+        )
+        return zstandard.ZstdCompressor(compression_params=params)
 
+    @contextmanager
+    def _open_package_writer(
+        self, zst: typing.BinaryIO, compressor: zstandard.ZstdCompressor | None, parameters: dict[str, typing.Any]
+    ) -> Generator[typing.Any, None, None]:
+        """打开压缩包的流式写入器
 
-def get_environ_list(key: str, no_exist_ok: bool = False) -> list[str]:
-    """获取根据os.pathsep分割的环境变量值列表
+        Args:
+            zst (typing.BinaryIO): 压缩包文件
+            compressor (zstandard.ZstdCompressor | None): zstd压缩器，其他压缩格式为None
+            parameters (dict[str, typing.Any]): 压缩参数
 
-    Args:
-        key (str): 环境变量名称
-        no_exist_ok(bool): 环境变量不存在时是否正常执行并返回空列表而不是抛出异常. 默认为否.
+        Yields:
+            Generator[typing.Any, None, None]: 支持write的写入器，数据压缩后写入压缩包文件
+        """
 
-    Returns:
-        list[str]: 分割后的列表
-    """
+        match self.codec:
+            case "zstd":
+                assert compressor, toolchains_error("A zstd compressor is required.", message_type.toolchain_internal)
+                with compressor.stream_writer(zst, closefd=False) as writer:
+                    yield writer
+            case "lz4":
+                import lz4.frame
 
-    env = os.environ.get(key, "") if no_exist_ok else os.environ[key]
-    return env.split(os.pathsep)
+                with lz4.frame.LZ4FrameFile(zst, "wb", compression_level=parameters["level"]) as writer:
+                    yield writer
+            case _:
+                yield zst
 
+    @contextmanager
+    def _open_package_reader(
+        self, zst: typing.BinaryIO, base: str | None = None, selector: member_filter | None = None
+    ) -> Generator[typing.Any, None, None]:
+        """根据文件头部的魔数识别压缩格式，并打开压缩包的解压数据流
 
-def set_environ_list(key: str, value: list[str]) -> None:
-    """将环境变量值列表设置到当前进程的环境变量中
+        Args:
+            zst (typing.BinaryIO): 压缩包文件
+            base (str | None, optional): 差分包的基础包，是相对于self.prefix_dir的路径. 默认不是差分包.
+            selector (member_filter | None, optional): 成员过滤器，仅用于跳过zstd可寻址格式中不需要的帧. 默认解压所有成员.
 
-    Args:
-        key (str): 环境变量名称
-        value (list[str]): 值列表
-    """
+        Yields:
+            Generator[typing.Any, None, None]: 支持readinto的解压数据流
+        """
 
-    os.environ[key] = os.pathsep.join(value)
+        # 差分包总是使用zstd压缩
+        match "zstd" if base else package_codec.detect(zst):
+            case "zstd":
+                with self._open_zstd_reader(zst, base, selector) as reader:
+                    yield reader
+            case "lz4":
+                import lz4.frame
+
+                with lz4.frame.LZ4FrameFile(zst, "rb") as reader:
+                    yield reader
+            case "none":
+                yield zst
+            case _:
+                raise RuntimeError(toolchains_error(f"{zst.name} is not a package compressed by a known codec."))
 
+    @staticmethod
+    def _get_objcopy() -> str:
+        """获取处理调试信息使用的objcopy，优先使用支持所有架构的llvm-objcopy
 
-@contextmanager
-def chdir_guard(path: Path, dry_run: bool | None = None) -> Generator[Path, None, None]:
-    """临时进入指定的工作目录
+        Returns:
+            str: objcopy命令，可以通过环境变量OBJCOPY指定
+        """
 
-    Args:
-        path (Path): 要进入的工作目录
-        dry_run (bool | None, optional): 是否只回显而不运行命令. 默认为None.
-    """
-    cwd = chdir(path, dry_run) or Path()
-    yield cwd
-    chdir(cwd, dry_run)
+        return os.environ.get("OBJCOPY") or shutil.which("llvm-objcopy") or "objcopy"
 
+    def _process_debug_file(self, objcopy: str, file: str, debug_file: str | None, strip: bool) -> bool:
+        """处理一个ELF文件的调试信息，保持文件的inode和修改时间不变，使硬链接仍然指向处理后的文件
 
-def _check_lib_dir_echo(lib: str, lib_dir: Path, dry_run: bool | None) -> str:
-    """在检查库目录是否存在时回显信息
+        Args:
+            objcopy (str): objcopy命令
+            file (str): ELF文件路径
+            debug_file (str | None): 调试信息的输出文件，为None时不输出调试信息
+            strip (bool): 是否剥离调试信息，为否时原地压缩调试信息节
 
-    Args:
-        lib (str): 库名称
-        lib_dir (Path): 库目录
+        Returns:
+            bool: 是否处理成功，失败时文件保持不变
+        """
 
-    Returns:
-        str: 回显信息
-    """
+        file_stat = os.lstat(file)
+        try:
+            with tempfile.TemporaryDirectory(dir=os.path.dirname(file)) as tmp_dir:
+                output = os.path.join(tmp_dir, os.path.basename(file))
+                command_list: list[list[list[str]]] = []
+                if debug_file:
+                    os.makedirs(os.path.dirname(debug_file), exist_ok=True)
+                    command_list.append([[objcopy, "--only-keep-debug", file, debug_file]])
+                if strip:
+                    command_list.append([[objcopy, "--strip-debug", file, output]])
+                else:
+                    # objcopy不一定支持zstd，此时退回到zlib
+                    command_list.append(
+                        [[objcopy, f"--compress-debug-sections={type}", file, output] for type in self.debug_compress_type_list]
+                    )
+                for candidate_list in command_list:
+                    for command in candidate_list:
+                        result = subprocess.run(command, capture_output=True, text=True)
+                        if not result.returncode:
+                            break
+                    else:
+                        toolchains_print(toolchains_warning(f"Cannot process debug info of {file}: {result.stderr.strip()}"))
+                        return False
+                # 只读文件临时添加属主写权限，写回后恢复原来的权限
+                read_only = not file_stat.st_mode & stat.S_IWUSR
+                if read_only:
+                    os.chmod(file, stat.S_IMODE(file_stat.st_mode) | stat.S_IWUSR)
+                try:
+                    shutil.copyfile(output, file)
+                finally:
+                    if read_only:
+                        os.chmod(file, stat.S_IMODE(file_stat.st_mode))
+            os.utime(file, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns))
+        except OSError as e:
+            toolchains_print(toolchains_warning(f"Cannot process debug info of {file}: {e}"))
+            return False
+        return True
 
-    basic_info = toolchains_info(f"Checking {lib} in {lib_dir} ... ")
-    if need_dry_run(dry_run):
-        return basic_info + toolchains_note("skip for dry run\n", message_type.none)
-    else:
-        return basic_info
+    def process_debug_info(self, path: str) -> str | None:
+        """按self.debug_info并行处理工具链中带有调试信息的ELF文件
 
+        拆分模式下有build-id的文件的调试信息移动到path-debug/.build-id/xx/yyyy.debug，gdb将该目录作为debug-file-directory即可找到，
+        没有build-id的文件退化为原地压缩调试信息节. 已有的调试信息包不会被删除，新拆分出的调试信息合并到其中，
+        因此重复处理已剥离的工具链不会丢失之前拆分出的调试信息.
 
-@support_dry_run(_check_lib_dir_echo, "")
-def check_lib_dir(lib: str, lib_dir: Path, do_assert: bool = True, dry_run: bool | None = None) -> bool:
-    """检查库目录是否存在
+        Args:
+            path (str): 工具链路径，是相对于当前工作目录的路径.
 
-    Args:
-        lib (str): 库名称，用于提供错误报告信息
-        lib_dir (Path): 库目录
-        do_assert (bool, optional): 是否断言库存在. 默认断言.
-        dry_run (bool | None, optional): 是否只回显命令而不执行，默认为None.
+        Returns:
+            str | None: 调试信息包的根目录，不存在调试信息包时为None
+        """
 
-    Returns:
-        bool: 返回库是否存在
-    """
+        # 调试信息包本身不再处理
+        if path.endswith(self.debug_suffix):
+            return None
+        debug_path = f"{path}{self.debug_suffix}"
+        if self.debug_info != "keep":
+            self._process_debug_files(path, debug_path if self.debug_info == "split" else None)
+        # 之前拆分出的调试信息包总是随工具链一同打包
+        return debug_path if os.path.isdir(debug_path) else None
 
-    if not do_assert and not lib_dir.exists():
-        toolchains_print(color.error.wrapper("no"))
-        return False
-    else:
-        assert lib_dir.exists(), toolchains_error(f"Cannot find lib '{lib}' in directory '{lib_dir}'.")
-    toolchains_print(toolchains_success("yes", message_type.none))
-    return True
+    def _process_debug_files(self, path: str, debug_path: str | None) -> None:
+        """并行剥离或压缩工具链中ELF文件的调试信息
 
+        Args:
+            path (str): 工具链路径，是相对于当前工作目录的路径.
+            debug_path (str | None): 调试信息包的根目录，为None时原地压缩调试信息节
+        """
 
-def _compress_path_echo(path: str) -> str:
-    """在压缩工具链时回显信息
+        task_list: list[tuple[str, str | None, bool]] = []
+        inode_set: set[tuple[int, int]] = set()
+        build_id_set: set[str] = set()
+        for item in walk_path(path):
+            file_stat = os.lstat(item)
+            if not os.path.isfile(item) or os.path.islink(item) or (file_stat.st_dev, file_stat.st_ino) in inode_set:
+                continue
+            inode_set.add((file_stat.st_dev, file_stat.st_ino))
+            table = elf_section_table.load(item)
+            if not table or not table.get_debug_size():
+                continue
+            if debug_path and (build_id := table.build_id):
+                # 内容相同的副本只输出一份调试信息，其余副本仍需剥离
+                debug_file = os.path.join(debug_path, ".build-id", build_id[:2], f"{build_id[2:]}.debug")
+                task_list.append((item, debug_file if build_id not in build_id_set else None, True))
+                build_id_set.add(build_id)
+            elif not table.is_debug_compressed():
+                task_list.append((item, None, False))
+
+        objcopy = self._get_objcopy()
+        with concurrent.futures.ThreadPoolExecutor(self.jobs) as executor:
+            result_list = [*executor.map(lambda task: self._process_debug_file(objcopy, *task), task_list)]
+        action = "Split" if debug_path else "Compress"
+        toolchains_print(toolchains_info(f"{action} debug info of {sum(result_list)}/{len(task_list)} files in {path}."))
+
+    def _read_tar_data(self, path: str, limit: int | None = None) -> memoryview:
+        """将整个压缩包解压到内存中
 
-    Args:
-        path (str): 工具链路径
+        Args:
+            path (str): 压缩包路径，是相对于self.prefix_dir的路径.
+            limit (int | None, optional): 最多读取的解压数据量(字节). 默认读取全部数据.
 
-    Returns:
-        str: 回显信息
-    """
+        Returns:
+            memoryview: 解压后的tar数据，直接引用读取缓冲区而不复制
+        """
 
-    return toolchains_info(f"Compressing {path}.tar.zst")
+        data = bytearray()
+        buffer = bytearray(self.stream_block_size)
+        with (self.prefix_dir / path).open("rb") as zst, self._open_package_reader(zst) as reader:
+            while (limit is None or len(data) < limit) and (size := reader.readinto(buffer)):
+                data += memoryview(buffer)[:size]
+        return memoryview(data)[:limit]
 
+    def _get_tar_size(self, path: str) -> int:
+        """获取压缩包解压后的tar数据大小，可寻址格式直接读取索引表，其余格式流式解压计数
 
-type optional_lock = multiprocessing.synchronize.Lock | threading.Lock | None
+        Args:
+            path (str): 压缩包路径，是相对于self.prefix_dir的路径.
 
+        Returns:
+            int: tar数据大小(字节)
+        """
 
-def _decompress_path_echo(path: str, mutex: optional_lock) -> None:
-    """在解压缩工具链时回显信息
+        with (self.prefix_dir / path).open("rb") as zst:
+            if package_codec.detect(zst) == "zstd" and (seek_table := zstd_seek_table.load(zst)):
+                return sum(decompressed for _, decompressed in seek_table.frame_list)
+            tar_size = 0
+            buffer = bytearray(self.stream_block_size)
+            with self._open_package_reader(zst) as reader:
+                while size := reader.readinto(buffer):
+                    tar_size += size
+            return tar_size
+
+    @support_dry_run(_make_delta_path_echo)
+    def make_delta_path(
+        self,
+        base: str,
+        path: str,
+        output_dir: Path | None = None,
+        dry_run: bool | None = None,
+    ) -> None:
+        """生成从基础包到目标包的差分包，类似zstd --patch-from，以基础包的tar数据为原始内容字典进行长窗口压缩
 
-    Args:
-        path (str): 工具链路径
-        mutex (optional_lock, optional): 多进程下的互斥锁，用于保证并行解压缩时提示信息可以正常输出. 默认为单进程，无需使用锁.
-    """
+        Args:
+            base (str): 基础包(.tar.zst)，是相对于self.prefix_dir的路径.
+            path (str): 目标包(.tar.zst)，是相对于self.prefix_dir的路径.
+            output_dir (Path | None, optional): 差分包输出路径. 默认为self.prefix_dir.
+            dry_run (bool | None, optional): 是否只回显命令而不执行，默认为None.
+        """
 
-    msg = toolchains_info(f"Decompressing {path}")
-    if mutex is None:
-        toolchains_print(msg)
-    else:
-        with mutex:
-            toolchains_print(msg)
+        # 只有作为字典的基础包需要完整驻留内存，目标包流式压缩
+        base_data = self._read_tar_data(base)
+        tar_size = self._get_tar_size(path)
+        # 窗口需要同时覆盖字典和目标数据，才能引用基础包中任意位置的内容
+        window_log = max(self.long_distance_match, (len(base_data) + tar_size).bit_length())
+        if window_log > zstandard.WINDOWLOG_MAX:
+            toolchains_print(
+                toolchains_warning(
+                    f"{base} and {path} exceed the {1 << zstandard.WINDOWLOG_MAX >> 30} GiB window of delta packages, "
+                    "content farther than the window cannot be referenced and the delta package will be larger."
+                )
+            )
+            window_log = zstandard.WINDOWLOG_MAX
+        header = zstd_delta_header(Path(base).name, hashlib.blake2b(base_data).hexdigest(), window_log)
+        params = zstandard.ZstdCompressionParameters(
+            compression_level=self._get_fixed_compress_level(), window_log=window_log, enable_ldm=True, threads=self.jobs
+        )
+        dictionary = zstandard.ZstdCompressionDict(base_data, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+        compressor = zstandard.ZstdCompressor(dict_data=dictionary, compression_params=params)
+        output_dir = output_dir or self.prefix_dir
+        buffer = bytearray(self.stream_block_size)
+        with (
+            (self.prefix_dir / path).open("rb") as package,
+            self._open_package_reader(package) as reader,
+            (output_dir / f"{Path(path).name.split(".")[0]}{zstd_delta_header.suffix}").open("wb") as zst,
+        ):
+            zst.write(header.dump())
+            with compressor.stream_writer(zst, size=tar_size, closefd=False) as writer:
+                while size := reader.readinto(buffer):
+                    writer.write(memoryview(buffer)[:size])
+
+    @contextmanager
+    def _open_zstd_reader(
+        self, zst: typing.BinaryIO, base: str | None = None, selector: member_filter | None = None
+    ) -> Generator[typing.Any, None, None]:
+        """打开压缩包的解压数据流，对可寻址格式的压缩包使用多线程并行解压，并根据成员列表跳过不需要的帧
 
+        Args:
+            zst (typing.BinaryIO): 压缩包文件
+            base (str | None, optional): 差分包的基础包，是相对于self.prefix_dir的路径. 默认不是差分包.
+            selector (member_filter | None, optional): 成员过滤器. 默认解压所有成员.
 
-class compress_environment:
-    """打包压缩时使用的环境"""
+        Yields:
+            Generator[typing.Any, None, None]: 支持readinto的解压数据流
+        """
 
-    jobs: int  # 编译所用线程数
-    prefix_dir: Path  # 安装路径
-    compress_level: int  # zstd压缩等级
-    long_distance_match: int  # 长距离匹配窗口大小
+        if base:
+            header = zstd_delta_header.load(zst)
+            assert header, toolchains_error(f"{zst.name} is not a delta package.")
+            base_data = self._read_tar_data(base)
+            if hashlib.blake2b(base_data).hexdigest() != header.base_digest:
+                raise RuntimeError(toolchains_error(f"{base} does not match the base package {header.base_name} of {zst.name}."))
+            dictionary = zstandard.ZstdCompressionDict(base_data, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+            decompressor = zstandard.ZstdDecompressor(dict_data=dictionary, max_window_size=1 << header.window_log)
+            with decompressor.stream_reader(zst, read_size=self.stream_block_size, read_across_frames=True) as reader:
+                yield reader
+            return
 
-    def __init__(
-        self,
-        jobs: int,
-        prefix_dir: Path,
-        compress_level: int,
-        long_distance_match: int,
-    ) -> None:
-        self.jobs = jobs
-        self.prefix_dir = prefix_dir
-        self.compress_level = compress_level
-        self.long_distance_match = long_distance_match
+        max_window_size = 1 << self.long_distance_match
+        seek_table = zstd_seek_table.load(zst) if self.jobs > 1 or selector else None
+        if seek_table:
+            frame_list = seek_table.get_frame_offset_list()
+            if selector and (frame_index := zstd_frame_index.load(zst, seek_table)):
+                frame_list = frame_index.select_frame(frame_list, selector)
+            with _parallel_zstd_reader(zst, frame_list, self.jobs, max_window_size) as reader:
+                yield reader
+        else:
+            decompressor = zstandard.ZstdDecompressor(max_window_size=max_window_size)
+            with decompressor.stream_reader(zst, read_size=self.stream_block_size, read_across_frames=True) as reader:
+                yield reader
 
-    @support_dry_run(_compress_path_echo)
-    def compress_path(
+    @support_dry_run(_decompress_path_echo)
+    def decompress_path(
         self,
         path: str,
         output_dir: Path | None = None,
         chdir: bool = True,
+        base: str | None = None,
+        selector: member_filter | None = None,
         dry_run: bool | None = None,
     ) -> None:
-        """压缩指定目标
+        """解压缩指定目标
 
         Args:
-            path (str): 要压缩的目标路径，是相对于self.prefix_dir的路径.
-            output_dir (Path | None, optional): 压缩后文件输出路径. 默认为self.prefix_dir.
-            chdir (bool, optional): 是否切换工作目录. 默认为切换到self.prefix_dir下.
+            path (str): 要解压缩的压缩包(.tar.zst)或差分包(.delta.zst)，是相对于self.prefix_dir的路径.
+            output_dir (Path | None, optional): 解压后工具链输出路径. 默认为self.prefix_dir
+            chdir (bool, optional): 是否切换工作目录. 默认为切换到output_dir下.
+            base (str | None, optional): 差分包的基础包(.tar.zst)，是相对于self.prefix_dir的路径. 默认解压完整的压缩包.
+            selector (member_filter | None, optional): 成员过滤器，被排除的成员不会写入磁盘. 默认解压所有成员.
             dry_run (bool | None, optional): 是否只回显命令而不执行，默认为None.
         """
 
-        with tempfile.TemporaryFile() as tmp:
-            with libarchive.fd_writer(tmp.fileno(), "pax") as tar:
-                if chdir:
-                    with chdir_guard(self.prefix_dir):
-                        tar.add_files(path)
-                else:
-                    tar.add_files(path)
-            tmp.seek(0)
-            zst_file = f"{path}.tar.zst"
-            params = zstandard.ZstdCompressionParameters(
-                compression_level=self.compress_level, window_log=self.long_distance_match, enable_ldm=True, threads=self.jobs
-            )
-            compressor = zstandard.ZstdCompressor(compression_params=params)
-            output_dir = output_dir or self.prefix_dir
-            with (output_dir / zst_file).open("wb") as zst:
-                compressor.copy_stream(tmp, zst)
+        zst_file = self.prefix_dir / path
+        output_dir = output_dir or self.prefix_dir
+        name = zst_file.name.split(".")[0]
+        with self._open_staging_dir(output_dir, name) as staging_dir:
+            self._extract_package(zst_file, output_dir, staging_dir, name, chdir, base, selector)
 
     @support_dry_run(_decompress_path_echo)
-    def decompress_path(
+    def decompress_components(
         self,
         path: str,
+        component_list: list[str],
         output_dir: Path | None = None,
         chdir: bool = True,
-        mutex: optional_lock = None,
+        selector: member_filter | None = None,
         dry_run: bool | None = None,
     ) -> None:
-        """解压缩指定目标
+        """根据组件索引只安装选择的组件，所有组件解压到同一个暂存目录后一次性替换旧的工具链
+
+        已安装的工具链中其他组件的项目会被硬链接到暂存目录中保留，因此可以分多次安装不同的组件.
 
         Args:
-            path (str): 要解压缩的压缩包(.tar.zst)，是相对于self.prefix_dir的路径.
+            path (str): 组件索引(.components.json)，是相对于self.prefix_dir的路径.
+            component_list (list[str]): 要安装的组件名的通配符列表，为空表示安装所有组件.
             output_dir (Path | None, optional): 解压后工具链输出路径. 默认为self.prefix_dir
             chdir (bool, optional): 是否切换工作目录. 默认为切换到output_dir下.
-            mutex (optional_lock, optional): 多进程下的互斥锁，用于保证并行解压缩时提示信息可以正常输出. 默认为单进程，无需使用锁.
+            selector (member_filter | None, optional): 成员过滤器，被排除的成员不会写入磁盘. 默认解压所有成员.
             dry_run (bool | None, optional): 是否只回显命令而不执行，默认为None.
         """
 
-        with tempfile.TemporaryFile() as tmp:
-            zst_file = self.prefix_dir / path
-            decompressor = zstandard.ZstdDecompressor(max_window_size=1 << self.long_distance_match)
-            with zst_file.open("rb") as zst:
-                decompressor.copy_stream(zst, tmp)
-            tmp.seek(0)
-            output_dir = output_dir or self.prefix_dir
-            remove_if_exists(output_dir / zst_file.name.split(".")[0])
-            if chdir:
-                with chdir_guard(output_dir):
-                    libarchive.extract_fd(tmp.fileno())
+        index_file = self.prefix_dir / path
+        index = package_component_index.load(index_file)
+        output_dir = output_dir or self.prefix_dir
+        selected_list = index.select(component_list)
+        assert selected_list, toolchains_error(
+            f"No component of {index.name} matches {", ".join(component_list)}, available components: {", ".join(index.component_map)}."
+        )
+        entry_map: dict[str, dict[str, typing.Any]] = {}
+        metadata: dict[str, typing.Any] = {}
+        installed_list: list[str] = []
+        live_dir = output_dir / index.name
+
+        def kept(path: str) -> bool:
+            return package_component_index.get_component(os.path.relpath(path, index.name)) not in selected_list
+
+        live_manifest_file = live_dir / package_manifest.file_name
+        if live_manifest_file.exists():
+            # 已安装的其他组件的清单项目与新组件的清单合并
+            live_manifest = package_manifest.load(live_manifest_file)
+            entry_map.update((entry["path"], entry) for entry in live_manifest.entry_list if kept(entry["path"]))
+            installed_list = live_manifest.metadata.get("component", [*index.component_map])
+        with self._open_staging_dir(output_dir, index.name) as staging_dir:
+            manifest_file = staging_dir / package_manifest.file_name
+            for zst_file in index.get_package_list(index_file.parent, selected_list):
+                self._extract_package(zst_file, output_dir, staging_dir, index.name, chdir, None, selector)
+                # 每个组件包中的清单只包含该组件的成员，合并后再写入工具链
+                if manifest_file.exists():
+                    manifest = package_manifest.load(manifest_file)
+                    entry_map.update((entry["path"], entry) for entry in manifest.entry_list)
+                    metadata = manifest.metadata
+                    manifest_file.unlink()
+            if live_dir.is_dir():
+                self._keep_components(live_dir, staging_dir, index.name, kept)
+            if entry_map:
+                component_set = {*installed_list, *selected_list}
+                metadata = {**metadata, "component": [component for component in index.component_map if component in component_set]}
+                manifest_file.write_bytes(package_manifest(index.name, [*entry_map.values()], metadata).dump())
+
+    @staticmethod
+    def _keep_components(live_dir: Path, staging_dir: Path, name: str, kept: Callable[[str], bool]) -> None:
+        """将已安装的工具链中需要保留的项目链接到暂存目录，普通文件使用硬链接而不复制内容
+
+        在解压选择的组件之后调用，需要保留的项目与新解压的项目属于不同的组件，不会相互覆盖.
+
+        Args:
+            live_dir (Path): 已安装的工具链
+            staging_dir (Path): 暂存目录
+            name (str): 工具链名称
+            kept (Callable[[str], bool]): 判断以工具链名称开头的路径是否需要保留
+        """
+
+        # 添加项目会修改目录的修改时间，最后再自深向浅从已安装的工具链复制目录属性
+        dir_map: dict[Path, Path] = {}
+        for item in walk_path(str(live_dir)):
+            relative = os.path.relpath(item, live_dir)
+            if relative in (".", package_manifest.file_name) or not kept(os.path.join(name, relative)):
+                continue
+            target = staging_dir / relative
+            is_dir = not os.path.islink(item) and os.path.isdir(item)
+            parent = Path(relative) if is_dir else Path(relative).parent
+            while parent != Path(".") and parent not in dir_map:
+                dir_map[parent] = live_dir / parent
+                parent = parent.parent
+            if is_dir:
+                target.mkdir(parents=True, exist_ok=True)
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if os.path.islink(item):
+                os.symlink(os.readlink(item), target)
+                shutil.copystat(item, target, follow_symlinks=False)
             else:
-                libarchive.extract_fd(tmp.fileno())
+                os.link(item, target)
+        for parent in sorted(dir_map, key=lambda parent: len(parent.parts), reverse=True):
+            shutil.copystat(dir_map[parent], staging_dir / parent)
+
+    @contextmanager
+    def _open_staging_dir(self, output_dir: Path, name: str) -> Generator[Path, None, None]:
+        """在输出目录下创建暂存目录，正常退出时用其替换工具链，出现异常时在后台删除暂存目录
+
+        解压到同一目录下的暂存目录中，完成后再替换旧的工具链，避免其他任务看到不完整的工具链.
+
+        Args:
+            output_dir (Path): 解压后工具链输出路径
+            name (str): 工具链名称
+
+        Yields:
+            Generator[Path, None, None]: 暂存目录
+        """
+
+        staging_dir = output_dir / f".{name}.staging-{os.getpid()}"
+        if os.path.lexists(staging_dir):
+            remove(staging_dir)
+        try:
+            yield staging_dir
+        except BaseException:
+            if os.path.lexists(staging_dir):
+                remove_in_background(staging_dir)
+            raise
+        self._install_staging_dir(staging_dir, output_dir / name)
+
+    def _extract_package(
+        self,
+        zst_file: Path,
+        output_dir: Path,
+        staging_dir: Path,
+        name: str,
+        chdir: bool,
+        base: str | None,
+        selector: member_filter | None,
+    ) -> None:
+        """将压缩包中的工具链解压到暂存目录中
+
+        Args:
+            zst_file (Path): 压缩包或差分包
+            output_dir (Path): 解压后工具链输出路径
+            staging_dir (Path): 暂存目录
+            name (str): 工具链名称，压缩包中的所有成员都应位于该目录下
+            chdir (bool): 是否切换工作目录到output_dir下
+            base (str | None): 差分包的基础包，是相对于self.prefix_dir的路径.
+            selector (member_filter | None): 成员过滤器
+        """
+
+        tracker = progress_tracker(zst_file.name, "decompress", zst_file.stat().st_size if progress_tracker.enabled() else 0)
+        pending: dict[str, list[str]] = {}
+        # 解压输出按块直接送入libarchive解包，不再经过临时文件
+        with (
+            zst_file.open("rb") as zst,
+            self._open_package_reader(zst, base, selector) as reader,
+            libarchive.stream_reader(_progress_reader(reader, tracker, zst), "tar", "none", self.stream_block_size) as archive,
+        ):
+            entry_iter = filter(lambda entry: selector(entry.pathname), archive) if selector else archive
+            if selector:
+                entry_iter = self._defer_dangling_links(entry_iter, pending)
+            entry_iter = self._stage_entries(entry_iter, name, staging_dir.name)
+            with chdir_guard(output_dir) if chdir else nullcontext():
+                self._extract_entries(entry_iter)
+        tracker.finish()
+        if pending:
+            self._extract_link_targets(zst_file, output_dir, staging_dir, name, chdir, base, pending)
+
+    def _extract_entries(self, entry_iter: typing.Iterable[typing.Any]) -> None:
+        """按self.threaded_extract选择解包方式，将tar成员解包到当前工作目录
+
+        Args:
+            entry_iter (typing.Iterable[typing.Any]): libarchive成员迭代器
+        """
+
+        if self.threaded_extract and self.jobs > 1:
+            _parallel_extractor(self._get_io_jobs(), self._get_max_inflight(), self.stream_block_size).extract(entry_iter)
+        else:
+            libarchive.extract.extract_entries(entry_iter, _extract_flags)
+
+    @staticmethod
+    def _defer_dangling_links(entry_iter: typing.Iterable[typing.Any], pending: dict[str, list[str]]) -> Generator[typing.Any, None, None]:
+        """跳过目标未被解压的硬链接成员，留待第二遍解压时处理
+
+        硬链接成员不包含文件内容，其目标被过滤掉时无法创建.
+
+        Args:
+            entry_iter (typing.Iterable[typing.Any]): 过滤后的libarchive成员迭代器
+            pending (dict[str, list[str]]): 输出参数，被过滤掉的硬链接目标->指向它的硬链接成员列表
+
+        Yields:
+            Generator[typing.Any, None, None]: 可以直接解压的libarchive成员
+        """
+
+        extracted_set: set[str] = set()
+        for entry in entry_iter:
+            # 硬链接的目标总是先于硬链接写入压缩包
+            if entry.islnk and entry.linkpath not in extracted_set:
+                pending.setdefault(entry.linkpath, []).append(entry.pathname)
+                continue
+            extracted_set.add(entry.pathname)
+            yield entry
+
+    def _extract_link_targets(
+        self, zst_file: Path, output_dir: Path, staging_dir: Path, name: str, chdir: bool, base: str | None, pending: dict[str, list[str]]
+    ) -> None:
+        """再次读取压缩包中被过滤掉的硬链接目标，将其内容写入第一个被选中的硬链接，其余硬链接指向该文件
+
+        Args:
+            zst_file (Path): 压缩包或差分包
+            output_dir (Path): 解压后工具链输出路径
+            staging_dir (Path): 暂存目录
+            name (str): 工具链名称
+            chdir (bool): 是否切换工作目录到output_dir下
+            base (str | None): 差分包的基础包，是相对于self.prefix_dir的路径.
+            pending (dict[str, list[str]]): 被过滤掉的硬链接目标->指向它的硬链接成员列表
+        """
+
+        # 可寻址格式中只解压包含这些目标的帧
+        selector = member_filter([glob.escape(target.partition("/")[2]) for target in pending])
+
+        def target_iter(archive: typing.Any) -> Generator[typing.Any, None, None]:
+            for entry in archive:
+                if not entry.islnk and (link_list := pending.get(entry.pathname)):
+                    entry.pathname = link_list[0]
+                    yield entry
+
+        with (
+            zst_file.open("rb") as zst,
+            self._open_package_reader(zst, base, selector) as reader,
+            libarchive.stream_reader(reader, "tar", "none", self.stream_block_size) as archive,
+            chdir_guard(output_dir) if chdir else nullcontext(),
+        ):
+            self._extract_entries(self._stage_entries(target_iter(archive), name, staging_dir.name))
+            for link_list in pending.values():
+                target = self._stage_path(link_list[0], name, staging_dir.name)
+                for link in link_list[1:]:
+                    os.link(target, self._stage_path(link, name, staging_dir.name), follow_symlinks=False)
+
+    @staticmethod
+    def _stage_path(path: str, name: str, staging_name: str) -> str:
+        """将路径中的工具链目录替换为暂存目录
+
+        Args:
+            path (str): 成员路径
+            name (str): 工具链名称
+            staging_name (str): 暂存目录名称
+
+        Returns:
+            str: 暂存目录下的路径
+        """
+
+        if path.rstrip("/") == name or path.startswith(f"{name}/"):
+            return staging_name + path[len(name) :]
+        raise RuntimeError(toolchains_error(f"Member {path} is not under the toolchain directory {name}."))
+
+    @staticmethod
+    def _stage_entries(entry_iter: typing.Iterable[typing.Any], name: str, staging_name: str) -> Generator[typing.Any, None, None]:
+        """将成员路径和硬链接目标中的工具链目录替换为暂存目录
+
+        Args:
+            entry_iter (typing.Iterable[typing.Any]): libarchive成员迭代器
+            name (str): 工具链名称
+            staging_name (str): 暂存目录名称
+
+        Yields:
+            Generator[typing.Any, None, None]: 修改路径后的libarchive成员
+        """
+
+        for entry in entry_iter:
+            entry.pathname = compress_environment._stage_path(entry.pathname, name, staging_name)
+            if entry.islnk:
+                entry.linkpath = compress_environment._stage_path(entry.linkpath, name, staging_name)
+            yield entry
+
+    @staticmethod
+    def _install_staging_dir(staging_dir: Path, target_dir: Path) -> None:
+        """用暂存目录替换工具链目录，旧的工具链在后台删除
+
+        优先使用renameat2原子地交换两个目录，不支持时先将旧的工具链移走再重命名暂存目录.
+
+        Args:
+            staging_dir (Path): 解压完成的暂存目录
+            target_dir (Path): 工具链目录
+        """
+
+        if not os.path.lexists(target_dir):
+            rename(staging_dir, target_dir)
+        elif exchange(staging_dir, target_dir):
+            remove_in_background(staging_dir)
+        else:
+            old_dir = target_dir.with_name(f".{target_dir.name}.old-{os.getpid()}")
+            rename(target_dir, old_dir)
+            rename(staging_dir, target_dir)
+            remove_in_background(old_dir)
 
 
 class basic_environment(compress_environment):
@@ -1021,11 +3934,13 @@ class basic_environment(compress_environment):
         home: Path,
         jobs: int,
         prefix_dir: Path,
-        compress_level: int,
+        compress_level: compress_level_t,
         long_distance_match: int,
         build_tmp: Path,
+        debug_info: debug_info_t = "keep",
+        split_components: bool = False,
     ) -> None:
-        super().__init__(jobs, prefix_dir, compress_level, long_distance_match)
+        super().__init__(jobs, prefix_dir, compress_level, long_distance_match, debug_info=debug_info, split_components=split_components)
         self.build = build
         self.version = version
         self.major_version = self.version.split(".")[0]
@@ -1753,24 +4668,36 @@ class basic_compress_configure(basic_prefix_configure):
     """压缩环境配置"""
 
     jobs: int
-    compress_level: int
+    compress_level: compress_level_t
     long_distance_match: int
+    debug_info: debug_info_t
+    split_components: bool
 
     def __init__(
-        self, jobs: int = (os.cpu_count() or 1) + 2, compress_level: int = 19, long_distance_match: int = 27, **kwargs: typing.Any
+        self,
+        jobs: int = (os.cpu_count() or 1) + 2,
+        compress_level: compress_level_t = 19,
+        long_distance_match: int = 27,
+        debug_info: debug_info_t = "keep",
+        split_components: bool = False,
+        **kwargs: typing.Any,
     ) -> None:
         """初始化工具链构建配置
 
         Args:
             jobs (int, optional): 构建时的并发数. 默认为当前平台cpu核心数的1.5倍.
-            compress_level (int, optional): zstd压缩等级(1~22). 默认为19级.
+            compress_level (compress_level_t, optional): zstd压缩等级(1~22)，auto表示根据采样结果自动选择. 默认为19级.
             long_distance_match (int): 长距离匹配窗口大小. 默认为27.
+            debug_info (debug_info_t, optional): 打包前如何处理ELF文件中的调试信息. 默认保留.
+            split_components (bool, optional): 是否按组件将工具链拆分为多个压缩包. 默认为否.
         """
 
         super().__init__(**kwargs)
         self.jobs = jobs
         self.compress_level = compress_level
         self.long_distance_match = long_distance_match
+        self.debug_info = debug_info
+        self.split_components = split_components
 
     @classmethod
     def add_argument(cls, parser: argparse.ArgumentParser) -> None:
@@ -1793,8 +4720,8 @@ class basic_compress_configure(basic_prefix_configure):
             "--compress",
             "-c",
             dest="compress_level",
-            type=int,
-            help="The compress level of zstd when packing. Support 1~22.",
+            type=parse_compress_level,
+            help="The compress level of zstd when packing. Support 1~22, or auto to select it by benchmarking a sample of the package.",
             default=default_config.compress_level,
         )
         parser.add_argument(
@@ -1805,14 +4732,35 @@ class basic_compress_configure(basic_prefix_configure):
             help="The long distance match windows of zstd when packing.",
             default=default_config.long_distance_match,
         )
+        parser.add_argument(
+            "--debug-info",
+            type=str,
+            choices=typing.get_args(debug_info_t.__value__),
+            help="How to handle debug info in ELF files when packing. compress compresses debug sections in place with zstd "
+            "(zlib if objcopy lacks zstd), "
+            "and split moves debug info of files with a build-id into a NAME-debug package in the .build-id layout, "
+            "which gdb finds with set debug-file-directory. Files are processed in parallel with llvm-objcopy, "
+            "or objcopy if it is not found, or $OBJCOPY if it is set.",
+            default=default_config.debug_info,
+        )
+        parser.add_argument(
+            "--split-components",
+            action=argparse.BooleanOptionalAction,
+            help="Split each toolchain into component packages (core, gdb, modules and one target-TRIPLET per target directory) "
+            "with a NAME.components.json index, so that decompress --component can install only what is needed.",
+            default=default_config.split_components,
+        )
 
     def check(self) -> None:
         """检查压缩环境配置是否合法"""
 
         check_home(self.home)
         assert self.jobs > 0, toolchains_error(f"Invalid jobs: {self.jobs}.")
-        assert 1 <= self.compress_level <= 22, toolchains_error(f"Invalid compress level: {self.compress_level}")
+        assert self.compress_level == "auto" or 1 <= self.compress_level <= 22, toolchains_error(
+            f"Invalid compress level: {self.compress_level}"
+        )
         assert 10 <= self.long_distance_match <= 31, toolchains_error(f"Invalid match distance: {self.long_distance_match}")
+        assert self.debug_info in typing.get_args(debug_info_t.__value__), toolchains_error(f"Invalid debug info mode: {self.debug_info}")
 
 
 class basic_prefix_build_configure(basic_prefix_configure):
@@ -2000,7 +4948,7 @@ def keyboard_interpret_received() -> typing.NoReturn:
 
 
 def toolchains_package(file: Path) -> bool:
-    """判断给定文件是否是一个打包好的工具链
+    """判断给定文件是否是一个打包好的工具链，压缩格式根据文件头部的魔数识别
 
     Args:
         file (Path): 文件路径
@@ -2010,7 +4958,14 @@ def toolchains_package(file: Path) -> bool:
     """
 
     file = file.resolve()
-    return file.is_file() and file.suffixes == [".tar", ".zst"] and any(name in file.name for name in ("gcc", "clang", "sysroot"))
+    if not (
+        file.is_file()
+        and "".join(file.suffixes) in package_codec.suffix_map.values()
+        and any(name in file.name for name in ("gcc", "clang", "sysroot"))
+    ):
+        return False
+    with file.open("rb") as package:
+        return package_codec.detect(package) is not None
 
 
 def toolchains_dir(dir: Path) -> bool:
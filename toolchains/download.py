@@ -3,9 +3,19 @@
 # PYTHON_ARGCOMPLETE_OK
 
 import argparse
+import collections
+import concurrent.futures
+import functools
+import hashlib
+import itertools
 import os
 import pathlib
-import tempfile
+import re
+import select
+import subprocess
+import threading
+import time
+import typing
 
 from . import common
 from .download_source import *
@@ -41,6 +51,318 @@ def _check_version_echo(lib: str, result: int) -> bool:
         return True
 
 
+# 并行执行网络操作时收到ctrl-c后设置，各个任务不再重试
+_interrupted = threading.Event()
+# 打印git进度行的最小间隔(秒)
+_progress_interval: typing.Final[float] = 1.0
+
+
+def _parse_git_speed(line: str) -> float | None:
+    """从git的进度行中解析传输速度
+
+    Args:
+        line (str): 进度行，如"Receiving objects:  45% (450/1000), 12.00 MiB | 3.00 MiB/s"
+
+    Returns:
+        float | None: 传输速度(字节/秒)，进度行中没有速度时为None
+    """
+
+    if match := re.search(r"\|\s*([\d.]+)\s*(GiB|MiB|KiB|bytes|B)/s", line):
+        return float(match[1]) * {"GiB": 1 << 30, "MiB": 1 << 20, "KiB": 1 << 10}.get(match[2], 1)
+    return None
+
+
+def _run_git_command(lib: str, command: str, min_speed: int = 0) -> None:
+    """运行git命令，解析git的进度输出用于检测传输停滞，非静默模式下按固定间隔打印带有包名的进度行，避免并行运行时输出相互交错
+
+    Args:
+        lib (str): 包名称
+        command (str): 在shell中运行的git命令
+        min_speed (int, optional): 传输速度的下限(字节/秒)，开始传输后持续低于下限时终止命令，以便切换到其他镜像. 默认不限制.
+
+    Raises:
+        RuntimeError: 命令执行失败或传输速度过慢时抛出异常
+    """
+
+    # 静默模式下仍需监控进度以检测传输停滞，只是不打印进度行
+    verbose = not common.command_quiet.get()
+    if common.command_dry_run.get() or not (verbose or min_speed):
+        common.run_command(command, add_counter=False)
+        return
+    if verbose:
+        common.toolchains_print(common.toolchains_info(f"Run command: {command}"))
+    tail: collections.deque[str] = collections.deque(maxlen=8)
+    last_line, last_time = "", 0.0
+    receiving, slow_since = False, None
+    with subprocess.Popen(f"{command} --progress", shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE) as process:
+        assert process.stderr
+        fd, buffer = process.stderr.fileno(), b""
+        while True:
+            now = time.monotonic()
+            if select.select([fd], [], [], _progress_interval)[0]:
+                if not (chunk := os.read(fd, 1 << 16)):
+                    break
+                # git使用\r刷新同一行进度
+                *line_list, buffer = re.split(rb"[\r\n]", buffer + chunk)
+                for line in filter(None, (item.decode(errors="replace").strip() for item in line_list)):
+                    tail.append(line)
+                    if (speed := _parse_git_speed(line)) is not None:
+                        receiving = True
+                        slow_since = (slow_since or now) if speed < min_speed else None
+                if verbose and tail and tail[-1] != last_line and now - last_time >= _progress_interval:
+                    last_line, last_time = tail[-1], now
+                    common.toolchains_print(common.toolchains_info(f"{lib}: {last_line}"))
+            elif receiving:
+                # 开始传输后没有任何输出，视为传输停滞
+                slow_since = slow_since or now
+            if min_speed and slow_since is not None and now - slow_since >= http_downloader.slow_window:
+                process.kill()
+                raise RuntimeError(common.toolchains_error(f"Transfer of {lib} is slower than {min_speed >> 10} KiB/s.", add_counter=False))
+    if process.returncode:
+        for line in tail:
+            common.toolchains_print(common.toolchains_warning(f"{lib}: {line}", add_counter=False))
+        raise RuntimeError(common.toolchains_error(f'Command "{command}" failed.', add_counter=False))
+
+
+def _run_parallel[T](config: configure, task_list: dict[str, typing.Callable[[], T]]) -> tuple[dict[str, T], list[str]]:
+    """在线程池中并行执行各个包的网络任务，最多同时执行config.network_jobs个任务，按task_list的顺序启动
+
+    Args:
+        config (configure): 源代码下载环境
+        task_list (dict[str, typing.Callable[[], T]]): 包名->任务
+
+    Returns:
+        tuple[dict[str, T], list[str]]: 成功的包名->任务结果，失败的包列表
+    """
+
+    result_list: dict[str, T] = {}
+    failed_list: list[str] = []
+    _interrupted.clear()
+    executor = concurrent.futures.ThreadPoolExecutor(max(min(config.network_jobs, len(task_list)), 1))
+    try:
+        future_map = {executor.submit(task): lib for lib, task in task_list.items()}
+        for future in concurrent.futures.as_completed(future_map):
+            try:
+                result_list[future_map[future]] = future.result()
+            except RuntimeError as e:
+                # 异常信息已经是格式化后的错误提示
+                common.toolchains_print(e)
+                failed_list.append(future_map[future])
+    except KeyboardInterrupt:
+        # ctrl-c同时发送给了前台进程组中的git，正在运行的任务会很快失败，设置标志避免其重试
+        _interrupted.set()
+        executor.shutdown(cancel_futures=True)
+        common.keyboard_interpret_received()
+    finally:
+        executor.shutdown()
+    return result_list, failed_list
+
+
+def _retry(
+    config: configure, operation: str, lib: str, fn: typing.Callable[[], None], cleanup: typing.Callable[[], typing.Any] | None = None
+) -> None:
+    """执行网络操作，失败后重试，最多尝试config.network_try_times次
+
+    Args:
+        config (configure): 源代码下载环境
+        operation (str): 操作名称，用于提示信息
+        lib (str): 包名称
+        fn (typing.Callable[[], None]): 要执行的操作
+        cleanup (typing.Callable[[], typing.Any] | None, optional): 每次失败后执行的清理操作. 默认无需清理.
+
+    Raises:
+        RuntimeError: 所有尝试均失败或收到ctrl-c时抛出异常
+    """
+
+    for _ in range(config.network_try_times):
+        try:
+            fn()
+            return
+        except KeyboardInterrupt:
+            if cleanup:
+                cleanup()
+            common.keyboard_interpret_received()
+        except:
+            if cleanup:
+                cleanup()
+            if _interrupted.is_set():
+                break
+            common.toolchains_print(common.toolchains_warning(f"{operation} {lib} failed, retrying."))
+    raise RuntimeError(common.toolchains_error(f"{operation} {lib} failed."))
+
+
+def _sync_object_cache(lib: str, cache_dir: pathlib.Path, url: str, min_speed: int = 0) -> None:
+    """在对象缓存中创建git包的裸仓库，已存在时从裸仓库的远程源拉取所有分支和标签
+
+    Args:
+        lib (str): 包名称
+        cache_dir (pathlib.Path): 裸仓库路径
+        url (str): 创建裸仓库时使用的远程源
+        min_speed (int, optional): 传输速度的下限(字节/秒). 默认不限制.
+    """
+
+    quiet = common.command_quiet.get_option()
+    if cache_dir.exists():
+        _run_git_command(lib, f"git -C {cache_dir} fetch {quiet} --tags origin '+refs/heads/*:refs/heads/*'", min_speed)
+        return
+    try:
+        _run_git_command(lib, f"git clone --bare {quiet} {url} {cache_dir}", min_speed)
+    except BaseException:
+        common.remove_if_exists(cache_dir)
+        raise
+    # 其他源码树通过alternates引用裸仓库中的对象，因此裸仓库不能清理不可达的对象
+    common.run_command(f"git -C {cache_dir} config gc.pruneExpire never", add_counter=False)
+
+
+def clone_specific_lib(config: configure, lib: str, url_list: list[git_url]) -> None:
+    """克隆指定的git包并签出HEAD，有多个远程源时每次失败或传输过慢后切换到下一个源
+
+    使用对象缓存时先在缓存中创建或更新该包的裸仓库，再通过--reference克隆，只需从远程源获取缓存中缺失的对象。
+
+    Args:
+        config (configure): 源代码下载环境
+        lib (str): 包名称
+        url_list (list[git_url]): 包的远程源，按优先级排列
+    """
+
+    lib_dir = config.home / lib
+    cache_dir = config.get_object_cache_dir(lib)
+    extra_options: list[str] = [*extra_git_options_list.get_option(config, lib)]
+    if cache_dir:
+        # 对象均来自缓存，无需部分克隆或浅克隆
+        extra_options.append(f"--reference {cache_dir}")
+    else:
+        extra_options.append(git_clone_type.get_clone_option(config))
+    extra_option = " ".join(extra_options)
+    mirror_list = itertools.cycle(url_list)
+    min_speed = config.min_speed << 10 if len(url_list) > 1 else 0
+    cache_synced = False
+
+    def clone() -> None:
+        nonlocal cache_synced
+        url = next(mirror_list).get_url(config.git_use_ssh)
+        if len(url_list) > 1:
+            common.toolchains_print(common.toolchains_note(f"Clone {lib} from {url}."))
+        if cache_dir and not cache_synced:
+            _sync_object_cache(lib, cache_dir, url, min_speed)
+            cache_synced = True
+        _run_git_command(lib, f"git clone {url} {common.command_quiet.get_option()} {extra_option} --no-checkout {lib_dir}", min_speed)
+
+    # 首先从源上克隆代码，但不进行签出
+    _retry(config, "Clone", lib, clone, lambda: common.remove_if_exists(lib_dir))
+    # 从git储存库中签出HEAD，部分克隆时需要下载HEAD中的文件
+    _retry(config, "Checkout", lib, lambda: _run_git_command(lib, f"git -C {lib_dir} checkout HEAD"))
+
+
+def clone_git_libs(config: configure, lib_list: dict[str, list[git_url]]) -> None:
+    """并行克隆不存在的git包，较大的仓库先开始克隆，每个包独立重试，完成后依次执行下载后的回调函数
+
+    Args:
+        config (configure): 源代码下载环境
+        lib_list (dict[str, list[git_url]]): git包->按优先级排列的远程源列表
+
+    Raises:
+        RuntimeError: 存在克隆失败的包时抛出异常
+    """
+
+    missing_list: list[str] = []
+    for lib in lib_list:
+        if (config.home / lib).exists():
+            _exist_echo(lib)
+        else:
+            missing_list.append(lib)
+    task_list: dict[str, typing.Callable[[], None]] = {
+        lib: functools.partial(clone_specific_lib, config, lib, lib_list[lib]) for lib in all_lib_list.sort_by_size(missing_list)
+    }
+    _, failed_list = _run_parallel(config, task_list)
+    # 回调函数可能切换工作目录，因此不在线程池中执行
+    for lib in filter(lambda lib: lib not in failed_list, task_list):
+        after_download_list.after_download_specific_lib(config, lib)
+        common.status_counter.add_success()
+    if failed_list:
+        raise RuntimeError(common.toolchains_error(f"Clone {", ".join(failed_list)} failed."))
+
+
+def _is_ancestor(lib_dir: pathlib.Path, ancestor: str, commit: str) -> bool:
+    """判断一个提交是否是另一个提交的祖先
+
+    Args:
+        lib_dir (pathlib.Path): git仓库
+        ancestor (str): 祖先提交
+        commit (str): 后代提交
+
+    Returns:
+        bool: ancestor是否是commit的祖先
+    """
+
+    command = f"git -C {lib_dir} merge-base --is-ancestor {ancestor} {commit}"
+    return common.run_command(command, ignore_error=True, echo=False, dry_run=False) is not None
+
+
+def update_specific_lib(config: configure, lib: str) -> bool:
+    """拉取指定git包的远程更新，比较本地分支与上游分支，有更新时在本地快进，无需再次与远程协商
+
+    Args:
+        config (configure): 源代码下载环境
+        lib (str): 包名称
+
+    Returns:
+        bool: 本地分支是否发生了移动
+
+    Raises:
+        RuntimeError: 拉取失败或本地分支与上游分支分叉时抛出异常
+    """
+
+    lib_dir = config.home / lib
+    # 只有在对象缓存中已有裸仓库时才拉取，此时本地仓库的拉取只需获取缓存中缺失的对象
+    if (cache_dir := config.get_object_cache_dir(lib)) and cache_dir.exists():
+        _retry(config, "Fetch", f"{lib} into object cache", lambda: _sync_object_cache(lib, cache_dir, ""))
+    _retry(config, "Fetch", lib, lambda: _run_git_command(lib, f"git -C {lib_dir} fetch {common.command_quiet.get_option()}"))
+    # 比较引用是本地操作，在dry-run模式下也执行
+    command = f"git -C {lib_dir} rev-parse HEAD @{{upstream}}"
+    result = common.run_command(command, ignore_error=True, capture=True, echo=False, dry_run=False)
+    if not result:
+        common.toolchains_print(common.toolchains_warning(f"Lib {lib} has no upstream branch, skip update."))
+        return False
+    head, upstream = result.stdout.split()
+    # 上游分支没有本地分支以外的提交
+    if head == upstream or _is_ancestor(lib_dir, upstream, head):
+        return False
+    if not _is_ancestor(lib_dir, head, upstream):
+        raise RuntimeError(common.toolchains_error(f"Lib {lib} has diverged from upstream, cannot fast-forward."))
+    # 部分克隆在签出时可能需要从远程获取缺失的文件，因此仍需重试
+    command = f"git -C {lib_dir} merge --ff-only {common.command_quiet.get_option()} @{{upstream}}"
+    _retry(config, "Merge", lib, lambda: _run_git_command(lib, command))
+    return not common.command_dry_run.get()
+
+
+def update_git_libs(config: configure, lib_list: typing.Iterable[str]) -> None:
+    """并行拉取所有git包的远程更新，完成后只为本地分支发生移动的包依次执行下载后的回调函数
+
+    Args:
+        config (configure): 源代码下载环境
+        lib_list (typing.Iterable[str]): git包列表，要求所有包均已下载
+
+    Raises:
+        RuntimeError: 存在更新失败的包时抛出异常
+    """
+
+    for lib in lib_list:
+        assert (config.home / lib).exists(), common.toolchains_error(f"Cannot find lib: {lib}")
+    task_list: dict[str, typing.Callable[[], bool]] = {
+        lib: functools.partial(update_specific_lib, config, lib) for lib in all_lib_list.sort_by_size(lib_list)
+    }
+    result_list, failed_list = _run_parallel(config, task_list)
+    for lib, moved in result_list.items():
+        if moved:
+            after_download_list.after_download_specific_lib(config, lib)
+            common.status_counter.add_success()
+        else:
+            _up_to_date_echo(lib)
+    if failed_list:
+        raise RuntimeError(common.toolchains_error(f"Update {", ".join(failed_list)} failed."))
+
+
 def download_gcc_contrib(config: configure) -> None:
     """下载gcc的依赖包
 
@@ -59,10 +381,87 @@ def download_specific_extra_lib(config: configure, lib: str) -> None:
         config (configure): 源代码下载环境
         lib (str): 要下载的包名
     """
-    assert lib in all_lib_list.extra_lib_list, common.toolchains_error(f"Unknown extra lib: {lib}")
-    extra_lib_v = all_lib_list.extra_lib_list[lib]
-    for file, url in extra_lib_v.url_list.items():
-        common.run_command(f"wget {url} {common.command_quiet.get_option()} -c -t {config.network_try_times} -O {config.home / file}")
+    if failed_list := _download_extra_lib_files(config, [lib]):
+        raise RuntimeError(common.toolchains_error(f"Download {", ".join(failed_list)} failed."))
+
+
+def download_specific_file(config: configure, file: pathlib.Path, url_list: list[str]) -> None:
+    """使用分段、可续传的下载器下载一个文件，失败后从中断处重试，有多个镜像时每次失败或下载过慢后切换到下一个镜像
+
+    记录了摘要时校验文件，否则给出警告并打印文件的摘要，要求记录摘要时拒绝下载.
+
+    Args:
+        config (configure): 源代码下载环境
+        file (pathlib.Path): 保存的文件名，是相对于home的路径
+        url_list (list[str]): 下载链接，按优先级排列
+
+    Raises:
+        RuntimeError: 下载失败，或要求记录摘要但没有记录时抛出异常
+    """
+
+    verified = get_extra_lib_sha256(url_list[0]) is not None
+    if not verified and config.require_sha256:
+        raise RuntimeError(common.toolchains_error(f"No SHA-256 digest recorded for {file}, refuse to download it without verification."))
+    mirror_list = itertools.cycle(url_list)
+    min_speed = config.min_speed << 10 if len(url_list) > 1 else 0
+
+    def download() -> None:
+        url = next(mirror_list)
+        if len(url_list) > 1:
+            common.toolchains_print(common.toolchains_note(f"Download {file} from {url}."))
+        sha256 = get_extra_lib_sha256(url)
+        http_downloader(url, config.home / file, config.http_connections, sha256, _interrupted, min_speed).download()
+
+    _retry(config, "Download", str(file), download)
+    if not verified and not common.command_dry_run.get():
+        with (config.home / file).open("rb") as input:
+            digest = hashlib.file_digest(input, "sha256").hexdigest()
+        common.toolchains_print(
+            common.toolchains_warning(
+                f"No SHA-256 digest recorded for {file}, its SHA-256 is {digest}. "
+                "Check it against the upstream release and record it in extra_lib_sha256."
+            )
+        )
+
+
+def _download_extra_lib_files(config: configure, lib_list: list[str]) -> list[str]:
+    """并行下载多个非git包的所有文件
+
+    Args:
+        config (configure): 源代码下载环境
+        lib_list (list[str]): 要下载的包列表
+
+    Returns:
+        list[str]: 存在下载失败文件的包列表
+    """
+
+    task_list: dict[str, typing.Callable[[], None]] = {}
+    file_map: dict[str, list[str]] = {}
+    for lib in lib_list:
+        assert lib in all_lib_list.extra_lib_list, common.toolchains_error(f"Unknown extra lib: {lib}")
+        for file, url_list in all_lib_list.get_extra_lib_url_map(config, lib).items():
+            task_list[str(file)] = functools.partial(download_specific_file, config, file, url_list)
+            file_map.setdefault(lib, []).append(str(file))
+    _, failed_list = _run_parallel(config, task_list)
+    return [lib for lib in lib_list if any(file in failed_list for file in file_map[lib])]
+
+
+def download_extra_libs(config: configure, lib_list: list[str]) -> None:
+    """并行下载多个非git包，完成后依次执行下载后的回调函数
+
+    Args:
+        config (configure): 源代码下载环境
+        lib_list (list[str]): 要下载的包列表
+
+    Raises:
+        RuntimeError: 存在下载失败的包时抛出异常
+    """
+
+    failed_list = _download_extra_lib_files(config, lib_list)
+    for lib in filter(lambda lib: lib not in failed_list, lib_list):
+        after_download_list.after_download_specific_lib(config, lib)
+    if failed_list:
+        raise RuntimeError(common.toolchains_error(f"Download {", ".join(failed_list)} failed."))
 
 
 def download(config: configure) -> None:
@@ -71,52 +470,18 @@ def download(config: configure) -> None:
     Args:
         config (configure): 源代码下载环境
     """
-    # 下载git托管的源代码
-    for lib, url_fields in all_lib_list.get_prefer_git_lib_list(config).items():
-        lib_dir = config.home / lib
-        if not lib_dir.exists():
-            url = url_fields.get_url(config.git_use_ssh)
-            extra_options: list[str] = [*extra_git_options_list.get_option(config, lib), git_clone_type.get_clone_option(config)]
-            extra_option = " ".join(extra_options)
-            # 首先从源上克隆代码，但不进行签出
-            for _ in range(config.network_try_times):
-                try:
-                    common.run_command(
-                        f"git clone {url} {common.command_quiet.get_option()} {extra_option} --no-checkout {lib_dir}", add_counter=False
-                    )
-                    break
-                except KeyboardInterrupt:
-                    common.remove_if_exists(lib_dir)
-                    common.keyboard_interpret_received()
-                except:
-                    common.remove_if_exists(lib_dir)
-                    common.toolchains_print(common.toolchains_warning(f"Clone {lib} failed, retrying."))
-            else:
-                raise RuntimeError(common.toolchains_error(f"Clone {lib} failed."))
-            # 从git储存库中签出HEAD
-            for _ in range(config.network_try_times):
-                try:
-                    common.run_command(f"git -C {lib_dir} checkout HEAD", add_counter=False)
-                    break
-                except KeyboardInterrupt:
-                    common.keyboard_interpret_received()
-                except:
-                    common.toolchains_print(common.toolchains_warning(f"Checkout {lib} failed, retrying."))
-            else:
-                raise RuntimeError(common.toolchains_error(f"Checkout {lib} failed."))
-            after_download_list.after_download_specific_lib(config, lib)
-            common.status_counter.add_success()
-        else:
-            _exist_echo(lib)
+    # 并行下载git托管的源代码
+    clone_git_libs(config, all_lib_list.get_git_url_map(config))
 
-    # 下载非git托管代码
-    for lib in config.extra_lib_list:
+    # 并行下载非git托管代码
+    missing_list: list[str] = []
+    for lib in sorted(config.extra_lib_list):
         assert lib in all_lib_list.extra_lib_list, common.toolchains_error(f"Unknown extra lib: {lib}")
         if not all_lib_list.extra_lib_list[lib].check_exist(config):
-            download_specific_extra_lib(config, lib)
-            after_download_list.after_download_specific_lib(config, lib)
+            missing_list.append(lib)
         else:
             _exist_echo(lib)
+    download_extra_libs(config, missing_list)
     for lib in ("gmp", "mpfr", "isl", "mpc"):
         if not (config.home / "gcc" / lib).exists():
             download_gcc_contrib(config)
@@ -133,49 +498,20 @@ def update(config: configure) -> None:
         config (configure): 源代码下载环境
     """
 
-    # 更新git托管的源代码
-    for lib in all_lib_list.get_prefer_git_lib_list(config):
-        lib_dir = config.home / lib
-        assert lib_dir.exists(), common.toolchains_error(f"Cannot find lib: {lib}")
-        with tempfile.TemporaryFile("r+") as file:
-            for _ in range(config.network_try_times):
-                try:
-                    common.run_command(f"git -C {lib_dir} fetch --dry-run", capture=(file, file), add_counter=False)
-                    break
-                except KeyboardInterrupt:
-                    common.keyboard_interpret_received()
-                except:
-                    common.toolchains_print(common.toolchains_warning(f"Fetch {lib} failed, retrying."))
-                    file.truncate(0)
-                    file.seek(0, os.SEEK_SET)
-            else:
-                raise RuntimeError(common.toolchains_error(f"Fetch {lib} failed."))
-
-            if file.tell():
-                for _ in range(config.network_try_times):
-                    try:
-                        common.run_command(f"git -C {lib_dir} pull {common.command_quiet.get_option()}", add_counter=False)
-                        break
-                    except KeyboardInterrupt:
-                        common.keyboard_interpret_received()
-                    except:
-                        common.toolchains_print(common.toolchains_warning(f"Pull {lib} failed, retrying."))
-                else:
-                    raise RuntimeError(common.toolchains_error(f"Pull {lib} failed."))
-                after_download_list.after_download_specific_lib(config, lib)
-                common.status_counter.add_success()
-            else:
-                _up_to_date_echo(lib)
-
-    # 更新非git包
-    for lib in config.extra_lib_list:
+    # 并行更新git托管的源代码
+    # 更新时从克隆时使用的源拉取，无需探测镜像源
+    update_git_libs(config, all_lib_list.git_lib_list_github)
+
+    # 并行更新非git包
+    outdated_list: list[str] = []
+    for lib in sorted(config.extra_lib_list):
         lib_version = extra_lib_version[lib if lib != "python-embed" else "python"]
         need_download = _check_version_echo(
             lib, lib_version.check_version(config.home / all_lib_list.get_prefer_extra_lib_list(config, lib).version_dir)
         )
         if need_download:
-            download_specific_extra_lib(config, lib)
-            after_download_list.after_download_specific_lib(config, lib)
+            outdated_list.append(lib)
+    download_extra_libs(config, outdated_list)
 
     common.toolchains_print(common.toolchains_success("Update libs successfully."))
 
@@ -259,18 +595,32 @@ def _check_input(args: argparse.Namespace) -> None:
         assert args.depth > 0, common.toolchains_error(f"Invalid shallow clone depth: {args.depth}.")
     if args.command in ("update", "download", "auto"):
         assert args.retry >= 0, common.toolchains_error(f"Invalid network try times: {args.retry}.")
+        assert args.network_jobs > 0, common.toolchains_error(f"Invalid network jobs: {args.network_jobs}.")
+        assert args.http_connections > 0, common.toolchains_error(f"Invalid http connections: {args.http_connections}.")
+        assert args.min_speed >= 0, common.toolchains_error(f"Invalid min speed: {args.min_speed}.")
 
 
 __all__ = [
     "extra_lib_version",
     "git_clone_type",
+    "git_url",
+    "extra_lib_sha256",
+    "get_extra_lib_sha256",
+    "http_downloader",
+    "mirror_ranking",
     "git_prefer_remote",
     "all_lib_list",
     "configure",
     "after_download_list",
     "extra_git_options_list",
+    "clone_specific_lib",
+    "clone_git_libs",
+    "update_specific_lib",
+    "update_git_libs",
     "download_gcc_contrib",
     "download_specific_extra_lib",
+    "download_specific_file",
+    "download_extra_libs",
     "download",
     "update",
     "auto_download",
@@ -323,10 +673,46 @@ def main() -> int:
         subparser.add_argument(
             "--remote",
             type=str,
-            help="The remote repository preferred to use. The preferred remote will be used to accelerate download when possible.",
+            help="The remote repository preferred to use. The preferred remote will be used to accelerate download when possible. "
+            "Use auto to probe all mirrors concurrently, pick the fastest one for each lib and switch to the next one on failure.",
             default=default_config.git_remote,
             choices=git_prefer_remote,
         )
+        subparser.add_argument(
+            "--min-speed",
+            type=int,
+            help="With --remote auto, switch to the next mirror when a clone or download stays slower than this many KiB/s "
+            "for 30 seconds. Use 0 to only switch on failure.",
+            default=default_config.min_speed,
+        )
+        subparser.add_argument(
+            "--object-cache",
+            type=str,
+            help="The directory to keep a bare mirror of each upstream repository. "
+            "New clones borrow objects from it through alternates, and update fetches into it first. "
+            "The directory is shared by all homes and must not be removed while any clone refers to it.",
+            default=default_config.object_cache,
+        )
+        subparser.add_argument(
+            "--network-jobs",
+            type=int,
+            help="The number of network operations to run concurrently, e.g. git repositories cloned at the same time. "
+            "Larger repositories are cloned first.",
+            default=default_config.network_jobs,
+        )
+        subparser.add_argument(
+            "--http-connections",
+            type=int,
+            help="The maximum number of HTTP range connections used to download each non-git file. "
+            "Interrupted downloads resume from the partial file.",
+            default=default_config.http_connections,
+        )
+        subparser.add_argument(
+            "--require-sha256",
+            action=argparse.BooleanOptionalAction,
+            help="Refuse to download non-git files without a recorded SHA-256 digest instead of warning after the download.",
+            default=default_config.require_sha256,
+        )
     for subparser in (download_parser, auto_parser):
         subparser.add_argument(
             "--glibc", dest="glibc_version", type=str, help="The version of glibc of target platform.", default=default_config.glibc_version
@@ -1,5 +1,15 @@
+import concurrent.futures
 import enum
+import hashlib
+import json
+import os
+import re
+import subprocess
+import threading
+import time
 import typing
+import urllib.parse
+import urllib.request
 from collections.abc import Sequence
 from pathlib import Path
 
@@ -63,6 +73,24 @@ class extra_lib_version(enum.StrEnum):
             return -1
 
 
+# 非git包下载文件的SHA-256摘要，按下载链接中的文件名索引。文件名带有版本号，更新extra_lib_version后旧摘要不会用于新版本的文件
+# 只记录与上游发布核对过的摘要。未记录摘要的文件下载后会给出警告并打印其摘要，核对后填入此表；使用--require-sha256时拒绝下载
+extra_lib_sha256: typing.Final[dict[str, str]] = {}
+
+
+def get_extra_lib_sha256(url: str) -> str | None:
+    """获取下载链接对应文件的SHA-256摘要
+
+    Args:
+        url (str): 下载链接
+
+    Returns:
+        str | None: 十六进制摘要，未记录摘要时为None
+    """
+
+    return extra_lib_sha256.get(Path(urllib.parse.urlsplit(url).path).name)
+
+
 def get_current_glibc_version() -> str | None:
     """获取当前glibc版本
 
@@ -141,6 +169,7 @@ class git_prefer_remote(enum.StrEnum):
         bfsu  : 在可能时使用北京外国语大学镜像源，否则退回到使用GitHub源
         nyist : 在可能时使用南阳理工学院镜像源，否则退回到使用GitHub源
         cernet: 在可能时使用校园网联合镜像源，否则退回到使用GitHub源
+        auto  : 并发探测所有源的延迟，为每个包选择最快的源，传输过慢或失败时切换到下一个源
     """
 
     github = "github"
@@ -150,6 +179,7 @@ class git_prefer_remote(enum.StrEnum):
     bfsu = "bfsu"
     nyist = "nyist"
     cernet = "cernet"
+    auto = "auto"
 
 
 class extra_lib:
@@ -195,6 +225,446 @@ class extra_lib:
             return True
 
 
+class http_downloader:
+    """分段、可续传的HTTP下载器
+
+    服务器支持Range请求时将文件划分为若干分段，每个分段使用独立的连接并行下载，通过pwrite写入同一个临时文件，
+    各个分段的进度定期保存到状态文件中，再次下载时从中断处继续。服务器不支持Range请求时退回到单连接下载，不支持续传。
+
+    Attributes:
+        part_suffix      : 未完成的下载文件的后缀
+        state_suffix     : 保存分段进度的状态文件的后缀
+        min_segment_size : 每个分段的最小大小
+        block_size       : 每次读取的数据块大小
+        timeout          : 网络连接的超时时间(秒)
+        progress_interval: 打印进度和保存状态的最小间隔(秒)
+        slow_window      : 统计下载速度的时间窗口(秒)，窗口内的平均速度低于min_speed时停止下载
+    """
+
+    part_suffix: typing.Final[str] = ".part"
+    state_suffix: typing.Final[str] = ".part.json"
+    min_segment_size: typing.Final[int] = 1 << 20
+    block_size: typing.Final[int] = 1 << 16
+    timeout: typing.Final[float] = 30
+    progress_interval: typing.Final[float] = 1.0
+    slow_window: typing.ClassVar[float] = 30
+
+    url: str  # 下载链接
+    file: Path  # 保存路径
+    connections: int  # 每个文件最多使用的连接数
+    sha256: str | None  # 文件的SHA-256摘要，为None表示不校验
+    cancel: threading.Event | None  # 外部设置后停止下载
+    min_speed: int  # 下载速度的下限(字节/秒)，为0表示不限制
+
+    _segment_list: list[list[int]]  # 各个分段的[起始位置, 结束位置, 已下载字节数]
+    _lock: threading.Lock
+    _stop: threading.Event
+    _last_time: float
+    _window: tuple[float, int]  # 当前速度统计窗口的开始时间和开始时已下载的字节数
+    _slow: bool  # 是否因为速度过慢而停止
+
+    def __init__(
+        self,
+        url: str,
+        file: Path,
+        connections: int = 4,
+        sha256: str | None = None,
+        cancel: threading.Event | None = None,
+        min_speed: int = 0,
+    ) -> None:
+        """创建一个下载任务
+
+        Args:
+            url (str): 下载链接
+            file (Path): 保存路径
+            connections (int, optional): 每个文件最多使用的连接数. 默认为4.
+            sha256 (str | None, optional): 文件的SHA-256摘要. 默认不校验.
+            cancel (threading.Event | None, optional): 外部设置后停止下载，已下载的进度会保存. 默认不会被外部停止.
+            min_speed (int, optional): 下载速度的下限(字节/秒)，持续低于下限时停止下载，以便切换到其他镜像. 默认不限制.
+        """
+
+        self.url = url
+        self.file = file
+        self.connections = connections
+        self.sha256 = sha256
+        self.cancel = cancel
+        self.min_speed = min_speed
+        self._segment_list = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._last_time = 0.0
+        self._window = (0.0, 0)
+        self._slow = False
+
+    @property
+    def part_file(self) -> Path:
+        return self.file.with_name(f"{self.file.name}{self.part_suffix}")
+
+    @property
+    def state_file(self) -> Path:
+        return self.file.with_name(f"{self.file.name}{self.state_suffix}")
+
+    def _stopped(self) -> bool:
+        return self._stop.is_set() or (self.cancel is not None and self.cancel.is_set())
+
+    def _probe(self) -> tuple[str, int | None, bool]:
+        """请求文件的第一个字节，获取重定向后的链接、文件大小以及服务器是否支持Range请求
+
+        Returns:
+            tuple[str, int | None, bool]: 重定向后的链接，文件大小(未知时为None)，是否支持Range请求
+        """
+
+        request = urllib.request.Request(self.url, headers={"Range": "bytes=0-0"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            url: str = response.geturl()
+            content_range = response.headers.get("Content-Range", "")
+            if response.status == 206 and (match := re.fullmatch(r"bytes 0-0/(\d+)", content_range)):
+                return url, int(match[1]), True
+            length = response.headers.get("Content-Length")
+            return url, int(length) if length else None, False
+
+    def _plan_segment_list(self, size: int) -> list[list[int]]:
+        """将文件均分为若干分段，每个分段不小于min_segment_size
+
+        Args:
+            size (int): 文件大小
+
+        Returns:
+            list[list[int]]: 各个分段的[起始位置, 结束位置, 已下载字节数]
+        """
+
+        count = max(min(self.connections, size // self.min_segment_size), 1)
+        bound_list = [size * i // count for i in range(count + 1)]
+        return [[bound_list[i], bound_list[i + 1], 0] for i in range(count)]
+
+    def _load_state(self, size: int) -> list[list[int]] | None:
+        """读取上次中断时保存的分段进度，链接或文件大小变化时不续传
+
+        Args:
+            size (int): 文件大小
+
+        Returns:
+            list[list[int]] | None: 各个分段的进度，无法续传时为None
+        """
+
+        try:
+            state = json.loads(self.state_file.read_text())
+            if state["url"] == self.url and state["size"] == size and self.part_file.stat().st_size == size:
+                return typing.cast(list[list[int]], state["segment_list"])
+        except Exception:
+            pass
+        return None
+
+    def _save_state(self, size: int) -> None:
+        """原子地保存各个分段的进度
+
+        Args:
+            size (int): 文件大小
+        """
+
+        with self._lock:
+            data = json.dumps({"url": self.url, "size": size, "segment_list": self._segment_list})
+        tmp_file = self.state_file.with_name(f"{self.state_file.name}.tmp")
+        tmp_file.write_text(data)
+        os.replace(tmp_file, self.state_file)
+
+    def _get_downloaded(self) -> int:
+        with self._lock:
+            return sum(segment[2] for segment in self._segment_list)
+
+    def _update_progress(self, size: int | None, start_time: float, resumable: bool) -> None:
+        """按固定间隔打印下载进度，可以续传时同时保存分段进度
+
+        Args:
+            size (int | None): 文件大小，为None表示未知
+            start_time (float): 开始下载的时间
+            resumable (bool): 是否可以续传
+        """
+
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_time < self.progress_interval:
+                return
+            self._last_time = now
+        downloaded = self._get_downloaded()
+        speed = downloaded / max(now - start_time, 1e-6) / 1e6
+        percent = f"{downloaded * 100 / size:.1f}% " if size else ""
+        common.toolchains_print(common.toolchains_info(f"{self.file.name}: {percent}{downloaded / (1 << 20):.1f} MiB, {speed:.1f} MB/s"))
+        if size is not None and resumable:
+            self._save_state(size)
+        window_time, window_size = self._window
+        if now - window_time >= self.slow_window:
+            if self.min_speed and (downloaded - window_size) / (now - window_time) < self.min_speed:
+                self._slow = True
+                self._stop.set()
+            self._window = (now, downloaded)
+
+    def _download_segment(self, url: str, fd: int, segment: list[int], size: int, start_time: float) -> None:
+        """使用一个连接下载一个分段中尚未下载的部分
+
+        Args:
+            url (str): 下载链接
+            fd (int): 临时文件的文件描述符
+            segment (list[int]): 分段的[起始位置, 结束位置, 已下载字节数]
+            size (int): 文件大小
+            start_time (float): 开始下载的时间
+
+        Raises:
+            RuntimeError: 服务器不遵守Range请求或连接提前关闭时抛出异常
+        """
+
+        start, end, _ = segment
+        if start + segment[2] >= end:
+            return
+        request = urllib.request.Request(url, headers={"Range": f"bytes={start + segment[2]}-{end - 1}"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if response.status != 206:
+                raise RuntimeError(common.toolchains_error(f"Server does not honor range requests of {self.url}."))
+            while not self._stopped() and (data := response.read(min(self.block_size, end - start - segment[2]))):
+                os.pwrite(fd, data, start + segment[2])
+                with self._lock:
+                    segment[2] += len(data)
+                self._update_progress(size, start_time, True)
+        if start + segment[2] < end and not self._stopped():
+            raise RuntimeError(common.toolchains_error(f"Connection of {self.url} closed before the segment finished."))
+
+    def _download_segmented(self, url: str, size: int, start_time: float) -> None:
+        """多个连接并行下载各个分段，退出时保存分段进度
+
+        Args:
+            url (str): 下载链接
+            size (int): 文件大小
+            start_time (float): 开始下载的时间
+        """
+
+        if (segment_list := self._load_state(size)) is not None:
+            self._segment_list = segment_list
+            common.toolchains_print(common.toolchains_note(f"Resume {self.file.name} from {self._get_downloaded() >> 20} MiB."))
+        else:
+            self._segment_list = self._plan_segment_list(size)
+            with self.part_file.open("wb") as file:
+                file.truncate(size)
+        fd = os.open(self.part_file, os.O_WRONLY)
+        try:
+            with concurrent.futures.ThreadPoolExecutor(len(self._segment_list)) as executor:
+                future_list = [
+                    executor.submit(self._download_segment, url, fd, segment, size, start_time) for segment in self._segment_list
+                ]
+                try:
+                    for future in concurrent.futures.as_completed(future_list):
+                        future.result()
+                except BaseException:
+                    # 一个分段失败后停止其他分段，已下载的部分留待重试时续传
+                    self._stop.set()
+                    raise
+        finally:
+            os.close(fd)
+            self._save_state(size)
+        self._check_stopped()
+
+    def _check_stopped(self) -> None:
+        """下载被停止时抛出异常
+
+        Raises:
+            RuntimeError: 下载速度过慢或被外部停止
+        """
+
+        if self._slow:
+            raise RuntimeError(common.toolchains_error(f"Download {self.file.name} is slower than {self.min_speed >> 10} KiB/s."))
+        if self._stopped():
+            raise RuntimeError(common.toolchains_error(f"Download {self.file.name} cancelled."))
+
+    def _download_stream(self, url: str, size: int | None, start_time: float) -> None:
+        """服务器不支持Range请求时使用单个连接从头下载
+
+        Args:
+            url (str): 下载链接
+            size (int | None): 文件大小，为None表示未知
+            start_time (float): 开始下载的时间
+        """
+
+        self._segment_list = [[0, size or 0, 0]]
+        with urllib.request.urlopen(url, timeout=self.timeout) as response, self.part_file.open("wb") as file:
+            while data := response.read(self.block_size):
+                self._check_stopped()
+                file.write(data)
+                with self._lock:
+                    self._segment_list[0][2] += len(data)
+                self._update_progress(size, start_time, False)
+        if size is not None and self._segment_list[0][2] != size:
+            raise RuntimeError(common.toolchains_error(f"Connection of {self.url} closed before the download finished."))
+
+    def verify(self, file: Path) -> None:
+        """校验文件的SHA-256摘要，不匹配时删除文件和下载进度
+
+        Args:
+            file (Path): 要校验的文件
+
+        Raises:
+            RuntimeError: 摘要不匹配时抛出异常
+        """
+
+        if not self.sha256:
+            return
+        with file.open("rb") as input:
+            digest = hashlib.file_digest(input, "sha256").hexdigest()
+        if digest != self.sha256.lower():
+            file.unlink()
+            self.state_file.unlink(missing_ok=True)
+            raise RuntimeError(common.toolchains_error(f"SHA-256 of {self.file.name} mismatch: expected {self.sha256}, got {digest}."))
+
+    def _download_echo(self) -> str:
+        return common.toolchains_info(f"Download {self.url} -> {self.file}.")
+
+    @common.support_dry_run(_download_echo)
+    def download(self, dry_run: bool | None = None) -> None:
+        """下载文件，服务器支持Range请求时多连接分段下载并从上次中断处继续，完成后校验摘要并移动到保存路径
+
+        Args:
+            dry_run (bool | None, optional): 是否只回显命令而不执行，默认为None.
+
+        Raises:
+            RuntimeError: 下载失败或摘要不匹配时抛出异常
+        """
+
+        self._stop.clear()
+        self._slow = False
+        start_time = self._last_time = time.monotonic()
+        self._window = (start_time, 0)
+        url, size, resumable = self._probe()
+        if resumable and size:
+            self._download_segmented(url, size, start_time)
+        else:
+            self._download_stream(url, size, start_time)
+        self.verify(self.part_file)
+        os.replace(self.part_file, self.file)
+        self.state_file.unlink(missing_ok=True)
+        elapsed = time.monotonic() - start_time
+        common.toolchains_print(
+            common.toolchains_info(f"Downloaded {self.file.name}: {self.file.stat().st_size / (1 << 20):.1f} MiB in {elapsed:.1f} s.")
+        )
+
+
+class mirror_ranking:
+    """并发探测各个镜像源的延迟并缓存结果，按延迟从低到高对镜像源排序
+
+    git源使用git ls-remote探测，HTTP源使用HEAD请求探测。探测结果按链接保存在home下的缓存文件中，在有效期内不再重复探测。
+
+    Attributes:
+        cache_name: 缓存文件名
+        ttl       : 探测结果的有效期(秒)
+        timeout   : 单次探测的超时时间(秒)
+        jobs      : 同时进行的探测数
+    """
+
+    cache_name: typing.Final[str] = ".mirror_ranking.json"
+    ttl: typing.ClassVar[float] = 24 * 3600
+    timeout: typing.ClassVar[float] = 15
+    jobs: typing.ClassVar[int] = 16
+
+    cache_file: Path  # 缓存文件路径
+    latency_map: dict[str, tuple[float, float | None]]  # 链接->(探测时间, 延迟)，延迟为None表示不可用
+
+    def __init__(self, home: Path) -> None:
+        """读取缓存中尚未过期的探测结果
+
+        Args:
+            home (Path): 源码树根目录，缓存文件保存在其中
+        """
+
+        self.cache_file = home / self.cache_name
+        self.latency_map = {}
+        try:
+            content: dict[str, list[typing.Any]] = json.loads(self.cache_file.read_text())
+            now = time.time()
+            self.latency_map = {url: (probe_time, latency) for url, (probe_time, latency) in content.items() if now - probe_time < self.ttl}
+        except Exception:
+            pass
+
+    @classmethod
+    def probe_git(cls, url: str) -> float | None:
+        """使用git ls-remote探测git源的延迟
+
+        Args:
+            url (str): git仓库链接
+
+        Returns:
+            float | None: 延迟(秒)，不可用时为None
+        """
+
+        start = time.monotonic()
+        try:
+            subprocess.run(
+                ["git", "ls-remote", url, "HEAD"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=True,
+                timeout=cls.timeout,
+                env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+            )
+        except (subprocess.SubprocessError, OSError):
+            return None
+        return time.monotonic() - start
+
+    @classmethod
+    def probe_http(cls, url: str) -> float | None:
+        """使用HEAD请求探测HTTP源的延迟
+
+        Args:
+            url (str): 下载链接
+
+        Returns:
+            float | None: 延迟(秒)，不可用时为None
+        """
+
+        start = time.monotonic()
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, method="HEAD"), timeout=cls.timeout):
+                pass
+        except OSError:
+            return None
+        return time.monotonic() - start
+
+    def probe(self, git_url_list: typing.Iterable[str], http_url_list: typing.Iterable[str]) -> None:
+        """并发探测缓存中没有的链接，并更新缓存文件
+
+        Args:
+            git_url_list (typing.Iterable[str]): git仓库链接列表
+            http_url_list (typing.Iterable[str]): 下载链接列表
+        """
+
+        task_list: dict[str, typing.Callable[[str], float | None]] = {
+            **{url: self.probe_git for url in git_url_list if url not in self.latency_map},
+            **{url: self.probe_http for url in http_url_list if url not in self.latency_map},
+        }
+        if not task_list:
+            return
+        common.toolchains_print(common.toolchains_info(f"Probe latency of {len(task_list)} mirrors."))
+        now = time.time()
+        with concurrent.futures.ThreadPoolExecutor(self.jobs) as executor:
+            for url, latency in zip(task_list, executor.map(lambda task: task[1](task[0]), task_list.items())):
+                self.latency_map[url] = (now, latency)
+        tmp_file = self.cache_file.with_name(f"{self.cache_file.name}.tmp")
+        tmp_file.write_text(json.dumps(self.latency_map, indent=4))
+        os.replace(tmp_file, self.cache_file)
+
+    def rank(self, url_list: typing.Iterable[str]) -> list[str]:
+        """按延迟从低到高排序，不可用或未探测的链接排在最后并保持原有顺序
+
+        Args:
+            url_list (typing.Iterable[str]): 链接列表
+
+        Returns:
+            list[str]: 排序后的链接列表
+        """
+
+        def get_latency(url: str) -> float:
+            latency = self.latency_map.get(url, (0, None))[1]
+            return float("inf") if latency is None else latency
+
+        return sorted(url_list, key=get_latency)
+
+
 class all_lib_list:
     """所有包源列表
 
@@ -207,8 +677,10 @@ class all_lib_list:
         git_lib_list_bfsu  : git包的北京外国语大学镜像源
         git_lib_list_nyist : git包的南阳理工学院镜像源
         git_lib_list_cernet: git包的校园网联合镜像源
+        git_lib_size_order : git包按仓库大小从大到小的顺序
         extra_lib_list     : 非git包的信息列表，默认为南京大学镜像
         extra_lib_list_native: 非git包的信息列表，不使用镜像
+        extra_mirror_list  : 非git包的所有镜像
         necessary_extra_lib_list: 必须的非git包列表
         optional_extra_lib_list : 可选的非git包列表
         all_lib_list       : 所有受支持的包列表
@@ -309,6 +781,22 @@ class all_lib_list:
         "llvm": git_url("mirrors.cernet.edu.cn", "llvm-project.git"),
     }
 
+    # 并行克隆时优先启动较大的仓库，避免最大的仓库最后才开始下载而拖长总用时
+    git_lib_size_order: typing.Final[list[str]] = [
+        "linux",
+        "llvm",
+        "gcc",
+        "binutils",
+        "newlib",
+        "glibc",
+        "mingw",
+        "libxml2",
+        "zstd",
+        "expat",
+        "zlib",
+        "pexports",
+    ]
+
     # 额外包列表，由于native网络性能不佳，默认使用南京大学镜像
     extra_lib_list: typing.Final[dict[str, extra_lib]] = {
         "python-embed": extra_lib(
@@ -350,6 +838,7 @@ class all_lib_list:
             }
         ),
     }
+    extra_mirror_list: typing.Final[list[dict[str, extra_lib]]] = [extra_lib_list, extra_lib_list_native]
     necessary_extra_lib_list: typing.Final[set[str]] = {"python-embed", "gmp", "mpfr"}
     optional_extra_lib_list: typing.Final[set[str]] = {lib for lib in extra_lib_list} - necessary_extra_lib_list
     all_lib_list: typing.Final[list[str]] = [*git_lib_list_github, *extra_lib_list, "gcc_contrib"]
@@ -365,8 +854,66 @@ class all_lib_list:
             dict[str, git_url]: git包列表
         """
 
+        if config.git_remote == git_prefer_remote.auto:
+            return {lib: url_list[0] for lib, url_list in all_lib_list.get_git_url_map(config).items()}
         return typing.cast(dict[str, git_url], getattr(all_lib_list, f"git_lib_list_{config.git_remote}"))
 
+    @staticmethod
+    def get_git_url_map(config: "configure") -> dict[str, list[git_url]]:
+        """获取各个git包可用的远程源，使用auto源时按探测到的延迟从低到高排列所有源，否则只有首选源
+
+        Args:
+            config (configure): 当前下载配置
+
+        Returns:
+            dict[str, list[git_url]]: git包->远程源列表
+        """
+
+        if config.git_remote != git_prefer_remote.auto:
+            return {lib: [url] for lib, url in all_lib_list.get_prefer_git_lib_list(config).items()}
+        ranking = config.get_mirror_ranking()
+        result: dict[str, list[git_url]] = {}
+        for lib in all_lib_list.git_lib_list_github:
+            candidate_list: dict[str, git_url] = {}
+            for remote in filter(lambda remote: remote != git_prefer_remote.auto, git_prefer_remote):
+                url_fields: git_url = getattr(all_lib_list, f"git_lib_list_{remote}")[lib]
+                candidate_list.setdefault(url_fields.get_url(config.git_use_ssh), url_fields)
+            result[lib] = [candidate_list[url] for url in ranking.rank(candidate_list)]
+        return result
+
+    @staticmethod
+    def get_extra_lib_url_map(config: "configure", lib: str) -> dict[Path, list[str]]:
+        """获取非git包各个文件可用的下载链接，使用auto源时按探测到的延迟从低到高排列所有镜像，否则只有默认镜像
+
+        Args:
+            config (configure): 当前下载配置
+            lib (str): 包名称
+
+        Returns:
+            dict[Path, list[str]]: 文件名->下载链接列表
+        """
+
+        url_map = {file: [url] for file, url in all_lib_list.extra_lib_list[lib].url_list.items()}
+        if config.git_remote == git_prefer_remote.auto:
+            ranking = config.get_mirror_ranking()
+            for file in url_map:
+                url_map[file] = ranking.rank(dict.fromkeys(mirror[lib].url_list[file] for mirror in all_lib_list.extra_mirror_list))
+        return url_map
+
+    @staticmethod
+    def sort_by_size(lib_list: typing.Iterable[str]) -> list[str]:
+        """将git包按仓库大小从大到小排序，未知大小的包排在最后并保持原有顺序
+
+        Args:
+            lib_list (typing.Iterable[str]): git包列表
+
+        Returns:
+            list[str]: 排序后的git包列表
+        """
+
+        order = all_lib_list.git_lib_size_order
+        return sorted(lib_list, key=lambda lib: order.index(lib) if lib in order else len(order))
+
     @staticmethod
     def get_prefer_extra_lib_list(config: "configure", lib: str) -> extra_lib:
         """根据配置选择使用合适镜像源的非git包
@@ -393,8 +940,14 @@ class configure(common.basic_configure):
     git_use_ssh: bool
     extra_lib_list: set[str]
     network_try_times: int
+    network_jobs: int
+    http_connections: int
+    require_sha256: bool
+    min_speed: int
     git_remote: git_prefer_remote
+    object_cache: Path | None
 
+    _mirror_ranking: mirror_ranking | None  # 使用auto源时探测到的镜像源排名
     _origin_extra_lib_list: set[str]  # 用户输入的其他非git托管包列表
     _origin_retry: int  # 用户输入的重试的次数
 
@@ -407,6 +960,12 @@ class configure(common.basic_configure):
         extra_libs: list[str] | None = None,
         retry: int = 5,
         remote: str = git_prefer_remote.github,
+        network_jobs: int = 4,
+        http_connections: int = 4,
+        require_sha256: bool = False,
+        min_speed: int = 64,
+        object_cache: str | None = None,
+        base_path: Path = Path.cwd(),
         **kwargs: typing.Any,
     ) -> None:
         """设置源代码配置信息，可默认构造以提供默认配置
@@ -419,9 +978,15 @@ class configure(common.basic_configure):
             extra_libs (list[str] | None, optional): 额外的非git包列表. 默认不启用额外包.
             retry (int, optional): 进行网络操作时重试的次数. 默认为5次.
             remote (str, optional): 倾向于使用的git源. 默认为GitHub源.
+            network_jobs (int, optional): 同时进行的网络操作数，如同时克隆的git包数. 默认为4.
+            http_connections (int, optional): 下载非git包时每个文件最多使用的HTTP连接数. 默认为4.
+            require_sha256 (bool, optional): 是否拒绝下载没有记录SHA-256摘要的文件. 默认为否，只给出警告.
+            min_speed (int, optional): 使用auto源时传输速度的下限(KiB/s)，持续低于下限时切换到下一个源，为0表示不切换. 默认为64.
+            object_cache (str | None, optional): 对象缓存目录，为每个上游仓库保存一个裸仓库，新克隆的仓库通过alternates引用其中的对象. 默认不使用对象缓存.
+            base_path (Path, optional): 将相对路径转化为绝对路径时使用的基路径. 默认为当前工作目录.
         """
 
-        super().__init__(**kwargs)
+        super().__init__(base_path=base_path, **kwargs)
         self.glibc_version = glibc_version
         self.clone_type = git_clone_type[clone_type]
         self.shallow_clone_depth = depth
@@ -436,6 +1001,12 @@ class configure(common.basic_configure):
         self.network_try_times = self._origin_retry + 1
         self.git_remote = git_prefer_remote[remote]
         self.register_encode_name_map("remote", "git_remote")
+        self.network_jobs = network_jobs
+        self.http_connections = http_connections
+        self.require_sha256 = require_sha256
+        self.min_speed = min_speed
+        self.object_cache = common.resolve_path(object_cache, base_path) if object_cache else None
+        self._mirror_ranking = None
 
     def check(self, need_glibc: bool) -> None:
         """检查各个参数是否合法"""
@@ -445,6 +1016,42 @@ class configure(common.basic_configure):
             assert self.glibc_version, f"Invalid glibc version: {self.glibc_version}"
         assert self.shallow_clone_depth > 0, f"Invalid shallow clone depth: {self.shallow_clone_depth}."
         assert self.network_try_times >= 1, f"Invalid network try times: {self.network_try_times}."
+        assert self.network_jobs >= 1, f"Invalid network jobs: {self.network_jobs}."
+        assert self.http_connections >= 1, f"Invalid http connections: {self.http_connections}."
+        assert self.min_speed >= 0, f"Invalid min speed: {self.min_speed}."
+
+    def get_object_cache_dir(self, lib: str) -> Path | None:
+        """获取git包在对象缓存中的裸仓库路径
+
+        Args:
+            lib (str): git包名
+
+        Returns:
+            Path | None: 裸仓库路径，未使用对象缓存时为None
+        """
+
+        return self.object_cache / f"{lib}.git" if self.object_cache else None
+
+    def get_mirror_ranking(self) -> mirror_ranking:
+        """获取镜像源排名，首次调用时并发探测所有git源和所需非git包的所有下载链接
+
+        Returns:
+            mirror_ranking: 镜像源排名
+        """
+
+        if self._mirror_ranking is None:
+            self._mirror_ranking = mirror_ranking(self.home)
+            git_url_list = [
+                url_fields.get_url(self.git_use_ssh)
+                for remote in git_prefer_remote
+                if remote != git_prefer_remote.auto
+                for url_fields in typing.cast(dict[str, git_url], getattr(all_lib_list, f"git_lib_list_{remote}")).values()
+            ]
+            http_url_list = [
+                url for mirror in all_lib_list.extra_mirror_list for lib in self.extra_lib_list for url in mirror[lib].url_list.values()
+            ]
+            self._mirror_ranking.probe(git_url_list, http_url_list)
+        return self._mirror_ranking
 
 
 class after_download_list:
@@ -620,6 +1227,11 @@ class extra_git_options_list:
 __all__ = [
     "extra_lib_version",
     "git_clone_type",
+    "git_url",
+    "extra_lib_sha256",
+    "get_extra_lib_sha256",
+    "http_downloader",
+    "mirror_ranking",
     "git_prefer_remote",
     "all_lib_list",
     "configure",
@@ -58,6 +58,8 @@ def get_specific_environment(self: common.basic_environment, host: str | None =
         self.long_distance_match,
         self.build_tmp,
         True,
+        self.debug_info,
+        self.split_components,
     )
 
 
@@ -92,10 +94,12 @@ class gcc_environment(common.basic_environment):
         home: Path,
         jobs: int,
         prefix_dir: Path,
-        compress_level: int,
+        compress_level: common.compress_level_t,
         long_distance_match: int,
         build_tmp: Path,
         simple: bool = False,
+        debug_info: common.debug_info_t = "keep",
+        split_components: bool = False,
     ) -> None:
         self.build = build
         self.host = host or build
@@ -106,7 +110,19 @@ class gcc_environment(common.basic_environment):
         self.cross_compiler = self.toolchain_type.contain(common.toolchain_type.cross | common.toolchain_type.canadian_cross)
 
         name_without_version = (f"{self.host}-host-{self.target}-target" if self.cross_compiler else f"{self.host}-native") + "-gcc"
-        super().__init__(build, "16.0.1", name_without_version, home, jobs, prefix_dir, compress_level, long_distance_match, build_tmp)
+        super().__init__(
+            build,
+            "16.0.1",
+            name_without_version,
+            home,
+            jobs,
+            prefix_dir,
+            compress_level,
+            long_distance_match,
+            build_tmp,
+            debug_info,
+            split_components,
+        )
 
         self.prefix = self.prefix_dir / self.name
         self.lib_prefix = self.prefix / self.target if not self.toolchain_type.contain(common.toolchain_type.canadian) else self.prefix
@@ -523,10 +539,12 @@ class build_gcc_environment:
         jobs: int,
         prefix_dir: Path,
         nls: bool,
-        compress_level: int,
+        compress_level: common.compress_level_t,
         long_distance_match: int,
         build_tmp: Path,
         use_system_python: bool,
+        debug_info: common.debug_info_t = "keep",
+        split_components: bool = False,
     ) -> None:
         """gcc交叉工具链对象
 
@@ -541,13 +559,27 @@ class build_gcc_environment:
             jobs (int): 并发构建数
             prefix_dir (Path): 安装根目录
             nls (bool): 是否启用nls
-            compress_level (int): zstd压缩等级
+            compress_level (common.compress_level_t): zstd压缩等级
             long_distance_match (int): 长距离匹配窗口大小
             build_tmp (Path): 构建工具链时存放临时文件的路径
             use_system_python (bool): 是否使用系统python而不是当前的python解释器构建gdb.
+            debug_info (common.debug_info_t, optional): 打包前如何处理ELF文件中的调试信息. 默认保留.
+            split_components (bool, optional): 是否按组件将工具链拆分为多个压缩包. 默认为否.
         """
 
-        self.env = gcc_environment(build, host, target, home, jobs, prefix_dir, compress_level, long_distance_match, build_tmp)
+        self.env = gcc_environment(
+            build,
+            host,
+            target,
+            home,
+            jobs,
+            prefix_dir,
+            compress_level,
+            long_distance_match,
+            build_tmp,
+            debug_info=debug_info,
+            split_components=split_components,
+        )
         self.host_os = self.env.host_field.os
         self.target_os = self.env.target_field.os
         self.target_arch = self.env.target_field.arch
@@ -224,10 +224,12 @@ class llvm_environment(common.basic_environment):
         home: Path,
         jobs: int,
         prefix_dir: Path,
-        compress_level: int,
+        compress_level: common.compress_level_t,
         long_distance_match: int,
         build_tmp: Path,
         default_generator: cmake_generator,
+        debug_info: common.debug_info_t = "keep",
+        split_components: bool = False,
     ) -> None:
         """llvm构建环境
 
@@ -239,17 +241,31 @@ class llvm_environment(common.basic_environment):
             home (Path): 源代码树搜索主目录
             jobs (int): 并发构建数
             prefix_dir (str): 安装根目录
-            compress_level (int): zstd压缩等级
+            compress_level (common.compress_level_t): zstd压缩等级
             long_distance_match (int): 长距离匹配窗口大小
             build_tmp (Path): 构建工具链时存放临时文件的路径
             default_generator (cmake_generator): 默认的cmake生成工具
+            debug_info (common.debug_info_t, optional): 打包前如何处理ELF文件中的调试信息. 默认保留.
+            split_components (bool, optional): 是否按组件将工具链拆分为多个压缩包. 默认为否.
         """
 
         self.build = build
         self.host = host or self.build
         self.family = family
         name_without_version = f"{self.host}-clang"
-        super().__init__(build, "23.0.0", name_without_version, home, jobs, prefix_dir, compress_level, long_distance_match, build_tmp)
+        super().__init__(
+            build,
+            "23.0.0",
+            name_without_version,
+            home,
+            jobs,
+            prefix_dir,
+            compress_level,
+            long_distance_match,
+            build_tmp,
+            debug_info,
+            split_components,
+        )
         # 设置prefix
         self.prefix["llvm"] = self.prefix_dir / self.name
         self.compiler_rt_dir = self.prefix["llvm"] / "lib" / "clang" / self.major_version / "lib"
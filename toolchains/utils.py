@@ -3,8 +3,16 @@
 # PYTHON_ARGCOMPLETE_OK
 
 import argparse
+import concurrent.futures
+import contextlib
+import copy
 import functools
-import multiprocessing
+import json
+import os
+import sys
+import tempfile
+import time
+import typing
 from pathlib import Path
 
 from . import common
@@ -20,24 +28,231 @@ def compress(config: compress_configure) -> None:
 
     output_dir, dir_list, env = config._output_dir, config._item_list, config.to_environment()
     common.mkdir(output_dir, False)
-    with common.chdir_guard(env.prefix_dir):
-        for dir in dir_list or filter(lambda dir: common.toolchains_dir(dir), env.prefix_dir.iterdir()):
-            env.compress_path(str(dir.relative_to(env.prefix_dir)), output_dir, False)
+    if store := config.to_chunk_store():
+        _compress_to_store(store, env, output_dir, dir_list)
+        return
+    dir_list = dir_list or [*filter(lambda dir: common.toolchains_dir(dir) and not _debug_companion(dir), env.prefix_dir.iterdir())]
+    peak_rss = 0
+    with common.progress_monitor() as monitor:
+        if env.jobs > 1 and len(dir_list) > 1:
+            peak_rss = _compress_parallel(env, output_dir, dir_list, monitor)
+        else:
+            with common.chdir_guard(env.prefix_dir):
+                for dir in dir_list:
+                    env.compress_path(str(dir.relative_to(env.prefix_dir)), output_dir, False)
 
+    _report_peak_rss(env, peak_rss)
     common.toolchains_print(common.toolchains_success("Compress toolchains successfully."))
 
 
-def _decompress_worker(env: common.compress_environment, output_dir: Path, mutex: common.optional_lock, file: Path) -> None:
+def _debug_companion(dir: Path) -> bool:
+    """判断目录是否是某个工具链拆分出的调试信息包，这类目录在压缩对应的工具链时一同打包
+
+    Args:
+        dir (Path): 目录
+
+    Returns:
+        bool: 是否是调试信息包
+    """
+
+    suffix = common.compress_environment.debug_suffix
+    return dir.name.endswith(suffix) and dir.with_name(dir.name.removesuffix(suffix)).is_dir()
+
+
+def _get_dir_size(dir: Path) -> int:
+    """计算目录中所有文件的总大小
+
+    Args:
+        dir (Path): 目录
+
+    Returns:
+        int: 总大小
+    """
+
+    return sum(os.lstat(item).st_size for item in common.walk_path(str(dir)) if os.path.isfile(item) and not os.path.islink(item))
+
+
+def _split_jobs(size_list: list[int], jobs: int) -> list[int]:
+    """按未压缩大小的比例为各个压缩包分配线程数，每个压缩包至少分配一个线程且不超过总线程数
+
+    Args:
+        size_list (list[int]): 各个压缩包的未压缩大小
+        jobs (int): 总线程数
+
+    Returns:
+        list[int]: 各个压缩包分配的线程数
+    """
+
+    total_size = max(sum(size_list), 1)
+    return [min(max(round(jobs * size / total_size), 1), jobs) for size in size_list]
+
+
+def _report_peak_rss(env: common.compress_environment, peak_rss: int) -> None:
+    """设置了内存预算时，报告主进程和各个工作进程中最大的峰值常驻内存
+
+    Args:
+        env (common.compress_environment): 工具链压缩环境
+        peak_rss (int): 工作进程的峰值常驻内存(字节)
+    """
+
+    if env.memory_limit is None:
+        return
+    peak_rss = max(peak_rss, common.get_peak_rss())
+    msg = f"Peak RSS of a single process: {peak_rss >> 20} MiB, memory limit: {env.memory_limit >> 20} MiB."
+    common.toolchains_print(common.toolchains_warning(msg) if peak_rss > env.memory_limit else common.toolchains_info(msg))
+
+
+def _compress_worker(env: common.compress_environment, output_dir: Path, jobs: int, path: str) -> int:
+    """在进程池中使用分配的线程数压缩工具链，内存预算按线程数的比例分配
+
+    Args:
+        env (common.compress_environment): 工具链压缩环境
+        output_dir (Path): 输出目录
+        jobs (int): 分配的线程数
+        path (str): 工具链路径，是相对于prefix的路径
+
+    Returns:
+        int: 工作进程的峰值常驻内存(字节)
+    """
+
+    env = copy.copy(env)
+    if env.memory_limit is not None:
+        env.memory_limit = env.memory_limit * jobs // env.jobs
+    env.jobs = jobs
+    env.compress_path(path, output_dir)
+    return common.get_peak_rss()
+
+
+def _compress_parallel(env: common.compress_environment, output_dir: Path, dir_list: list[Path], monitor: common.progress_monitor) -> int:
+    """使用进程池同时压缩多个工具链，任意时刻各个压缩包使用的线程数之和不超过env.jobs
+
+    按未压缩大小从大到小启动压缩任务，空闲线程不足以启动下一个任务时尝试启动所需线程更少的任务。
+
+    Args:
+        env (common.compress_environment): 工具链压缩环境
+        output_dir (Path): 输出目录
+        dir_list (list[Path]): 要压缩的工具链列表
+        monitor (common.progress_monitor): 进度监视器，工作进程通过它的进度通道报告进度
+
+    Returns:
+        int: 各个工作进程中最大的峰值常驻内存(字节)
+    """
+
+    size_list = [_get_dir_size(dir) for dir in dir_list]
+    task_list = sorted(zip(size_list, _split_jobs(size_list, env.jobs), dir_list), key=lambda task: task[0], reverse=True)
+    free_jobs = env.jobs
+    peak_rss = 0
+    running_list: dict[concurrent.futures.Future[int], int] = {}
+    with concurrent.futures.ProcessPoolExecutor(
+        min(env.jobs, len(dir_list)),
+        monitor.context,
+        initializer=common.progress_tracker.set_queue,
+        initargs=(monitor.queue,),
+    ) as executor:
+        while task_list or running_list:
+            for task in [*task_list]:
+                _, jobs, dir = task
+                if jobs <= free_jobs:
+                    task_list.remove(task)
+                    free_jobs -= jobs
+                    future = executor.submit(_compress_worker, env, output_dir, jobs, str(dir.relative_to(env.prefix_dir)))
+                    running_list[future] = jobs
+            done_list, _ = concurrent.futures.wait(running_list, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done_list:
+                free_jobs += running_list.pop(future)
+                peak_rss = max(peak_rss, future.result())
+    return peak_rss
+
+
+def _compress_to_store(store: chunk_store, env: common.compress_environment, output_dir: Path, dir_list: list[Path]) -> None:
+    """将工具链存入块存储并生成配方
+
+    Args:
+        store (chunk_store): 块存储
+        env (common.compress_environment): 工具链压缩环境
+        output_dir (Path): 配方输出目录
+        dir_list (list[Path]): 要处理的工具链列表
+    """
+
+    total_size = stored_size = 0
+    for dir in dir_list or filter(lambda dir: common.toolchains_dir(dir), env.prefix_dir.iterdir()):
+        common.toolchains_print(common.toolchains_info(f"Storing {dir.name} into {store.root}."))
+        size, new_size = store.pack(env.prefix_dir, dir.name, output_dir, env.jobs)
+        total_size += size
+        stored_size += new_size
+    common.toolchains_print(
+        common.toolchains_success(f"Store toolchains successfully: {total_size >> 20} MiB of files, {stored_size >> 20} MiB of new chunks.")
+    )
+
+
+def _decompress_worker(
+    env: common.compress_environment,
+    output_dir: Path,
+    base: Path | None,
+    selector: common.member_filter | None,
+    component_list: list[str],
+    file: Path,
+) -> int:
     """执行解压缩操作
 
     Args:
         env (common.compress_environment): 工具链压缩环境
         output_dir (Path): 输出目录
-        mutex (common.optional_lock): 并行环境下的互斥锁
+        base (Path | None): 差分包的基础包或其所在目录，为None表示解压完整的压缩包
+        selector (common.member_filter | None): 成员过滤器，为None表示解压所有成员
+        component_list (list[str]): 从组件索引解压时要安装的组件，为空表示安装所有组件
         file (Path): 要解压的文件
+
+    Returns:
+        int: 工作进程的峰值常驻内存(字节)
+    """
+
+    path = str(file.relative_to(env.prefix_dir))
+    if common.package_component_index.is_index(file):
+        env.decompress_components(path, component_list, output_dir, False, selector)
+    else:
+        delta_base = _delta_base(file, base) if base else None
+        assert not base or delta_base, common.toolchains_error(f"The base package of {file.name} is not found beside {base}.")
+        env.decompress_path(path, output_dir, False, str(delta_base) if delta_base else None, selector)
+    return common.get_peak_rss()
+
+
+def _delta_base(file: Path, base: Path) -> Path | None:
+    """根据差分包头部记录的基础包文件名，在给定的基础包所在目录中查找差分包对应的基础包
+
+    Args:
+        file (Path): 差分包
+        base (Path): 命令行指定的基础包或其所在目录
+
+    Returns:
+        Path | None: 差分包对应的基础包，不存在时返回None
     """
 
-    env.decompress_path(str(file.relative_to(env.prefix_dir)), output_dir, False, mutex)
+    with file.open("rb") as delta:
+        header = common.zstd_delta_header.load(delta)
+    assert header, common.toolchains_error(f"{file.name} is not a delta package.")
+    base_file = (base if base.is_dir() else base.parent) / header.base_name
+    return base_file if base_file.is_file() else None
+
+
+def _select_component_index(index_list: list[Path], component_list: list[str]) -> list[Path]:
+    """选择包含所需组件的索引，每个通配符至少需要匹配一个索引中的组件
+
+    Args:
+        index_list (list[Path]): 组件索引列表
+        component_list (list[str]): 组件名的通配符列表
+
+    Returns:
+        list[Path]: 至少有一个组件被选中的索引
+    """
+
+    index_map = {file: common.package_component_index.load(file) for file in index_list}
+    for pattern in component_list:
+        assert any(index.select([pattern]) for index in index_map.values()), common.toolchains_error(
+            f"No component matches {pattern}, available components: "
+            f"{", ".join(sorted({component for index in index_map.values() for component in index.component_map}))}."
+        )
+    return [file for file, index in index_map.items() if index.select(component_list)]
 
 
 def decompress(config: compress_configure) -> None:
@@ -48,19 +263,222 @@ def decompress(config: compress_configure) -> None:
     """
 
     output_dir, file_list, env = config._output_dir, config._item_list, config.to_environment()
+    selector = config._member_filter or None
     common.mkdir(output_dir, False)
+    if store := config.to_chunk_store():
+        for file in file_list or [*filter(chunk_store.is_recipe, env.prefix_dir.iterdir())]:
+            common.toolchains_print(common.toolchains_info(f"Restoring {file.name} from {store.root}."))
+            store.unpack(file, output_dir)
+        common.toolchains_print(common.toolchains_success("Restore toolchains successfully."))
+        return
     with common.chdir_guard(output_dir):
-        file_list = file_list or [*filter(lambda file: common.toolchains_package(file), env.prefix_dir.iterdir())]
+        if (base := config._base) and not file_list:
+            # 每个差分包使用头部记录的基础包，跳过找不到基础包的差分包
+            file_list = [
+                file for file in env.prefix_dir.iterdir() if file.name.endswith(common.zstd_delta_header.suffix) and _delta_base(file, base)
+            ]
+        elif config.component_list:
+            index_list = file_list or [*filter(common.package_component_index.is_index, env.prefix_dir.iterdir())]
+            file_list = _select_component_index(index_list, config.component_list)
+        elif not file_list:
+            # 组件包通过其索引安装，不单独解压
+            index_list = [*filter(common.package_component_index.is_index, env.prefix_dir.iterdir())]
+            component_set = {
+                file for index in index_list for file in common.package_component_index.load(index).get_package_list(env.prefix_dir)
+            }
+            file_list = index_list + [
+                file for file in env.prefix_dir.iterdir() if common.toolchains_package(file) and file not in component_set
+            ]
+
+        # 根据内存预算决定同时解压的压缩包数和每个压缩包的解压线程数
+        processes, threads = env.plan_decompress_memory([str(file.relative_to(env.prefix_dir)) for file in file_list])
+        worker_env = copy.copy(env)
+        worker_env.jobs = threads
+        peak_rss = 0
+        # 工作进程通过进度通道向主进程报告进度，不再需要Manager服务进程提供的锁
+        with common.progress_monitor() as monitor:
+            if processes > 1:
+                with monitor.context.Pool(processes, common.progress_tracker.set_queue, (monitor.queue,)) as pool:
+                    worker = functools.partial(_decompress_worker, worker_env, output_dir, config._base, selector, config.component_list)
+                    peak_rss = max(pool.map(worker, file_list))
+            else:
+                for file in file_list:
+                    _decompress_worker(worker_env, output_dir, config._base, selector, config.component_list, file)
+
+    _report_peak_rss(env, peak_rss)
+    common.toolchains_print(common.toolchains_success("Decompress toolchains successfully."))
 
-        if env.jobs > 1:
-            with multiprocessing.Manager() as manager, multiprocessing.Pool(config.jobs) as pool:
-                mutex = manager.Lock()
-                pool.map(functools.partial(_decompress_worker, env, output_dir, mutex), file_list)
+
+def delta(config: compress_configure) -> None:
+    """生成从旧版本工具链压缩包到新版本工具链压缩包的差分包
+
+    Args:
+        config (compress_configure): 工具链压缩环境，item_list为[旧压缩包, 新压缩包]
+    """
+
+    output_dir, (base, file), env = config._output_dir, config._item_list, config.to_environment()
+    common.mkdir(output_dir, False)
+    env.make_delta_path(str(base), str(file), output_dir, False)
+    common.toolchains_print(common.toolchains_success("Make delta package successfully."))
+
+
+def verify(config: compress_configure) -> None:
+    """根据工具链清单检查已安装的工具链是否完好
+
+    Args:
+        config (compress_configure): 工具链压缩环境
+    """
+
+    dir_list, env = config._item_list, config.to_environment()
+    failed_list: list[str] = []
+    for dir in dir_list or filter(lambda dir: common.toolchains_dir(dir), env.prefix_dir.iterdir()):
+        manifest_file = dir / common.package_manifest.file_name
+        if not manifest_file.exists():
+            common.toolchains_print(common.toolchains_warning(f"{dir.name} has no manifest, skip it."))
+            continue
+        error_list = common.package_manifest.load(manifest_file).verify(env.prefix_dir, env.jobs)
+        if error_list:
+            failed_list.append(dir.name)
+            common.toolchains_print(common.toolchains_error(f"{dir.name} does not match its manifest:"))
+            for error in error_list:
+                common.toolchains_print(f"    {error}")
         else:
-            for file in file_list:
-                _decompress_worker(env, output_dir, None, file)
+            common.toolchains_print(common.toolchains_info(f"{dir.name} is intact."))
 
-    common.toolchains_print(common.toolchains_success("Decompress toolchains successfully."))
+    if failed_list:
+        raise RuntimeError(common.toolchains_error(f"Verify toolchains failed: {", ".join(failed_list)}."))
+    common.toolchains_print(common.toolchains_success("Verify toolchains successfully."))
+
+
+def _benchmark_codec(env: common.compress_environment, file_list: list[Path]) -> list[str]:
+    """使用压缩包开头的tar数据比较各压缩格式的压缩率和单线程压缩、解压速度
+
+    Args:
+        env (common.compress_environment): 工具链压缩环境
+        file_list (list[Path]): 压缩包列表
+
+    Returns:
+        list[str]: 表格的各行
+    """
+
+    sample_size = 32 << 20
+    level_map: dict[common.codec_t, list[int]] = {"zstd": [1, 3, 9, 19], "lz4": [0, 9], "none": [0]}
+    width = max((len(file.name) for file in file_list), default=0)
+    line_list = [f"{"Package":<{width}}  {"Codec":<5}  {"Level":>5}  {"Ratio":>6}  {"Compress(MB/s)":>14}  {"Decompress(MB/s)":>16}"]
+    for file in file_list:
+        data = env._read_tar_data(str(file.relative_to(env.prefix_dir)), sample_size)
+        for codec, level_list in level_map.items():
+            if not common.package_codec.is_available(codec):
+                continue
+            for level in level_list:
+                start = time.perf_counter()
+                compressed = common.package_codec.compress(codec, level, data)
+                compress_time = time.perf_counter() - start
+                start = time.perf_counter()
+                common.package_codec.decompress(codec, compressed)
+                decompress_time = time.perf_counter() - start
+                line_list.append(
+                    f"{file.name:<{width}}  {codec:<5}  {level:>5}  {len(data) / max(len(compressed), 1):>6.2f}  "
+                    f"{len(data) / 1e6 / max(compress_time, 1e-9):>14.1f}  {len(data) / 1e6 / max(decompress_time, 1e-9):>16.1f}"
+                )
+    return line_list
+
+
+def benchmark(config: compress_configure) -> None:
+    """比较libarchive单线程解包和线程池解包的用时，每种方式重复解压缩多次取最短用时，并比较各压缩格式的压缩率和速度
+
+    Args:
+        config (compress_configure): 工具链压缩环境
+    """
+
+    file_list, env = config._item_list, config.to_environment()
+    file_list = file_list or [*filter(lambda file: common.toolchains_package(file), env.prefix_dir.iterdir())]
+    common.mkdir(config._output_dir, False)
+    repeat = 3
+    width = max((len(file.name) for file in file_list), default=0)
+    line_list = [f"{"Package":<{width}}  {"Backend":<10}  {"Entries":>8}  {"Time(s)":>8}  {"Entries/s":>10}  {"Speedup":>8}"]
+    for file in file_list:
+        base_time = 0.0
+        for backend, threaded_extract in (("libarchive", False), ("threaded", True)):
+            env.threaded_extract = threaded_extract
+            elapsed = float("inf")
+            for _ in range(repeat):
+                with tempfile.TemporaryDirectory(dir=config._output_dir) as output_dir:
+                    start = time.perf_counter()
+                    env.decompress_path(str(file.relative_to(env.prefix_dir)), Path(output_dir), dry_run=False)
+                    elapsed = min(elapsed, time.perf_counter() - start)
+                    entry_count = sum(1 for root in Path(output_dir).iterdir() for _ in common.walk_path(str(root)))
+            base_time = base_time or elapsed
+            line_list.append(
+                f"{file.name:<{width}}  {backend:<10}  {entry_count:>8}  {elapsed:>8.2f}  "
+                f"{entry_count / max(elapsed, 1e-9):>10.0f}  {base_time / max(elapsed, 1e-9):>8.2f}"
+            )
+    common.toolchains_print(common.toolchains_note("Benchmark:\n" + "\n".join(line_list)))
+    common.toolchains_print(common.toolchains_note("Codec benchmark:\n" + "\n".join(_benchmark_codec(env, file_list))))
+
+
+def _format_analyze_report(report: dict[str, typing.Any]) -> str:
+    """将分析报告格式化为便于阅读的表格
+
+    Args:
+        report (dict[str, typing.Any]): 分析报告
+
+    Returns:
+        str: 格式化后的表格
+    """
+
+    def format_table(title: str, row_map: dict[str, dict[str, int]]) -> list[str]:
+        width = max((len(key) for key in (title, *row_map)))
+        line_list = [f"{title:<{width}}  {"Files":>8}  {"Size(MiB)":>10}  {"Compressed(MiB)":>16}"]
+        for key, counter in row_map.items():
+            line_list.append(
+                f"{key:<{width}}  {counter["files"]:>8}  {counter["size"] / (1 << 20):>10.2f}  {counter["compressed"] / (1 << 20):>16.2f}"
+            )
+        return line_list
+
+    total = report["total"]
+    line_list = [
+        f"{report["name"]}: {total["files"]} files, {total["size"] / (1 << 20):.2f} MiB, "
+        f"{total["compressed"] / (1 << 20):.2f} MiB compressed",
+        *format_table("Directory", report["by_directory"]),
+        *format_table("Type", report["by_type"]),
+        *format_table("File", {f"{item["path"]} ({item["type"]})": {**item, "files": 1} for item in report["top_files"]}),
+    ]
+    return "\n".join(line_list)
+
+
+def analyze(config: compress_configure, top_count: int = 20, json_file: str | None = None) -> None:
+    """分析已安装的工具链或压缩包中各部分的大小
+
+    Args:
+        config (compress_configure): 工具链压缩环境
+        top_count (int, optional): 报告中列出的最大文件数. 默认为20.
+        json_file (str | None, optional): JSON格式分析报告的输出文件，为"-"时输出到标准输出. 默认不输出JSON.
+    """
+
+    item_list, env = config._item_list, config.to_environment()
+    item_list = item_list or [
+        *filter(lambda item: common.toolchains_dir(item) or common.toolchains_package(item), env.prefix_dir.iterdir())
+    ]
+    report_list: list[dict[str, typing.Any]] = []
+    # JSON输出到标准输出时，人类可读的报告改为输出到标准错误，使标准输出可以直接被解析
+    with contextlib.redirect_stdout(sys.stderr if json_file == "-" else sys.stdout):
+        for item in item_list:
+            if common.toolchains_dir(item):
+                report = package_analyzer.analyze_dir(item, env.long_distance_match, top_count)
+            else:
+                assert common.toolchains_package(item), f'Path "{item}" is neither a toolchain nor a toolchain package.'
+                report = package_analyzer.analyze_package(env, item, top_count)
+            report["source"] = str(item)
+            report_list.append(report)
+            common.toolchains_print(common.toolchains_note(_format_analyze_report(report)))
+
+        if json_file and json_file != "-":
+            with common.resolve_path(json_file, Path.cwd()).open("w") as file:
+                json.dump(report_list, file, indent=4)
+        common.toolchains_print(common.toolchains_success("Analyze toolchains successfully."))
+    if json_file == "-":
+        print(json.dumps(report_list, indent=4))
 
 
 def disable_wine_binfmt() -> None:
@@ -75,7 +493,17 @@ def enable_wine_binfmt() -> None:
     common.binfmt.enable("DOSWin")
 
 
-__all__ = ["compress_configure", "compress", "decompress", "disable_wine_binfmt", "enable_wine_binfmt"]
+__all__ = [
+    "compress_configure",
+    "compress",
+    "decompress",
+    "delta",
+    "verify",
+    "benchmark",
+    "analyze",
+    "disable_wine_binfmt",
+    "enable_wine_binfmt",
+]
 
 
 def main() -> int:
@@ -90,6 +518,18 @@ def main() -> int:
     decompress_parser = subparsers.add_parser(
         "decompress", help="Decompress packed toolchains under the prefix directory.", formatter_class=common.arg_formatter
     )
+    delta_parser = subparsers.add_parser(
+        "delta", help="Make a delta package between two packed toolchains.", formatter_class=common.arg_formatter
+    )
+    verify_parser = subparsers.add_parser(
+        "verify", help="Verify installed toolchains against their manifests.", formatter_class=common.arg_formatter
+    )
+    benchmark_parser = subparsers.add_parser(
+        "benchmark", help="Compare the decompress backends and codecs on packed toolchains.", formatter_class=common.arg_formatter
+    )
+    analyze_parser = subparsers.add_parser(
+        "analyze", help="Report what makes installed or packed toolchains big.", formatter_class=common.arg_formatter
+    )
     wine_binfmt_parser = subparsers.add_parser(
         "wine-binfmt",
         help="Set Wine's binfmt_misc support.",
@@ -116,6 +556,74 @@ def main() -> int:
         help="Files of packed toolchains to decompress. This is a path relative to the prefix directory.",
     )
     common.register_completer(action, common.item_with_prefix_completer("prefix_dir", common.toolchains_package))
+    action = decompress_parser.add_argument(
+        "--base",
+        type=str,
+        help="The old packed toolchain or the directory holding old packed toolchains to apply delta packages to. "
+        "Each delta package uses the old packed toolchain named in its header from that directory. "
+        "This is a path relative to the prefix directory.",
+    )
+    common.register_completer(
+        action, common.item_with_prefix_completer("prefix_dir", lambda path: path.is_dir() or common.toolchains_package(path))
+    )
+    decompress_parser.add_argument(
+        "--include",
+        action="extend",
+        nargs="+",
+        help="Only extract members matching these glob patterns. Patterns match paths relative to the toolchain root, "
+        "and a pattern matching a directory also matches everything under it.",
+    )
+    decompress_parser.add_argument(
+        "--exclude",
+        action="extend",
+        nargs="+",
+        help="Skip members matching these glob patterns. Seekable packages also skip decompressing frames holding only skipped members.",
+    )
+    compress_configure.add_argument(delta_parser)
+    action = delta_parser.add_argument(
+        "item_list",
+        nargs=2,
+        metavar=("OLD", "NEW"),
+        help="The old and new packed toolchains. This is a path relative to the prefix directory.",
+    )
+    common.register_completer(action, common.item_with_prefix_completer("prefix_dir", common.toolchains_package))
+    compress_configure.add_argument(verify_parser)
+    action = verify_parser.add_argument(
+        "--dir",
+        "-d",
+        dest="item_list",
+        action="extend",
+        nargs="*",
+        help="Directories of toolchains to verify. This is a path relative to the prefix directory.",
+    )
+    common.register_completer(action, common.item_with_prefix_completer("prefix_dir", common.toolchains_dir))
+    compress_configure.add_argument(benchmark_parser)
+    action = benchmark_parser.add_argument(
+        "--file",
+        "-f",
+        dest="item_list",
+        action="extend",
+        nargs="*",
+        help="Files of packed toolchains to benchmark. This is a path relative to the prefix directory.",
+    )
+    common.register_completer(action, common.item_with_prefix_completer("prefix_dir", common.toolchains_package))
+    compress_configure.add_argument(analyze_parser)
+    action = analyze_parser.add_argument(
+        "item_list",
+        nargs="*",
+        metavar="PACKAGE|DIR",
+        help="Installed or packed toolchains to analyze. This is a path relative to the prefix directory.",
+    )
+    common.register_completer(
+        action, common.item_with_prefix_completer("prefix_dir", lambda item: common.toolchains_dir(item) or common.toolchains_package(item))
+    )
+    analyze_parser.add_argument("--top", type=int, help="The number of largest files to report.", default=20)
+    analyze_parser.add_argument(
+        "--json",
+        type=str,
+        help="Write the report in JSON to this file, or to stdout if it is -, in which case other output goes to stderr. "
+        "Useful to track package size in CI.",
+    )
     wine_binfmt_parser.add_argument(
         "action",
         choices=["enable", "disable"],
@@ -128,9 +636,31 @@ def main() -> int:
     def do_main() -> None:
         match (args.command):
             case "compress":
-                compress(compress_configure.parse_args(args))
+                current_config = compress_configure.parse_args(args)
+                current_config.check(True)
+                compress(current_config)
             case "decompress":
-                decompress(compress_configure.parse_args(args))
+                current_config = compress_configure.parse_args(args)
+                current_config.check(False)
+                decompress(current_config)
+            case "delta":
+                current_config = compress_configure.parse_args(args)
+                current_config.check(False)
+                delta(current_config)
+            case "verify":
+                current_config = compress_configure.parse_args(args)
+                current_config.check(True)
+                verify(current_config)
+            case "benchmark":
+                current_config = compress_configure.parse_args(args)
+                current_config.check(False)
+                benchmark(current_config)
+            case "analyze":
+                # 状态计数同样不能混入标准输出中的JSON
+                common.status_counter.set_quiet(args.json == "-")
+                current_config = compress_configure.parse_args(args)
+                current_config.check(None)
+                analyze(current_config, args.top, args.json)
             case "wine-binfmt":
                 common.status_counter.set_quiet(True)
                 if args.action == "enable":
@@ -140,4 +670,7 @@ def main() -> int:
             case _:
                 pass
 
-    return common.toolchains_main(do_main, args.command in ("compress", "decompress"))
+    need_timer = args.command in ("compress", "decompress", "delta", "verify", "benchmark") or (
+        args.command == "analyze" and args.json != "-"
+    )
+    return common.toolchains_main(do_main, need_timer)
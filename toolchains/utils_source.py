@@ -1,20 +1,94 @@
+import functools
+import hashlib
+import json
+import multiprocessing
+import os
+import stat
 import typing
-from argparse import ArgumentParser
+from argparse import ArgumentParser, BooleanOptionalAction
+from collections.abc import Generator
 from pathlib import Path
 
+import libarchive  # type: ignore
+import zstandard
+
 from . import common
 
 
 class compress_configure(common.basic_compress_configure):
+    frame_size: int
+    compress_time_limit: float | None
+    min_decompress_speed: float | None
+    hardlink: bool
+    memory_limit: int | None
+    threaded_extract: bool
+    deterministic: bool
+    codec: common.codec_t
+    component_list: list[str]
     _item_list: list[Path]
     _output_dir: Path
+    _dedup_store: Path | None
+    _base: Path | None
+    _member_filter: common.member_filter
 
     def __init__(
-        self, item_list: list[str] | None = None, output_dir: str | None = None, base_path: Path = Path.cwd(), **kwargs: typing.Any
+        self,
+        item_list: list[str] | None = None,
+        output_dir: str | None = None,
+        frame_size: int = 0,
+        compress_time_limit: float | None = None,
+        min_decompress_speed: float | None = None,
+        hardlink: bool = True,
+        memory_limit: int | None = None,
+        threaded_extract: bool | None = None,
+        deterministic: bool = False,
+        codec: common.codec_t = "zstd",
+        component_list: list[str] | None = None,
+        dedup_store: str | None = None,
+        base: str | None = None,
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+        base_path: Path = Path.cwd(),
+        **kwargs: typing.Any,
     ) -> None:
+        """初始化压缩配置
+
+        Args:
+            item_list (list[str] | None, optional): 要处理的工具链或压缩包列表，是相对于prefix的路径. 默认处理prefix下所有项目.
+            output_dir (str | None, optional): 输出目录. 默认为prefix.
+            frame_size (int, optional): 可寻址格式中每帧未压缩数据的目标大小(MiB)，为0表示使用单帧格式. 默认为0.
+            compress_time_limit (float | None, optional): 压缩等级为auto时，预计压缩用时的上限(秒). 默认不限制.
+            min_decompress_speed (float | None, optional): 压缩等级为auto时，单线程解压速度的下限(MB/s). 默认不限制.
+            hardlink (bool, optional): 压缩时是否将工具链中重复的文件替换为硬链接，并在压缩包中写入硬链接成员. 默认为是.
+            memory_limit (int | None, optional): 压缩和解压缩的内存预算(MiB)，据此选择线程数、窗口大小和同时处理的压缩包数. 默认不限制.
+            threaded_extract (bool | None, optional): 解压缩时是否使用线程池创建和写入文件. 默认在可用的CPU多于1个时使用.
+            deterministic (bool, optional): 是否生成可复现的压缩包. 默认为否.
+            codec (common.codec_t, optional): 压缩包的压缩格式，解压缩时根据魔数自动识别. 默认为zstd.
+            component_list (list[str] | None, optional): 从组件索引解压时只安装匹配这些通配符的组件. 默认安装所有组件.
+            dedup_store (str | None, optional): 块存储目录，设置后压缩生成配方而非压缩包，解压时从块存储中还原. 默认不使用块存储.
+            base (str | None, optional): 解压差分包时使用的基础包或其所在目录，是相对于prefix的路径. 默认解压完整的压缩包.
+            include (list[str] | None, optional): 解压时只解压匹配这些通配符的成员，通配符匹配相对于工具链根目录的路径. 默认解压所有成员.
+            exclude (list[str] | None, optional): 解压时跳过匹配这些通配符的成员. 默认不跳过任何成员.
+            base_path (Path, optional): 将相对路径转化为绝对路径时使用的基路径. 默认为当前工作目录.
+        """
+
         super().__init__(base_path=base_path, **kwargs)
+        self.frame_size = frame_size
+        self.compress_time_limit = compress_time_limit
+        self.min_decompress_speed = min_decompress_speed
+        self.hardlink = hardlink
+        self.memory_limit = memory_limit
+        # 单个CPU上写入线程与解析线程争抢GIL，反而比libarchive单线程解包更慢，sched_getaffinity只在Linux上可用
+        cpu_count = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+        self.threaded_extract = cpu_count > 1 if threaded_extract is None else threaded_extract
+        self.deterministic = deterministic
+        self.codec = codec
+        self.component_list = component_list or []
         self._item_list = [self.prefix_dir / item for item in (item_list or [])]
         self._output_dir = common.resolve_path(output_dir or self.prefix_dir, base_path)
+        self._dedup_store = common.resolve_path(dedup_store, base_path) if dedup_store else None
+        self._base = self.prefix_dir / base if base else None
+        self._member_filter = common.member_filter(include, exclude)
 
     @classmethod
     def add_argument(cls, parser: ArgumentParser) -> None:
@@ -29,16 +103,119 @@ class compress_configure(common.basic_compress_configure):
             help="The directory to store the operate result.",
             default=default_config._output_dir,
         )
+        parser.add_argument(
+            "--frame-size",
+            type=int,
+            help="Split the package into independent zstd frames of about this many MiB of uncompressed data, "
+            "aligned to tar member boundaries, and append a seek table so that it can be decompressed in parallel. "
+            "Use 0 to produce a single-frame package.",
+            default=default_config.frame_size,
+        )
+        parser.add_argument(
+            "--compress-time-limit",
+            type=float,
+            help="With --compress auto, select the best ratio whose estimated compress time is within this many seconds.",
+            default=default_config.compress_time_limit,
+        )
+        parser.add_argument(
+            "--min-decompress-speed",
+            type=float,
+            help="With --compress auto, select the best ratio whose single-threaded decompress speed is at least this many MB/s.",
+            default=default_config.min_decompress_speed,
+        )
+        parser.add_argument(
+            "--hardlink",
+            action=BooleanOptionalAction,
+            help="Replace byte-identical files in toolchains with hardlinks before packing, and pack them as hardlink entries.",
+            default=default_config.hardlink,
+        )
+        parser.add_argument(
+            "--memory-limit",
+            type=int,
+            help="The memory budget in MiB. Derive compress threads, window size and the number of packages "
+            "processed in parallel from it, and report the peak RSS reached.",
+            default=default_config.memory_limit,
+        )
+        parser.add_argument(
+            "--threaded-extract",
+            action=BooleanOptionalAction,
+            help="Parse the tar stream on one thread and create and write files on a thread pool when decompressing. "
+            "Otherwise extract with libarchive on a single thread.",
+            default=default_config.threaded_extract,
+        )
+        parser.add_argument(
+            "--deterministic",
+            action=BooleanOptionalAction,
+            help="Produce reproducible packages: normalize mtimes to SOURCE_DATE_EPOCH (0 if unset) and uid/gid to 0, "
+            "and drop atime, ctime, xattrs and ACLs, so that identical trees give byte-identical packages. "
+            "Members are always packed in sorted order. The memory limit only reduces threads and never shrinks the window in this mode.",
+            default=default_config.deterministic,
+        )
+        parser.add_argument(
+            "--codec",
+            type=str,
+            choices=common.package_codec.codec_list,
+            help="The codec used to compress packages. Seekable packages require zstd, --compress auto only tunes zstd, "
+            "and lz4 requires the optional lz4 module. Decompress detects the codec by magic bytes.",
+            default=default_config.codec,
+        )
+        parser.add_argument(
+            "--component",
+            dest="component_list",
+            type=str,
+            nargs="+",
+            action="extend",
+            help="When decompressing from a NAME.components.json index, install only the components matching these glob patterns, "
+            "e.g. core 'target-x86_64-*'. Decompress uses component indexes instead of the component packages they list. "
+            "Components already installed are kept, so components can be added in later runs.",
+            default=default_config.component_list,
+        )
+        parser.add_argument(
+            "--dedup-store",
+            type=str,
+            help="Store toolchains in a content-defined chunk store in this directory, so that chunks shared between toolchains "
+            "are kept only once. Compress writes a small recipe for each toolchain instead of a package, "
+            "and decompress rebuilds toolchains from recipes and the store.",
+            default=default_config._dedup_store,
+        )
+
+    def check(self, need_dir: bool | None = True) -> None:
+        """检查压缩环境配置是否合法
 
-    def check(self, need_dir: bool = True) -> None:
-        """检查压缩环境配置是否合法"""
+        Args:
+            need_dir (bool | None, optional): 条目是否是工具链目录，为否时条目是压缩包，为None时条目可以是目录或压缩包. 默认为目录.
+        """
 
         super().check()
+        if self._base:
+            assert self._base.is_dir() or common.toolchains_package(self._base), f'Path "{self._base}" is not a package or a directory.'
+        assert self.frame_size >= 0, common.toolchains_error(f"Invalid frame size: {self.frame_size}.")
+        assert self.compress_time_limit is None or self.compress_time_limit > 0, common.toolchains_error(
+            f"Invalid compress time limit: {self.compress_time_limit}."
+        )
+        assert self.min_decompress_speed is None or self.min_decompress_speed > 0, common.toolchains_error(
+            f"Invalid decompress speed: {self.min_decompress_speed}."
+        )
+        assert self.memory_limit is None or self.memory_limit > 0, common.toolchains_error(f"Invalid memory limit: {self.memory_limit}.")
+        assert common.package_codec.is_available(self.codec), common.toolchains_error(
+            f"Codec {self.codec} is not available, please install the lz4 module."
+        )
+        assert self.codec == "zstd" or not self.frame_size, common.toolchains_error(f"Seekable packages require the zstd codec.")
         for item_path in self._item_list:
-            if need_dir:
+            if need_dir is None and common.toolchains_dir(item_path):
+                continue
+            elif need_dir:
                 assert common.toolchains_dir(item_path), f'Path "{item_path}" is not a directory.'
+            elif self._base:
+                assert item_path.name.endswith(common.zstd_delta_header.suffix), f'Path "{item_path}" is not a delta package.'
+            elif self._dedup_store:
+                assert chunk_store.is_recipe(item_path), f'Path "{item_path}" is not a recipe of chunk store.'
+            elif self.component_list:
+                assert common.package_component_index.is_index(item_path), f'Path "{item_path}" is not a component index.'
+            elif common.package_component_index.is_index(item_path):
+                continue
             else:
-                assert common.toolchains_package(item_path), f'Path "{item_path}" is not a tar file compressed by zstd.'
+                assert common.toolchains_package(item_path), f'Path "{item_path}" is not a toolchain package.'
 
     def to_environment(self) -> common.compress_environment:
         """将配置信息转化为压缩环境
@@ -47,7 +224,569 @@ class compress_configure(common.basic_compress_configure):
             common.compress_environment: 工具链压缩环境
         """
 
-        return common.compress_environment(self.jobs, self.prefix_dir, self.compress_level, self.long_distance_match)
+        return common.compress_environment(
+            self.jobs,
+            self.prefix_dir,
+            self.compress_level,
+            self.long_distance_match,
+            self.frame_size << 20,
+            compress_time_limit=self.compress_time_limit,
+            min_decompress_speed=self.min_decompress_speed,
+            hardlink=self.hardlink,
+            memory_limit=self.memory_limit << 20 if self.memory_limit else None,
+            threaded_extract=self.threaded_extract,
+            deterministic=self.deterministic,
+            codec=self.codec,
+            debug_info=self.debug_info,
+            split_components=self.split_components,
+        )
+
+    def to_chunk_store(self) -> "chunk_store | None":
+        """根据配置打开块存储
+
+        Returns:
+            chunk_store | None: 块存储，未设置块存储目录时为None
+        """
+
+        if not self._dedup_store:
+            return None
+        compress_level = common.compress_environment.default_compress_level if self.compress_level == "auto" else self.compress_level
+        return chunk_store(self._dedup_store, compress_level)
+
+
+@functools.cache
+def _get_chunk_compressor(compress_level: int) -> zstandard.ZstdCompressor:
+    """获取进程内共享的块压缩器
+
+    Args:
+        compress_level (int): zstd压缩等级
+
+    Returns:
+        zstandard.ZstdCompressor: 块压缩器
+    """
+
+    return zstandard.ZstdCompressor(level=compress_level)
+
+
+class chunk_store:
+    """内容定义分块(CDC)存储，将工具链中的文件切分为块，相同的块只保存一份
+
+    块边界由局部内容决定：将每个字节映射为2位的类别，在类别序列中出现固定的锚点序列处切分，
+    因此插入或删除数据只会影响附近的块。映射和查找均由bytes.translate和bytes.find完成，无需逐字节的Python循环。
+
+    Attributes:
+        recipe_suffix : 配方文件的后缀
+        min_chunk_size: 最小块大小
+        max_chunk_size: 最大块大小
+        read_size     : 流式切分文件时每次读取的数据量
+    """
+
+    recipe_suffix: typing.Final[str] = ".recipe.zst"
+    min_chunk_size: typing.Final[int] = 8 << 10
+    max_chunk_size: typing.Final[int] = 256 << 10
+    read_size: typing.Final[int] = 1 << 20
+    # 8个2位类别组成的锚点，随机数据中平均每64KiB出现一次
+    _anchor: typing.Final[bytes] = b"20313021"
+    _class_table: typing.Final[bytes] = bytes(b"0123"[hashlib.blake2b(bytes([i]), digest_size=1).digest()[0] & 3] for i in range(256))
+
+    root: Path  # 存储根目录
+    compress_level: int  # 块的zstd压缩等级
+
+    def __init__(self, root: Path, compress_level: int = 19) -> None:
+        """打开一个块存储
+
+        Args:
+            root (Path): 存储根目录
+            compress_level (int, optional): 块的zstd压缩等级. 默认为19.
+        """
+
+        self.root = root
+        self.compress_level = compress_level
+
+    @classmethod
+    def split(cls, data: bytes) -> list[memoryview]:
+        """按内容将数据切分为块
+
+        Args:
+            data (bytes): 要切分的数据
+
+        Returns:
+            list[memoryview]: 切分后的块
+        """
+
+        class_data = data.translate(cls._class_table)
+        view = memoryview(data)
+        result: list[memoryview] = []
+        start, size = 0, len(data)
+        while start < size:
+            search_begin = start + cls.min_chunk_size
+            search_end = min(start + cls.max_chunk_size, size)
+            if search_begin >= size:
+                end = size
+            elif (position := class_data.find(cls._anchor, search_begin, search_end)) != -1:
+                end = position + len(cls._anchor)
+            else:
+                end = search_end
+            result.append(view[start:end])
+            start = end
+        return result
+
+    @classmethod
+    def split_file(cls, file: typing.BinaryIO) -> Generator[memoryview, None, None]:
+        """流式读取文件并按内容切分为块，结果与对整个文件内容调用split相同
+
+        块边界只取决于块起点之后max_chunk_size以内的数据，因此只需保留不足max_chunk_size的尾部数据留待下次切分.
+
+        Args:
+            file (typing.BinaryIO): 文件
+
+        Yields:
+            Generator[memoryview, None, None]: 切分后的块
+        """
+
+        rest = b""
+        while True:
+            block = file.read(cls.read_size)
+            data = rest + block
+            offset = 0
+            for chunk in cls.split(data):
+                if block and offset + cls.max_chunk_size > len(data):
+                    break
+                yield chunk
+                offset += len(chunk)
+            if not block:
+                return
+            rest = data[offset:]
+
+    @staticmethod
+    def get_digest(data: bytes | memoryview) -> str:
+        """计算数据的摘要
+
+        Args:
+            data (bytes | memoryview): 数据
+
+        Returns:
+            str: 十六进制摘要
+        """
+
+        return hashlib.blake2b(data, digest_size=32).hexdigest()
+
+    def _get_path(self, kind: str, digest: str) -> Path:
+        return self.root / kind / digest[:2] / digest
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes) -> None:
+        """原子地写入文件，多个进程同时写入同一个块时不会产生损坏的文件
+
+        Args:
+            path (Path): 文件路径
+            data (bytes): 文件内容
+        """
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def put_chunk(self, data: bytes | memoryview) -> tuple[str, int]:
+        """保存一个块
+
+        Args:
+            data (bytes | memoryview): 块内容
+
+        Returns:
+            tuple[str, int]: 块摘要和新写入存储的字节数，块已存在时为0
+        """
+
+        digest = self.get_digest(data)
+        path = self._get_path("chunks", digest)
+        if path.exists():
+            return digest, 0
+        compressed = _get_chunk_compressor(self.compress_level).compress(data)
+        self._atomic_write(path, compressed)
+        return digest, len(compressed)
+
+    def get_chunk(self, digest: str) -> bytes:
+        """读取一个块
+
+        Args:
+            digest (str): 块摘要
+
+        Returns:
+            bytes: 块内容
+        """
+
+        path = self._get_path("chunks", digest)
+        try:
+            return zstandard.ZstdDecompressor().decompress(path.read_bytes())
+        except FileNotFoundError:
+            raise RuntimeError(common.toolchains_error(f"Chunk {digest} is missing from store {self.root}."))
+
+    def put_file(self, path: Path) -> tuple[list[str], int]:
+        """将文件切分为块并保存，内容相同的文件直接复用已有的块列表
+
+        Args:
+            path (Path): 文件路径
+
+        Returns:
+            tuple[list[str], int]: 块摘要列表和新写入存储的字节数
+        """
+
+        # 流式读取文件，不将整个文件读入内存
+        with path.open("rb") as file:
+            file_digest = hashlib.file_digest(file, lambda: hashlib.blake2b(digest_size=32)).hexdigest()
+            file_index = self._get_path("files", file_digest)
+            if file_index.exists():
+                return file_index.read_text().split(), 0
+            chunk_list: list[str] = []
+            stored_size = 0
+            file.seek(0)
+            for chunk in self.split_file(file):
+                digest, size = self.put_chunk(chunk)
+                chunk_list.append(digest)
+                stored_size += size
+        self._atomic_write(file_index, "\n".join(chunk_list).encode())
+        return chunk_list, stored_size
+
+    @classmethod
+    def is_recipe(cls, file: Path) -> bool:
+        """判断给定文件是否是一个工具链配方
+
+        Args:
+            file (Path): 文件路径
+
+        Returns:
+            bool: 是否是配方
+        """
+
+        file = file.resolve()
+        return file.is_file() and file.name.endswith(cls.recipe_suffix) and any(name in file.name for name in ("gcc", "clang", "sysroot"))
+
+    def pack(self, prefix_dir: Path, name: str, output_dir: Path, jobs: int) -> tuple[int, int]:
+        """将工具链存入块存储，并在output_dir下生成配方文件
+
+        Args:
+            prefix_dir (Path): 工具链所在目录
+            name (str): 工具链名称
+            output_dir (Path): 配方文件输出目录
+            jobs (int): 并行处理文件的进程数
+
+        Returns:
+            tuple[int, int]: 工具链中文件的总大小和新写入存储的字节数
+        """
+
+        entry_list: list[dict[str, typing.Any]] = []
+        file_list: list[Path] = []
+        for item in common.walk_path(str(prefix_dir / name)):
+            path = Path(item)
+            item_stat = path.lstat()
+            entry: dict[str, typing.Any] = {
+                "path": str(path.relative_to(prefix_dir)),
+                "mode": item_stat.st_mode,
+                "mtime": item_stat.st_mtime,
+            }
+            if path.is_symlink():
+                entry["target"] = os.readlink(path)
+            elif path.is_file():
+                entry["size"] = item_stat.st_size
+                file_list.append(path)
+            elif stat.S_ISCHR(item_stat.st_mode) or stat.S_ISBLK(item_stat.st_mode):
+                entry["rdev"] = item_stat.st_rdev
+            entry_list.append(entry)
+
+        worker = functools.partial(_put_file_worker, self)
+        if jobs > 1:
+            with multiprocessing.Pool(jobs) as pool:
+                result_list = pool.map(worker, file_list, chunksize=16)
+        else:
+            result_list = [*map(worker, file_list)]
+        chunk_map = dict(zip(file_list, result_list))
+
+        total_size = stored_size = 0
+        for entry in entry_list:
+            if "size" in entry:
+                entry["chunks"], size = chunk_map[prefix_dir / entry["path"]]
+                total_size += entry["size"]
+                stored_size += size
+        recipe = json.dumps({"version": 1, "name": name, "entries": entry_list}).encode()
+        (output_dir / f"{name}{self.recipe_suffix}").write_bytes(zstandard.ZstdCompressor(level=self.compress_level).compress(recipe))
+        return total_size, stored_size
+
+    @staticmethod
+    def _check_path(name: str, path: str, symlink_set: set[str]) -> str:
+        """检查配方中的路径是否会逃逸出工具链目录
+
+        Args:
+            name (str): 工具链名称
+            path (str): 配方中的路径
+            symlink_set (set[str]): 已还原的软链接
+
+        Returns:
+            str: 检查后的路径
+        """
+
+        part_list = path.split("/")
+        if os.path.isabs(path) or ".." in part_list or part_list[0] != name:
+            raise RuntimeError(common.toolchains_error(f"Refuse to restore {path} outside {name}."))
+        if any("/".join(part_list[:i]) in symlink_set for i in range(1, len(part_list))):
+            raise RuntimeError(common.toolchains_error(f"Refuse to restore {path} through a symlink."))
+        return path
+
+    def unpack(self, recipe_file: Path, output_dir: Path) -> None:
+        """根据配方从块存储中还原工具链，会先删除已存在的同名工具链
+
+        Args:
+            recipe_file (Path): 配方文件
+            output_dir (Path): 工具链输出目录
+        """
+
+        recipe = json.loads(zstandard.ZstdDecompressor().decompress(recipe_file.read_bytes()))
+        common.remove_if_exists(output_dir / recipe["name"])
+        dir_list: list[dict[str, typing.Any]] = []
+        symlink_set: set[str] = set()
+        for entry in recipe["entries"]:
+            path = output_dir / self._check_path(recipe["name"], entry["path"], symlink_set)
+            if "target" in entry:
+                os.symlink(entry["target"], path)
+                symlink_set.add(entry["path"])
+                continue
+            if "chunks" in entry:
+                with path.open("wb") as file:
+                    for digest in entry["chunks"]:
+                        file.write(self.get_chunk(digest))
+            elif stat.S_ISDIR(entry["mode"]):
+                path.mkdir(exist_ok=True)
+                dir_list.append(entry)
+                continue
+            else:
+                # FIFO、设备文件等特殊文件
+                os.mknod(path, entry["mode"], entry.get("rdev", 0))
+            os.chmod(path, entry["mode"])
+            os.utime(path, (entry["mtime"], entry["mtime"]))
+        # 目录中的项目全部创建后再设置目录的权限和修改时间
+        for entry in reversed(dir_list):
+            path = output_dir / entry["path"]
+            os.chmod(path, entry["mode"])
+            os.utime(path, (entry["mtime"], entry["mtime"]))
+
+
+def _put_file_worker(store: chunk_store, path: Path) -> tuple[list[str], int]:
+    """在进程池中将文件存入块存储
+
+    Args:
+        store (chunk_store): 块存储
+        path (Path): 文件路径
+
+    Returns:
+        tuple[list[str], int]: 块摘要列表和新写入存储的字节数
+    """
+
+    return store.put_file(path)
+
+
+class package_analyzer:
+    """流式统计工具链中各部分的原始大小和压缩后大小的估计值，用于追踪压缩包体积的变化
+
+    压缩后大小由一个共享上下文的zstd流式压缩器估计：每个文件的数据送入压缩器后按块刷新，新增的输出即为该文件的贡献，
+    因此文件之间的重复内容与实际压缩包一样只计算一次。分析压缩包时按实际文件大小等比例缩放。
+
+    Attributes:
+        type_list          : 文件类型
+        header_suffix_list : 头文件的后缀
+        python_suffix_list : Python文件的后缀
+        archive_magic_list : 静态库的魔数
+        elf_tail_size      : ELF节头表之前额外保留的数据量，节名字符串表通常紧邻节头表
+        estimate_level     : 估计压缩后大小时使用的zstd压缩等级
+    """
+
+    type_list: typing.Final[tuple[str, ...]] = ("elf-debug", "elf", "pe", "static-archive", "header", "python", "other")
+    header_suffix_list: typing.Final[tuple[str, ...]] = (".h", ".hh", ".hpp", ".hxx", ".inc", ".def", ".tcc", ".modulemap")
+    python_suffix_list: typing.Final[tuple[str, ...]] = (".py", ".pyc", ".pyi")
+    archive_magic_list: typing.Final[tuple[bytes, ...]] = (b"!<arch>\n", b"!<thin>\n")
+    elf_tail_size: typing.Final[int] = 1 << 20
+    estimate_level: typing.Final[int] = 3
+
+    name: str  # 工具链名称
+    top_count: int  # 记录的最大文件数
+    _compressor: typing.Any  # 估计压缩后大小的流式压缩器
+    _total: dict[str, int]
+    _dir_map: dict[str, dict[str, int]]
+    _type_map: dict[str, dict[str, int]]
+    _file_list: list[tuple[int, int, str, str]]  # (压缩后大小, 原始大小, 路径, 类型)
+
+    def __init__(self, name: str, long_distance_match: int, top_count: int = 20) -> None:
+        """初始化分析器
+
+        Args:
+            name (str): 工具链名称
+            long_distance_match (int): 估计压缩后大小时使用的长距离匹配窗口大小
+            top_count (int, optional): 报告中列出的最大文件数. 默认为20.
+        """
+
+        self.name = name
+        self.top_count = top_count
+        params = zstandard.ZstdCompressionParameters(compression_level=self.estimate_level, window_log=long_distance_match, enable_ldm=True)
+        self._compressor = zstandard.ZstdCompressor(compression_params=params).compressobj()
+        self._total = self._new_counter()
+        self._dir_map = {}
+        self._type_map = {type: self._new_counter() for type in self.type_list}
+        self._file_list = []
+
+    @staticmethod
+    def _new_counter() -> dict[str, int]:
+        """创建一个空的计数器
+
+        Returns:
+            dict[str, int]: 文件数、原始大小和压缩后大小
+        """
+
+        return {"files": 0, "size": 0, "compressed": 0}
+
+    def _get_type(self, path: str, header: bytes, debug_size: int | None) -> str:
+        """根据文件头部和路径判断文件类型
+
+        Args:
+            path (str): 相对于工具链根目录的路径
+            header (bytes): 文件头部
+            debug_size (int | None): ELF文件中调试信息节的大小
+
+        Returns:
+            str: 文件类型
+        """
+
+        if header.startswith(common.elf_section_table.magic):
+            return "elf-debug" if debug_size else "elf"
+        if header.startswith(b"MZ"):
+            return "pe"
+        if header.startswith(self.archive_magic_list):
+            return "static-archive"
+        suffix = os.path.splitext(path)[1]
+        if suffix in self.python_suffix_list:
+            return "python"
+        if suffix in self.header_suffix_list or "include" in path.split("/")[:-1]:
+            return "header"
+        return "other"
+
+    def add_file(self, path: str, block_iter: typing.Iterable[bytes]) -> None:
+        """流式读取一个普通文件并计入统计，只保留识别文件类型所需的少量数据
+
+        Args:
+            path (str): 相对于工具链根目录的路径
+            block_iter (typing.Iterable[bytes]): 文件数据块
+        """
+
+        header = bytearray()
+        tail = bytearray()
+        table: common.elf_section_table | None = None
+        tail_offset = tail_end = 0
+        size = compressed = 0
+        for block in block_iter:
+            if len(header) < common.elf_section_table.header_size:
+                header += block[: common.elf_section_table.header_size - len(header)]
+                if table := common.elf_section_table.parse_header(bytes(header)):
+                    # 只保留节头表及其之前的少量数据，节头表之后附加的数据不会被读取
+                    tail_offset = max(table.shoff - self.elf_tail_size, 0)
+                    tail_end = table.shoff + table.shnum * table.shentsize
+            if table and size < tail_end and size + len(block) > tail_offset:
+                tail += block[max(tail_offset - size, 0) : tail_end - size]
+            compressed += len(self._compressor.compress(block))
+            size += len(block)
+        compressed += len(self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK))
+
+        # 不在保留数据中的内容读取结果短于要求的长度
+        tail_data = bytes(tail)
+
+        def read(offset: int, size: int) -> bytes:
+            """从保留的数据中读取，超出保留范围的部分被截断"""
+            return tail_data[max(offset - tail_offset, 0) : max(offset - tail_offset + size, 0)]
+
+        debug_size = table.get_debug_size() if table and table.load_sections(read) else None
+        type = self._get_type(path, bytes(header), debug_size)
+        top_dir = path.split("/", 1)[0] if "/" in path else "."
+        for counter in (self._total, self._dir_map.setdefault(top_dir, self._new_counter()), self._type_map[type]):
+            counter["files"] += 1
+            counter["size"] += size
+            counter["compressed"] += compressed
+        self._file_list.append((compressed, size, path, type))
+
+    def get_report(self, compressed_size: int | None = None) -> dict[str, typing.Any]:
+        """生成分析报告
+
+        Args:
+            compressed_size (int | None, optional): 压缩包的实际大小，用于缩放压缩后大小的估计值. 默认不缩放.
+
+        Returns:
+            dict[str, typing.Any]: 可以序列化为JSON的分析报告
+        """
+
+        scale = compressed_size / max(self._total["compressed"], 1) if compressed_size is not None else 1.0
+
+        def convert(counter: dict[str, int]) -> dict[str, int]:
+            return {**counter, "compressed": round(counter["compressed"] * scale)}
+
+        file_list = sorted(self._file_list, key=lambda item: (-item[1], item[2]))[: self.top_count]
+        return {
+            "name": self.name,
+            "total": convert(self._total),
+            "by_directory": {dir: convert(counter) for dir, counter in sorted(self._dir_map.items(), key=lambda item: -item[1]["size"])},
+            "by_type": {type: convert(counter) for type, counter in self._type_map.items() if counter["files"]},
+            "top_files": [
+                {"path": path, "type": type, "size": size, "compressed": round(compressed * scale)}
+                for compressed, size, path, type in file_list
+            ],
+        }
+
+    @classmethod
+    def analyze_dir(cls, root: Path, long_distance_match: int, top_count: int = 20) -> dict[str, typing.Any]:
+        """分析已安装的工具链，硬链接只计算一次，跳过工具链清单
+
+        Args:
+            root (Path): 工具链根目录
+            long_distance_match (int): 估计压缩后大小时使用的长距离匹配窗口大小
+            top_count (int, optional): 报告中列出的最大文件数. 默认为20.
+
+        Returns:
+            dict[str, typing.Any]: 分析报告
+        """
+
+        analyzer = cls(root.name, long_distance_match, top_count)
+        inode_set: set[tuple[int, int]] = set()
+        block_size = 1 << 20
+        for item in common.walk_path(str(root)):
+            stat = os.lstat(item)
+            if not os.path.isfile(item) or os.path.islink(item) or (stat.st_dev, stat.st_ino) in inode_set:
+                continue
+            if os.path.basename(item) == common.package_manifest.file_name and os.path.dirname(item) == str(root):
+                continue
+            inode_set.add((stat.st_dev, stat.st_ino))
+            with open(item, "rb") as file:
+                analyzer.add_file(os.path.relpath(item, root), iter(functools.partial(file.read, block_size), b""))
+        return analyzer.get_report()
+
+    @classmethod
+    def analyze_package(cls, env: common.compress_environment, path: Path, top_count: int = 20) -> dict[str, typing.Any]:
+        """流式分析压缩包，硬链接成员和工具链清单不计入大小，压缩后大小按压缩包的实际大小缩放
+
+        Args:
+            env (common.compress_environment): 工具链压缩环境
+            path (Path): 压缩包路径
+            top_count (int, optional): 报告中列出的最大文件数. 默认为20.
+
+        Returns:
+            dict[str, typing.Any]: 分析报告
+        """
+
+        analyzer = cls(path.name.split(".")[0], env.long_distance_match, top_count)
+        with (
+            path.open("rb") as zst,
+            env._open_package_reader(zst) as reader,
+            libarchive.stream_reader(reader, "tar", "none", env.stream_block_size) as archive,
+        ):
+            for entry in archive:
+                member = entry.pathname.split("/", 1)[-1]
+                if entry.isfile and not entry.islnk and member != common.package_manifest.file_name:
+                    analyzer.add_file(member, entry.get_blocks())
+            return analyzer.get_report(zst.seek(0, os.SEEK_END))
 
 
-__all__ = ["compress_configure"]
+__all__ = ["compress_configure", "chunk_store", "package_analyzer"]